@@ -0,0 +1,92 @@
+# bench_batch_validation.py
+# Keystone Nexus - Validation cost per record, per-message JSON Schema vs compiled batch checks
+#
+# Validates order events against ORDER_EVENT_CONTRACT four ways:
+#   per_message       - json.loads + jsonschema.validate per record (schema re-checked every call)
+#   per_message_compiled - one jsonschema validator built up front, still one call per record
+#   arrow_decode_only - decode_batch without validation (the floor)
+#   batch_compiled    - validate_messages: Arrow decode + compiled columnar checks
+# Roughly 1% of the records are invalid and are routed to dead letters.
+#
+#   python -m benchmarks.bench_batch_validation --sizes 10000,100000
+import argparse
+import json
+import random
+import time
+
+import jsonschema
+from jsonschema.validators import validator_for
+
+from src.ingestion.batch_validation import CompiledSchema, validate_messages
+from src.ingestion.olist_lakehouse_enterprise import decode_batch
+from src.ingestion.olist_schemas import OLIST_SCHEMAS, ORDER_EVENT_CONTRACT, ORDER_EVENT_TIMESTAMPS
+from src.streaming.fakes import FakeMessage, make_order
+
+
+def make_messages(n, invalid_ratio, seed=7):
+    rng = random.Random(seed)
+    messages = []
+    for i in range(n):
+        order = make_order(i, rng)
+        if rng.random() < invalid_ratio:
+            order["order_status"] = "lost"
+        messages.append(FakeMessage(json.dumps(order).encode("utf-8"), offset=i))
+    return messages
+
+
+def per_message(messages):
+    rejected = 0
+    for msg in messages:
+        try:
+            jsonschema.validate(json.loads(msg.value()), ORDER_EVENT_CONTRACT)
+        except jsonschema.ValidationError:
+            rejected += 1
+    return rejected
+
+
+def per_message_compiled(messages, validator=validator_for(ORDER_EVENT_CONTRACT)(ORDER_EVENT_CONTRACT)):
+    return sum(1 for msg in messages if not validator.is_valid(json.loads(msg.value())))
+
+
+def arrow_decode_only(messages):
+    decode_batch(messages)
+    return 0
+
+
+def batch_compiled(messages, compiled=CompiledSchema(ORDER_EVENT_CONTRACT, OLIST_SCHEMAS["orders"], ORDER_EVENT_TIMESTAMPS)):
+    _, dead = validate_messages(messages, compiled)
+    return len(dead)
+
+
+def best_of(fn, messages, repeat):
+    timings, rejected = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rejected = fn(messages)
+        timings.append(time.perf_counter() - start)
+    return min(timings), rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch validation microbenchmark")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--invalid-ratio", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = []
+    for n in (int(x) for x in args.sizes.split(",")):
+        messages = make_messages(n, args.invalid_ratio)
+        row = {"messages": n}
+        for fn in (per_message, per_message_compiled, arrow_decode_only, batch_compiled):
+            seconds, rejected = best_of(fn, messages, args.repeat)
+            row[f"{fn.__name__}_us_per_record"] = round(seconds / n * 1e6, 2)
+            if fn is not arrow_decode_only:
+                row[f"{fn.__name__}_rejected"] = rejected
+        row["speedup_vs_per_message"] = round(row["per_message_us_per_record"] / row["batch_compiled_us_per_record"], 1)
+        results.append(row)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
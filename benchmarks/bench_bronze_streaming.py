@@ -0,0 +1,101 @@
+# bench_bronze_streaming.py
+# Keystone Nexus - Peak RSS / wall time of CSV -> Parquet conversion
+#
+# Compares the in-memory pandas path against the chunked Arrow path of
+# `src/ingestion/ingest_to_bronze.py` on a synthetic order_items-shaped CSV.
+# Each mode runs in a fresh subprocess so peak RSS is not shared between runs.
+#
+#   python -m benchmarks.bench_bronze_streaming --size-gb 2
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BLOCK_ROWS = 100_000
+
+
+def generate_order_items_csv(path, size_bytes, seed=42):
+    """Writes an order_items-shaped CSV of roughly `size_bytes` bytes."""
+    rng = np.random.default_rng(seed)
+    block = pd.DataFrame({
+        "order_id": [f"{i:032x}" for i in rng.integers(0, 2**63, BLOCK_ROWS)],
+        "order_item_id": rng.integers(1, 6, BLOCK_ROWS),
+        "product_id": [f"{i:032x}" for i in rng.integers(0, 2**63, BLOCK_ROWS)],
+        "seller_id": [f"{i:032x}" for i in rng.integers(0, 2**63, BLOCK_ROWS)],
+        "shipping_limit_date": pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 86400 * 365, BLOCK_ROWS), unit="s"),
+        "price": rng.gamma(2.0, 60.0, BLOCK_ROWS).round(2),
+        "freight_value": rng.gamma(2.0, 10.0, BLOCK_ROWS).round(2),
+    })
+    body = block.to_csv(index=False, header=False, date_format="%Y-%m-%d %H:%M:%S")
+    with open(path, "w") as f:
+        f.write(",".join(block.columns) + "\n")
+        written = 0
+        while written < size_bytes:
+            f.write(body)
+            written += len(body)
+
+
+def run_child(mode, csv_path, out_path, max_memory_mb):
+    from src.ingestion import ingest_to_bronze as bronze
+
+    start = time.perf_counter()
+    if mode == "pandas":
+        rows = bronze.convert_csv_to_parquet(csv_path, out_path, "order_items")
+    else:
+        rows = bronze.convert_csv_to_parquet_streaming(csv_path, out_path, "order_items", max_memory_mb=max_memory_mb)
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        "mode": mode,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "parquet_mb": round(os.path.getsize(out_path) / 2**20, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-gb", type=float, default=2.0)
+    parser.add_argument("--max-memory-mb", type=int, default=256)
+    parser.add_argument("--modes", default="streaming,pandas")
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "OUT"), help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], args.csv, args.child[1], args.max_memory_mb)
+        return
+
+    csv_path = os.path.join(args.workdir, f"bench_order_items_{args.size_gb:g}gb.csv")
+    if not os.path.exists(csv_path):
+        generate_order_items_csv(csv_path, int(args.size_gb * 2**30))
+
+    results = []
+    for mode in args.modes.split(","):
+        out_path = os.path.join(args.workdir, f"bench_order_items_{mode}.parquet")
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_bronze_streaming", "--csv", csv_path,
+             "--max-memory-mb", str(args.max_memory_mb), "--child", mode, out_path],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            # The pandas path is expected to OOM on small workers at large sizes.
+            results.append({"mode": mode, "error": proc.stderr.strip().splitlines()[-1:]})
+        else:
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        if os.path.exists(out_path):
+            os.remove(out_path)
+
+    print(json.dumps({"csv_gb": round(os.path.getsize(csv_path) / 2**30, 2), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# bench_consumer_fleet.py
+# Keystone Nexus - Lakehouse consumer throughput vs number of worker processes
+#
+# Runs ConsumerFleet over the in-process multi-partition stand-in topic
+# (`fake_group_consumer`), decoding JSON and writing Parquet to a temporary
+# directory, once per worker count. Scaling is bounded by the cores available.
+#
+#   python -m benchmarks.bench_consumer_fleet --workers 1,2,4 --partitions 8 --records 50000
+import argparse
+import functools
+import json
+import os
+import shutil
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consumer fleet scaling benchmark")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--partitions", type=int, default=8)
+    parser.add_argument("--records", type=int, default=50000, help="Records per partition")
+    parser.add_argument("--batch", type=int, default=20000)
+    args = parser.parse_args()
+
+    silver = tempfile.mkdtemp(prefix="bench_fleet_")
+    # Read by the spawned workers when they import the consumer module
+    os.environ.update(SILVER_ORDERS_PATH=silver, BATCH_MAX_RECORDS=str(args.batch), SILVER_ROLLING_WRITER="false",
+                      LAKEHOUSE_LOG_LEVEL="WARNING")
+
+    from src.ingestion.consumer_fleet import ConsumerFleet
+    from src.streaming.fakes import fake_group_consumer
+
+    factory = functools.partial(fake_group_consumer, num_partitions=args.partitions, records_per_partition=args.records)
+    results = []
+    try:
+        for workers in (int(x) for x in args.workers.split(",")):
+            start = time.perf_counter()
+            totals = ConsumerFleet(workers, factory, stop_on_idle=True, metrics_interval_s=1).run()
+            seconds = time.perf_counter() - start
+            assert totals["records"] == args.partitions * args.records, totals
+            results.append({
+                "workers": workers,
+                "wall_s": round(seconds, 3),
+                "records_per_s": totals["records_per_s"],
+            })
+            shutil.rmtree(silver)
+            os.makedirs(silver)
+    finally:
+        shutil.rmtree(silver, ignore_errors=True)
+
+    base = results[0]["records_per_s"] / results[0]["workers"]
+    for r in results:
+        r["scaling_efficiency"] = round(r["records_per_s"] / (base * r["workers"]), 2)
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
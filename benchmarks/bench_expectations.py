@@ -0,0 +1,93 @@
+# bench_expectations.py
+# Keystone Nexus - olist_logistics_rules per batch, pandas vs pyarrow.compute
+#
+# Evaluates the orders expectations of the olist_logistics_rules suite over
+# streaming batches of generated orders two ways:
+#   pandas_per_batch  - Table.to_pandas + the same checks as pandas column operations, which is
+#                       the work GX's pandas engine does per batch before any checkpoint overhead
+#   arrow_suite       - ArrowExpectationSuite.validate on the record batch (arrow_expectations.py)
+# Roughly 1% of the rows break a rule. Both variants report the same failure counts.
+#
+#   python -m benchmarks.bench_expectations --rows 200000 --batch-rows 1000,10000
+import argparse
+import json
+import random
+import time
+
+import pyarrow as pa
+
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+from src.validation.arrow_expectations import OLIST_ORDER_STATUSES, suite_for_table
+from src.streaming.fakes import make_order
+
+
+def make_table(n, invalid_ratio, seed=7):
+    rng = random.Random(seed)
+    orders = []
+    for i in range(n):
+        order = make_order(i, rng)
+        if rng.random() < invalid_ratio:
+            order["order_status"] = "lost"
+        orders.append(order)
+    return pa.Table.from_pylist(orders, schema=OLIST_SCHEMAS["orders"])
+
+
+def pandas_per_batch(batches):
+    failures, seen = 0, set()
+    for batch in batches:
+        df = batch.to_pandas()
+        ids = df["order_id"]
+        failures += int(ids.isna().sum()) + int(df["customer_id"].isna().sum())
+        failures += int(ids.duplicated().sum()) + int(ids.dropna().map(seen.__contains__).sum())
+        seen.update(ids.dropna())
+        delivered, purchased = df["order_delivered_customer_date"], df["order_purchase_timestamp"]
+        failures += int((delivered.notna() & purchased.notna() & ~(delivered > purchased)).sum())
+        estimated = df["order_estimated_delivery_date"]
+        failures += int(((estimated.notna() | purchased.notna()) & ~(estimated > purchased)).sum())
+        status = df["order_status"]
+        failures += int((status.notna() & ~status.isin(OLIST_ORDER_STATUSES)).sum())
+    return failures
+
+
+def arrow_suite(batches):
+    suite = suite_for_table("orders")
+    for batch in batches:
+        suite.validate(batch)
+    return sum(suite.summary()["failures"].values())
+
+
+def best_of(fn, batches, repeat):
+    timings, failures = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        failures = fn(batches)
+        timings.append(time.perf_counter() - start)
+    return min(timings), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expectation suite microbenchmark")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-rows", default="1000,10000")
+    parser.add_argument("--invalid-ratio", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    table = make_table(args.rows, args.invalid_ratio)
+    # Warm up Arrow's kernels (the first hash aggregation pays one-off setup)
+    arrow_suite(table.to_batches(max_chunksize=1000)[:1])
+    results = []
+    for batch_rows in (int(x) for x in args.batch_rows.split(",")):
+        batches = table.to_batches(max_chunksize=batch_rows)
+        row = {"batch_rows": batch_rows, "batches": len(batches)}
+        for fn in (pandas_per_batch, arrow_suite):
+            seconds, failures = best_of(fn, batches, args.repeat)
+            row[f"{fn.__name__}_us_per_batch"] = round(seconds / len(batches) * 1e6, 1)
+            row[f"{fn.__name__}_failures"] = failures
+        row["speedup"] = round(row["pandas_per_batch_us_per_batch"] / row["arrow_suite_us_per_batch"], 1)
+        results.append(row)
+    print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench_glue_schema_cache.py
+# Keystone Nexus - Per-message cost of Glue schema lookups, uncached vs cold vs warm cache
+#
+# Serializes and deserializes Glue-framed order records against FakeGlueClient
+# with a simulated registry round trip. Each record resolves its schema through
+# the client exactly as the Glue serde does: by definition when producing, by
+# schema version ID when consuming.
+#
+#   python -m benchmarks.bench_glue_schema_cache --messages 20000 --versions 3 --latency-ms 20
+import argparse
+import json
+import random
+import time
+
+from src.streaming.glue_schema_cache import CachingGlueClient, decode_glue_payload, encode_glue_payload
+from tests.fakes.glue import FakeGlueClient
+from src.streaming.fakes import make_order
+
+SCHEMA_ID = {"RegistryName": "keystone-registry", "SchemaName": "OlistOrderSchema"}
+
+
+def order_schema(version):
+    return json.dumps({"$schema": "http://json-schema.org/draft-07/schema#", "title": f"OlistOrder v{version}",
+                       "type": "object", "required": ["order_id", "customer_id", "order_status"]})
+
+
+def serialize(client, records, definitions):
+    out = []
+    for record, definition in zip(records, definitions):
+        version_id = client.get_schema_by_definition(SchemaId=SCHEMA_ID, SchemaDefinition=definition)["SchemaVersionId"]
+        out.append(encode_glue_payload(version_id, json.dumps(record).encode("utf-8")))
+    return out
+
+
+def deserialize(client, payloads):
+    out = []
+    for payload in payloads:
+        version_id, body = decode_glue_payload(payload)
+        client.get_schema_version(SchemaVersionId=version_id)
+        out.append(json.loads(body))
+    return out
+
+
+def measure(fn, client, n, *data):
+    start = time.perf_counter()
+    fn(client, *(d[:n] for d in data))
+    seconds = time.perf_counter() - start
+    return {"messages": n, "us_per_message": round(seconds / n * 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Glue schema cache microbenchmark")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--uncached-messages", type=int, default=200, help="Uncached runs pay the latency per record")
+    parser.add_argument("--versions", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    registry = FakeGlueClient()
+    definitions = [order_schema(v) for v in range(args.versions)]
+    version_ids = [registry.register_schema_version(SchemaId=SCHEMA_ID, SchemaDefinition=d)["SchemaVersionId"]
+                   for d in definitions]
+    registry.latency_s = args.latency_ms / 1000
+
+    rng = random.Random(7)
+    records = [make_order(i, rng) for i in range(args.messages)]
+    record_definitions = [rng.choice(definitions) for _ in records]
+    payloads = serialize(CachingGlueClient(registry), records, record_definitions)
+
+    results = {}
+    for path, fn, data in (("serialize", serialize, (records, record_definitions)),
+                           ("deserialize", deserialize, (payloads,))):
+        registry.calls.clear()
+        uncached = measure(fn, registry, min(args.uncached_messages, args.messages), *data)
+        uncached["glue_calls"] = sum(registry.calls.values())
+
+        cold_client = CachingGlueClient(registry)
+        cold = measure(fn, cold_client, args.messages, *data)
+        cold.update(cold_client.stats())
+
+        warm_client = CachingGlueClient(registry)
+        warm_client.prewarm(version_ids=version_ids, definitions=[(SCHEMA_ID["SchemaName"], d) for d in definitions])
+        warm = measure(fn, warm_client, args.messages, *data)
+        warm.update(warm_client.stats())
+
+        results[path] = {"uncached": uncached, "cold_cache": cold, "warm_cache": warm}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# bench_gold_fact_sales.py
+# Keystone Nexus - Gold fact_sales with DuckDB vs a pandas rendering of the dbt model
+#
+# Writes a year/month/day partitioned Silver orders tree and Bronze
+# order_items/order_payments, then builds fact_sales two ways:
+#   pandas_reference - reads everything and applies fact_sales.sql step by step (stg_* filters,
+#                      ROW_NUMBER dedup, payment aggregation, delivered + partition filter)
+#   duckdb_builder   - src/gold/fact_sales.py over the pruned partitions, including the Gold write
+# for one day (a daily run) and --days days (a backfill). Rows are compared
+# column by column; `matches_reference` must be true.
+#
+#   python -m benchmarks.bench_gold_fact_sales --orders 500000 --days 31
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.gold.fact_sales import build_fact_sales, date_key
+from src.ingestion.consumer_pipeline import add_partition_columns
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+from src.validation.sql_pushdown import date_range
+from src.streaming.fakes import make_order
+
+COLUMNS = ["order_id", "order_item_id", "customer_id", "product_id", "seller_id", "date_key", "price",
+           "freight_value", "total_order_item_value", "total_payment_value", "max_payment_installments",
+           "delivery_lag_days"]
+
+
+def write_inputs(silver_root, bronze_root, n, seed=7):
+    rng = random.Random(seed)
+    orders, items, payments = [], [], []
+    for i in range(n):
+        order = make_order(i, rng)
+        if order["order_status"] == "delivered" and rng.random() < 0.9:
+            order["order_delivered_customer_date"] = f"2019-01-{rng.randint(1, 28):02d} 12:00:00"
+        orders.append(order)
+        if rng.random() < 0.01:
+            orders.append(dict(order))  # redelivered event
+        for item in range(1, rng.randint(1, 3) + 1):
+            items.append({"order_id": order["order_id"], "order_item_id": item, "product_id": f"p{rng.randint(0, 999)}",
+                          "seller_id": f"s{rng.randint(0, 99)}", "shipping_limit_date": order["order_purchase_timestamp"],
+                          "price": round(rng.uniform(5, 500), 2), "freight_value": round(rng.uniform(0, 50), 2)})
+        for seq in range(1, rng.choice((0, 1, 1, 1, 2)) + 1):
+            payments.append({"order_id": order["order_id"], "payment_sequential": seq, "payment_type": "credit_card",
+                              "payment_installments": rng.randint(1, 10), "payment_value": round(rng.uniform(5, 500), 2)})
+    table = add_partition_columns(pa.Table.from_pylist(orders, schema=OLIST_SCHEMAS["orders"]))
+    pq.write_to_dataset(table, os.path.join(silver_root, "orders"), partition_cols=["year", "month", "day"])
+    for name, rows in (("order_items", items), ("order_payments", payments)):
+        os.makedirs(os.path.join(bronze_root, name))
+        pq.write_table(pa.Table.from_pylist(rows, schema=OLIST_SCHEMAS[name]),
+                       os.path.join(bronze_root, name, f"{name}_0.parquet"))
+
+
+def pandas_reference(silver_root, bronze_root, partitions):
+    orders = pq.read_table(os.path.join(silver_root, "orders"), partitioning="hive").to_pandas()
+    orders = orders[orders["order_id"].notna()]
+    orders = orders.sort_values("order_purchase_timestamp", ascending=False, kind="stable")
+    orders = orders.drop_duplicates("order_id")
+    items = pd.read_parquet(os.path.join(bronze_root, "order_items"))
+    items = items[items["order_id"].notna()]
+    payments = pd.read_parquet(os.path.join(bronze_root, "order_payments"))
+    payments = payments[payments["order_id"].notna()].groupby("order_id").agg(
+        total_payment_value=("payment_value", "sum"), max_payment_installments=("payment_installments", "max"))
+
+    days = {(d.year, d.month, d.day) for d in partitions}
+    target = [(y, m, d) in days for y, m, d in zip(orders["year"], orders["month"], orders["day"])]
+    orders = orders[(orders["order_status"] == "delivered") & pd.Series(target, index=orders.index)]
+    df = orders.merge(items, on="order_id").merge(payments, left_on="order_id", right_index=True, how="left")
+    purchased = pd.to_datetime(df["order_purchase_timestamp"]).dt.normalize()
+    delivered = pd.to_datetime(df["order_delivered_customer_date"]).dt.normalize()
+    df["date_key"] = purchased.dt.strftime("%Y%m%d").astype("int32")
+    df["total_order_item_value"] = df["price"] + df["freight_value"]
+    df["delivery_lag_days"] = (delivered - purchased).dt.days.astype("Int64")
+    df["max_payment_installments"] = df["max_payment_installments"].astype("Int64")
+    return df[COLUMNS].sort_values(["date_key", "order_id", "order_item_id"]).reset_index(drop=True)
+
+
+def read_gold(gold_root, partitions):
+    keys = {date_key(d) for d in partitions}
+    df = pq.read_table(gold_root, partitioning="hive").to_pandas()
+    df = df[df["date_key"].isin(keys)]
+    df["date_key"] = df["date_key"].astype("int32")
+    for column in ("max_payment_installments", "delivery_lag_days"):
+        df[column] = df[column].astype("Int64")
+    return df[COLUMNS].sort_values(["date_key", "order_id", "order_item_id"]).reset_index(drop=True)
+
+
+def matches(left, right):
+    try:
+        pd.testing.assert_frame_equal(left, right, check_dtype=False)
+        return True
+    except AssertionError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gold fact_sales builder benchmark")
+    parser.add_argument("--orders", type=int, default=500000)
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    root = os.path.join(args.workdir, f"bench_gold_{args.orders}")
+    silver_root, bronze_root = os.path.join(root, "silver"), os.path.join(root, "bronze")
+    if not os.path.exists(root):
+        write_inputs(silver_root, bronze_root, args.orders)
+
+    results = {}
+    for name, partitions in (("daily", [date(2018, 1, 1)]),
+                             ("backfill", date_range(date(2018, 1, 1), date(2018, 1, args.days)))):
+        start = time.perf_counter()
+        reference = pandas_reference(silver_root, bronze_root, partitions)
+        reference_seconds = time.perf_counter() - start
+        gold_root = os.path.join(root, f"gold_{name}")
+        summary = build_fact_sales(partitions, silver_root, bronze_root, gold_root)
+        results[name] = {
+            "partitions": len(partitions), "rows": summary["rows"],
+            "pandas_reference_seconds": round(reference_seconds, 3),
+            "duckdb_builder_seconds": summary["total_seconds"],
+            "speedup": round(reference_seconds / summary["total_seconds"], 1),
+            "matches_reference": matches(reference, read_gold(gold_root, partitions)),
+        }
+    print(json.dumps({"orders": args.orders, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# bench_json_decode.py
+# Keystone Nexus - Kafka batch decode cost, per-message json.loads vs Arrow JSON
+#
+# Compares the original per-message decode of `process_batch` against
+# `decode_batch` (one newline-delimited buffer parsed by pyarrow.json).
+#
+#   python -m benchmarks.bench_json_decode --sizes 10000,100000,1000000
+import argparse
+import json
+import random
+import time
+
+import pyarrow as pa
+
+from src.ingestion.olist_lakehouse_enterprise import decode_batch
+from src.streaming.fakes import FakeMessage, make_order
+
+
+def make_messages(n, seed=7):
+    rng = random.Random(seed)
+    return [FakeMessage(json.dumps(make_order(i, rng)).encode("utf-8"), offset=i) for i in range(n)]
+
+
+def decode_pylist(messages):
+    """The original `process_batch` decode path."""
+    return pa.Table.from_pylist([json.loads(msg.value().decode("utf-8")) for msg in messages])
+
+
+def best_of(fn, messages, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        table = fn(messages)
+        timings.append(time.perf_counter() - start)
+    assert table.num_rows == len(messages)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kafka batch decode microbenchmark")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = []
+    for n in (int(x) for x in args.sizes.split(",")):
+        messages = make_messages(n)
+        pylist = best_of(decode_pylist, messages, args.repeat)
+        arrow = best_of(decode_batch, messages, args.repeat)
+        results.append({
+            "messages": n,
+            "pylist_s": round(pylist, 4),
+            "arrow_json_s": round(arrow, 4),
+            "pylist_msgs_per_s": round(n / pylist),
+            "arrow_json_msgs_per_s": round(n / arrow),
+            "speedup": round(pylist / arrow, 2),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
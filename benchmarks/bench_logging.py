@@ -0,0 +1,83 @@
+# bench_logging.py
+# Keystone Nexus - Logging overhead per message, synchronous JSON vs the shared background logger
+#
+# Logs one per-record line (like MSKProducer.send_order) N times to /dev/null:
+#   sync_json         the previous per-module setup: StreamHandler + json.dumps formatter on the calling thread
+#   async_json        setup_logger: QueueHandler on the calling thread, orjson + batched writes on a background thread
+#   async_rate_limited  as above with the per-call-site RateLimitFilter the producers use
+# `caller_us_per_message` is the time the logging call costs the hot path;
+# `total_us_per_message` also waits for the background writer to drain the queue.
+#
+#   python -m benchmarks.bench_logging --messages 200000
+import argparse
+import json
+import logging
+import os
+import time
+
+from src.observability.structured_logging import RateLimitFilter, setup_logger
+
+
+class LegacyJsonFormatter(logging.Formatter):
+    """The per-module formatter the pipelines used before structured_logging.py."""
+
+    def format(self, record):
+        log_obj = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "module": record.module,
+        }
+        if record.exc_info:
+            log_obj["exception"] = self.formatException(record.exc_info)
+        return json.dumps(log_obj)
+
+
+def sync_logger(stream):
+    logger = logging.getLogger("bench.sync_json")
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(LegacyJsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def run(logger, n):
+    start = time.perf_counter()
+    for i in range(n):
+        logger.info(f"Sent message to orders partition {i % 8}")
+    caller = time.perf_counter() - start
+    listener = getattr(logger, "listener", None)
+    if listener is not None:
+        listener.stop()
+    return caller, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead microbenchmark")
+    parser.add_argument("--messages", type=int, default=200000)
+    args = parser.parse_args()
+
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        loggers = {
+            "sync_json": sync_logger(devnull),
+            "async_json": setup_logger("bench.async_json", stream=devnull, asynchronous=True),
+            "async_rate_limited": setup_logger("bench.async_rate_limited", stream=devnull, asynchronous=True,
+                                               rate_limit=RateLimitFilter()),
+        }
+        for name, logger in loggers.items():
+            caller, total = run(logger, args.messages)
+            results[name] = {
+                "caller_us_per_message": round(caller / args.messages * 1e6, 2),
+                "total_us_per_message": round(total / args.messages * 1e6, 2),
+            }
+    base = results["sync_json"]["caller_us_per_message"]
+    for row in results.values():
+        row["caller_speedup"] = round(base / row["caller_us_per_message"], 1)
+    print(json.dumps({"messages": args.messages, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# bench_offset_commits.py
+# Keystone Nexus - Consumer throughput, per-batch sync commits vs interval async commits
+#
+# Runs the `run_consumer` poll loop over a FakeConsumer whose synchronous
+# commits block for a simulated broker round trip. The baseline commits
+# synchronously after every batch (the old `consumer.commit()` behaviour);
+# the tracker commits written offsets asynchronously every `--interval-s`.
+#
+#   python -m benchmarks.bench_offset_commits --messages 200000 --batch 1000 --commit-latency-ms 5
+import argparse
+import json
+import logging
+import time
+
+from src.ingestion.olist_lakehouse_enterprise import run_consumer
+from src.streaming.fakes import FakeConsumer
+
+
+def run(args, interval_s, asynchronous):
+    partitions = {p: [b"{}"] * (args.messages // args.partitions) for p in range(args.partitions)}
+    consumer = FakeConsumer(partitions, commit_latency_s=args.commit_latency_ms / 1000)
+    start = time.perf_counter()
+    snapshot = run_consumer(consumer, topics=("orders",), max_records=args.batch, stop_on_idle=True,
+                            handler=lambda messages, writer: True, commit_interval_s=interval_s,
+                            async_commits=asynchronous)
+    seconds = time.perf_counter() - start
+    expected = {p: len(values) for p, values in partitions.items()}
+    assert consumer.committed == expected, consumer.committed
+    return {
+        "seconds": round(seconds, 3),
+        "records_per_s": round(snapshot["records"] / seconds),
+        "commit_calls": consumer.commit_calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offset commit strategy microbenchmark")
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--commit-latency-ms", type=float, default=5.0)
+    parser.add_argument("--interval-s", type=float, default=1.0)
+    args = parser.parse_args()
+
+    logging.getLogger("lakehouse").setLevel(logging.WARNING)
+    per_batch = run(args, interval_s=0, asynchronous=False)
+    interval = run(args, interval_s=args.interval_s, asynchronous=True)
+    print(json.dumps({
+        "per_batch_sync": per_batch,
+        "interval_async": interval,
+        "speedup": round(per_batch["seconds"] / interval["seconds"], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
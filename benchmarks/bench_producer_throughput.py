@@ -0,0 +1,85 @@
+# bench_producer_throughput.py
+# Keystone Nexus - MSKProducer throughput, blocking send_order vs batched send_many
+#
+# Runs MSKProducer against FakeKafkaProducer, which charges a simulated broker
+# round trip per produce request. The baseline is the original configuration
+# (no linger, no compression) with `send_order` waiting on every record; the
+# batched run uses `send_many` with linger/batch settings and compression.
+#
+#   python -m benchmarks.bench_producer_throughput --messages 50000 --latency-ms 2
+import argparse
+import json
+import logging
+import random
+import time
+
+from src.streaming.msk_producer import MSKProducer
+from src.streaming.fakes import FakeKafkaProducer, make_order
+
+
+def fake_factory(latency_s):
+    return lambda **config: FakeKafkaProducer(request_latency_s=latency_s, **config)
+
+
+def run_blocking(orders, latency_s):
+    producer = MSKProducer("fake:9092", linger_ms=0, batch_size=16384, compression="none",
+                           producer_factory=fake_factory(latency_s))
+    start = time.perf_counter()
+    for order in orders:
+        producer.send_order("orders", order)
+    seconds = time.perf_counter() - start
+    return producer.producer, seconds
+
+
+def run_batched(orders, latency_s, linger_ms, batch_kb, compression):
+    producer = MSKProducer("fake:9092", linger_ms=linger_ms, batch_size=batch_kb * 1024, compression=compression,
+                           producer_factory=fake_factory(latency_s))
+    start = time.perf_counter()
+    report = producer.send_many("orders", orders, key=lambda o: o["order_id"]).wait()
+    seconds = time.perf_counter() - start
+    assert report.delivered == len(orders) and report.failed == 0, report.summary()
+    return producer.producer, seconds
+
+
+def describe(fake, seconds, n):
+    return {
+        "messages": n,
+        "seconds": round(seconds, 3),
+        "msgs_per_s": round(n / seconds),
+        "requests": fake.requests,
+        "bytes_sent": fake.bytes_sent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Producer throughput microbenchmark")
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--blocking-messages", type=int, default=1000, help="Blocking sends pay a round trip each")
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--linger-ms", type=int, default=20)
+    parser.add_argument("--batch-kb", type=int, default=256)
+    parser.add_argument("--compression", default="zstd,lz4,gzip")
+    args = parser.parse_args()
+
+    logging.getLogger("src.streaming.msk_producer").setLevel(logging.WARNING)
+    rng = random.Random(7)
+    orders = [make_order(i, rng) for i in range(args.messages)]
+    latency_s = args.latency_ms / 1000
+
+    n_blocking = min(args.blocking_messages, args.messages)
+    blocking = describe(*run_blocking(orders[:n_blocking], latency_s), n=n_blocking)
+    batched = describe(*run_batched(orders, latency_s, args.linger_ms, args.batch_kb, args.compression),
+                       n=args.messages)
+    print(json.dumps({
+        "blocking_send_order": blocking,
+        "batched_send_many": batched,
+        "speedup": round(batched["msgs_per_s"] / blocking["msgs_per_s"], 1),
+        "bytes_per_record": {
+            "blocking": round(blocking["bytes_sent"] / n_blocking, 1),
+            "batched": round(batched["bytes_sent"] / args.messages, 1),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
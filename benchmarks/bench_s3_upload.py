@@ -0,0 +1,78 @@
+# bench_s3_upload.py
+# Keystone Nexus - Per-upload latency of upload_to_s3, fresh vs pooled client
+#
+# Runs against a local moto S3 server (no AWS account needed). The "fresh"
+# mode reproduces the old behaviour of building a boto3 client per upload;
+# "pooled" uses the shared client from `get_s3_client()`.
+#
+#   python -m benchmarks.bench_s3_upload --uploads 200 --size-kb 512
+import argparse
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="upload_to_s3 latency, fresh vs pooled client")
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=args.port, verbose=False)
+    server.start()
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ["S3_ENDPOINT_URL"] = f"http://127.0.0.1:{args.port}"
+
+    # Imported after S3_ENDPOINT_URL is set so the shared client targets moto.
+    import boto3
+    from src.ingestion import ingest_to_bronze as bronze
+
+    bucket = "bench-bronze"
+    bronze.get_s3_client().create_bucket(
+        Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": bronze.AWS_REGION}
+    )
+
+    with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as f:
+        f.write(os.urandom(args.size_kb * 1024))
+        payload = f.name
+
+    def fresh_client():
+        return boto3.client("s3", region_name=bronze.AWS_REGION, endpoint_url=bronze.S3_ENDPOINT_URL)
+
+    results = {}
+    try:
+        for mode in ("fresh", "pooled"):
+            latencies = []
+            for i in range(args.uploads):
+                start = time.perf_counter()
+                client = fresh_client() if mode == "fresh" else None
+                bronze.upload_to_s3(payload, bucket, f"{mode}/{i}.parquet", s3_client=client)
+                latencies.append((time.perf_counter() - start) * 1000)
+            results[mode] = {
+                "uploads": args.uploads,
+                "mean_ms": round(statistics.mean(latencies), 2),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+            }
+    finally:
+        os.remove(payload)
+        server.stop()
+
+    print(json.dumps({"size_kb": args.size_kb, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
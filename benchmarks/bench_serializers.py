@@ -0,0 +1,72 @@
+# bench_serializers.py
+# Keystone Nexus - Order event value formats: size and encode/decode cost
+#
+# For each format in src/streaming/serializers.py reports the bytes per record
+# and the throughput of producer-side `dumps` and of consumer-side
+# `decode_batch` (payloads -> Arrow table against the orders schema), which is
+# what the lakehouse consumer runs per batch. Formats whose library is not
+# installed are skipped.
+#
+#   python -m benchmarks.bench_serializers --messages 100000
+import argparse
+import json
+import random
+import time
+
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+from src.streaming.serializers import get_serde
+from src.streaming.fakes import make_order
+
+FORMATS = ("json", "orjson", "msgpack", "avro")
+
+
+def best_of(fn, repeat):
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def bench_format(serde, orders, schema, repeat):
+    n = len(orders)
+    encode_s, payloads = best_of(lambda: [serde.dumps(o) for o in orders], repeat)
+    decode_s, (table, _, errors) = best_of(lambda: serde.decode_batch(payloads, schema), repeat)
+    assert table.num_rows == n and not errors, errors[:3]
+    return {
+        "bytes_per_record": round(sum(len(p) for p in payloads) / n, 1),
+        "serialize_records_per_s": round(n / encode_s),
+        "deserialize_to_arrow_records_per_s": round(n / decode_s),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Value serializer microbenchmark")
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    orders = [make_order(i, rng) for i in range(args.messages)]
+    schema = OLIST_SCHEMAS["orders"]
+
+    results = {}
+    for name in args.formats.split(","):
+        try:
+            serde = get_serde(name)
+        except ImportError as e:
+            results[name] = {"skipped": str(e)}
+            continue
+        results[name] = bench_format(serde, orders, schema, args.repeat)
+    baseline = results.get("json", {}).get("bytes_per_record")
+    if baseline:
+        for row in results.values():
+            if "bytes_per_record" in row:
+                row["size_vs_json"] = round(row["bytes_per_record"] / baseline, 2)
+    print(json.dumps({"messages": args.messages, "formats": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# bench_sql_pushdown.py
+# Keystone Nexus - olist_logistics_rules in SQL: one query per rule vs one query per table
+#
+# Writes a year/month/day partitioned Silver orders tree (plus order_items)
+# and validates it on DuckDB, the local stand-in for Athena:
+#   per_rule          - one aggregate query per expectation over the whole table (GX's SQL pattern)
+#   single_query      - sql_pushdown: every rule of a table in one query, whole table
+#   single_pruned     - sql_pushdown limited to --days partitions
+# Bytes scanned are the compressed column chunks each query reads (Athena's billing basis).
+#
+#   python -m benchmarks.bench_sql_pushdown --rows 1000000 --days 7
+import argparse
+import json
+import os
+import random
+import tempfile
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.ingestion.consumer_pipeline import add_partition_columns
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+from src.validation.arrow_expectations import OLIST_LOGISTICS_RULES, rule_columns
+from src.validation.sql_pushdown import DuckDBEngine, compile_suite_sql, date_range, run_pushdown_validation
+from src.streaming.fakes import make_order
+
+
+def write_silver(root, n, seed=7):
+    rng = random.Random(seed)
+    orders = [make_order(i, rng) for i in range(n)]
+    table = add_partition_columns(pa.Table.from_pylist(orders, schema=OLIST_SCHEMAS["orders"]))
+    pq.write_to_dataset(table, os.path.join(root, "orders"), partition_cols=["year", "month", "day"])
+    items = pa.table({"order_id": [o["order_id"] for o in orders],
+                      "price": [round(rng.uniform(5, 500), 2) for _ in orders]})
+    os.makedirs(os.path.join(root, "order_items"))
+    pq.write_table(items, os.path.join(root, "order_items", "part-0.parquet"))
+
+
+def per_rule(engine):
+    seconds, scanned, queries = 0.0, 0, 0
+    for rule in OLIST_LOGISTICS_RULES:
+        table = rule["meta"]["table"]
+        sql, _ = compile_suite_sql(engine.relation(table), [rule])
+        _, stats = engine.run(sql, table, set(rule_columns(rule["kwargs"])))
+        seconds += stats["query_seconds"]
+        scanned += stats["bytes_scanned"]
+        queries += 1
+    return {"queries": queries, "query_seconds": round(seconds, 3), "bytes_scanned": scanned}
+
+
+def single(engine, partitions=None):
+    report = run_pushdown_validation(engine, partitions)
+    tables = report["tables"].values()
+    return {"queries": len(report["tables"]), "query_seconds": round(sum(t["query_seconds"] for t in tables), 3),
+            "bytes_scanned": sum(t["bytes_scanned"] for t in tables), "rows": sum(t["rows"] for t in tables)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQL pushdown validation benchmark (DuckDB)")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    root = os.path.join(args.workdir, f"bench_silver_{args.rows}")
+    if not os.path.exists(root):
+        write_silver(root, args.rows)
+    engine = DuckDBEngine(root)
+    partitions = date_range(date(2018, 1, 1), date(2018, 1, args.days))
+    single(engine)  # warm the file listing and Parquet footers
+    results = {"per_rule": per_rule(engine), "single_query": single(engine),
+               "single_pruned": single(engine, partitions)}
+    base = results["per_rule"]
+    for row in results.values():
+        row["time_ratio_vs_per_rule"] = round(row["query_seconds"] / base["query_seconds"], 3)
+        row["bytes_ratio_vs_per_rule"] = round(row["bytes_scanned"] / base["bytes_scanned"], 3)
+    print(json.dumps({"rows": args.rows, "days": args.days, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
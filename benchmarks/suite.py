@@ -0,0 +1,211 @@
+# suite.py
+# Keystone Nexus - End-to-end pipeline benchmark suite
+#
+# Runs the three hot paths on synthetic Olist `orders` data at several scales,
+# each (path, scale) in a fresh subprocess so peak RSS is its own:
+#   bronze    CSV -> Parquet -> "upload" via process_file_to_bronze, with the
+#             S3 upload replaced by a copy into a temporary directory
+#   silver    FakeConsumer -> run_consumer/process_batch (decode, validate,
+#             partitioned Parquet) into a temporary directory
+#   producer  replay() through MSKProducer into FakeKafkaProducer
+# and reports records/s, MB/s, peak RSS and p50/p99 latency (bronze: per file,
+# silver: per flushed batch, producer: per delivered record) as JSON.
+# Save a run with --output and pass it to --compare on a later commit to get
+# the ratios (> 1 is faster / larger).
+#
+#   python -m benchmarks.suite --scales 10000,100000 --output before.json
+#   python -m benchmarks.suite --scales 10000,100000 --compare before.json
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PATHS = ("bronze", "silver", "producer")
+BRONZE_FILES = 4
+
+
+def percentiles_ms(seconds):
+    values = sorted(seconds)
+    if not values:
+        return {}
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+    return {"p50": pick(0.50), "p99": pick(0.99)}
+
+
+def make_orders(n, seed=7):
+    from src.streaming.fakes import make_order
+    rng = random.Random(seed)
+    return [make_order(i, rng) for i in range(n)]
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+# ==========================================
+# 1. PATHS (run inside the child process)
+# ==========================================
+def bench_bronze(n, workdir):
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    from src.ingestion import ingest_to_bronze as bronze
+
+    bucket = os.path.join(workdir, "bronze")
+
+    def upload_to_local(file_path, bucket_name, object_name, s3_client=None):
+        target = os.path.join(bucket, bucket_name, object_name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(file_path, target)
+
+    # Local stand-in for the S3 bucket
+    bronze.upload_to_s3 = upload_to_local
+    orders = make_orders(n)
+    paths = []
+    per_file = -(-n // BRONZE_FILES)
+    for i in range(0, n, per_file):
+        path = os.path.join(workdir, f"orders_{i}.csv")
+        pv.write_csv(pa.Table.from_pylist(orders[i:i + per_file]), path)
+        paths.append(path)
+    del orders
+
+    latencies = []
+    start = time.perf_counter()
+    for path in paths:
+        file_start = time.perf_counter()
+        assert bronze.process_file_to_bronze(path, "orders", streaming=True, in_memory=False)
+        latencies.append(time.perf_counter() - file_start)
+    seconds = time.perf_counter() - start
+    return seconds, sum(os.path.getsize(p) for p in paths), percentiles_ms(latencies)
+
+
+def bench_silver(n, workdir):
+    from src.ingestion.olist_lakehouse_enterprise import process_batch, run_consumer
+    from src.streaming.fakes import FakeConsumer
+
+    payloads = [json.dumps(order).encode("utf-8") for order in make_orders(n)]
+    consumer = FakeConsumer({p: payloads[p::8] for p in range(8)})
+    latencies = []
+
+    def timed_handler(messages, writer):
+        batch_start = time.perf_counter()
+        ok = process_batch(messages, writer)
+        latencies.append(time.perf_counter() - batch_start)
+        return ok
+
+    start = time.perf_counter()
+    # About ten flushes per run, so the batch latency percentiles have samples
+    metrics = run_consumer(consumer, max_records=max(1000, n // 10), stop_on_idle=True, handler=timed_handler)
+    seconds = time.perf_counter() - start
+    assert metrics["records"] == n, metrics
+    return seconds, metrics["bytes"], percentiles_ms(latencies)
+
+
+def bench_producer(n, workdir, latency_ms=2.0):
+    import logging
+    from src.streaming.fakes import FakeKafkaProducer
+    from src.streaming.msk_producer import MSKProducer
+    from src.streaming.replay_producer import replay
+
+    logging.getLogger("src.streaming.msk_producer").setLevel(logging.ERROR)
+    logging.getLogger("src.streaming.replay_producer").setLevel(logging.WARNING)
+    producer = MSKProducer("fake:9092", producer_factory=lambda **c: FakeKafkaProducer(
+        request_latency_s=latency_ms / 1000, **c))
+    orders = make_orders(n)
+
+    start = time.perf_counter()
+    summary = replay(producer, orders, progress_interval_s=3600)
+    seconds = time.perf_counter() - start
+    assert summary["delivered"] == n, summary
+    latency_ms = {q: summary["latency_ms"][q] for q in ("p50", "p99")}
+    return seconds, producer.producer.bytes_sent, latency_ms
+
+
+def run_child(path, n):
+    workdir = tempfile.mkdtemp(prefix=f"bench_{path}_")
+    # Read when the consumer module is imported
+    os.environ.update(SILVER_ORDERS_PATH=os.path.join(workdir, "silver"), DLQ_ORDERS_PATH=os.path.join(workdir, "dlq"),
+                      SILVER_ROLLING_WRITER="false", LAKEHOUSE_LOG_LEVEL="WARNING")
+    import logging
+    logging.disable(logging.INFO)
+    try:
+        seconds, size, latency_ms = {"bronze": bench_bronze, "silver": bench_silver, "producer": bench_producer}[path](n, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps({
+        "path": path,
+        "records": n,
+        "seconds": round(seconds, 3),
+        "records_per_s": round(n / seconds),
+        "mb_per_s": round(size / seconds / 2**20, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "latency_ms": latency_ms,
+    }))
+
+
+# ==========================================
+# 2. DRIVER
+# ==========================================
+def git_commit():
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return proc.stdout.strip() or None
+
+
+def compare(results, baseline):
+    """Ratios of this run to `baseline` per (path, records): throughput up is good, RSS and latency down is good."""
+    previous = {(r["path"], r["records"]): r for r in baseline["results"] if "error" not in r}
+    rows = []
+    for r in results:
+        before = previous.get((r["path"], r["records"]))
+        if before is None or "error" in r:
+            continue
+        row = {"path": r["path"], "records": r["records"]}
+        for key in ("records_per_s", "mb_per_s", "peak_rss_mb"):
+            row[key] = round(r[key] / before[key], 2) if before[key] else None
+        for q, value in r["latency_ms"].items():
+            old = before["latency_ms"].get(q)
+            row[f"latency_{q}"] = round(value / old, 2) if old else None
+        rows.append(row)
+    return {"baseline_commit": baseline.get("commit"), "ratios": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark suite")
+    parser.add_argument("--scales", default="10000,100000", help="Records per run")
+    parser.add_argument("--paths", default=",".join(PATHS))
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    parser.add_argument("--child", nargs=2, metavar=("PATH", "RECORDS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]))
+        return
+
+    results = []
+    for path in args.paths.split(","):
+        for n in (int(x) for x in args.scales.split(",")):
+            proc = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--child", path, str(n)],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                results.append({"path": path, "records": n, "error": proc.stderr.strip().splitlines()[-1:]})
+            else:
+                results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    report = {"commit": git_commit(), "python": sys.version.split()[0], "cpu_count": os.cpu_count(), "results": results}
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(results, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 from airflow import DAG
-from airflow.operators.python import PythonOperator, BranchPythonOperator
+from airflow.operators.python import PythonOperator
 from airflow.providers.amazon.aws.hooks.s3 import S3Hook
 from airflow.utils.trigger_rule import TriggerRule
 from datetime import datetime, timedelta
 import logging
+import os
 
 # ==========================================
 # 1. CONFIGURATION
@@ -20,49 +21,109 @@ SILVER_BUCKET = "olist-data-lake-silver"
 QUARANTINE_BUCKET = "olist-data-lake-quarantine"
 GOLD_BUCKET = "olist-data-lake-gold"
 
+# Silver orders as written by the lakehouse consumers (year=/month=/day= partitions)
+SILVER_ORDERS_PREFIX = "orders/"
+# Partitions validated at the same time (mapped task instances)
+VALIDATION_PARALLELISM = int(os.getenv("VALIDATION_PARALLELISM", "8"))
+
 # ==========================================
 # 2. CUSTOM RESILIENCE LOGIC
 # ==========================================
-def validate_and_route(**kwargs):
+def discover_new_partitions(**kwargs):
     """
-    Simulates Great Expectations (GX) validation logic.
-    Returns the task_id to follow based on validation success.
+    Lists the Silver order files that landed during this run's data interval
+    and groups them by date partition, one entry per mapped validation task.
+    Work therefore follows what arrived since the last run, not the table size.
+    Files rewritten by the quarantine splitter are new objects too, but they
+    were validated by the run that split them, so they are skipped.
     """
-    ti = kwargs['ti']
-    # In production, pull actual validation results from XCom (GX Operator)
-    # For this implementation, we check if the Silver file exists and is valid
+    from src.validation.quarantine_splitter import is_rewritten
+    from src.validation.sql_pushdown import group_files_by_partition
+
     s3_hook = S3Hook(aws_conn_id='aws_default')
-    object_key = 'cleansed/orders/latest.parquet'
-    
-    validation_passed = s3_hook.check_for_key(object_key, SILVER_BUCKET)
-    
-    if validation_passed:
-        logging.info(f"✅ Validation PASSED for {object_key}. Routing to Gold aggregation.")
-        return 'aggregate_to_gold'
+    keys = s3_hook.list_keys(
+        bucket_name=SILVER_BUCKET,
+        prefix=SILVER_ORDERS_PREFIX,
+        from_datetime=kwargs['data_interval_start'],
+        to_datetime=kwargs['data_interval_end'],
+    )
+    partitions = group_files_by_partition(key for key in keys if key.endswith('.parquet') and not is_rewritten(key))
+    logging.info(f"🔎 {sum(len(k) for _, k in partitions)} new files in {len(partitions)} Silver partitions.")
+    return [{'partition': day.isoformat(), 'object_keys': partition_keys} for day, partition_keys in partitions]
+
+def validate_and_route(partition, object_keys, **kwargs):
+    """
+    Runs the olist_logistics_rules suite on Athena over one partition's new
+    files (one aggregate query, src/validation/sql_pushdown.py) and routes
+    that partition on its own, so one bad partition does not block the rest.
+    The partition is registered in the Glue catalog first: Athena cannot see
+    a day the catalog does not list, and an empty scan would pass every rule.
+    When rules fail, only the failing rows are moved to quarantine and the
+    partition continues to Gold with the rest.
+    """
+    from src.validation.sql_pushdown import AthenaEngine, run_pushdown_validation
+
+    day = datetime.strptime(partition, '%Y-%m-%d').date()
+    files = [f"s3://{SILVER_BUCKET}/{key}" for key in object_keys]
+    engine = AthenaEngine()
+    engine.register_partitions('orders', [day])
+    report = run_pushdown_validation(engine, [day], tables={'orders'}, files=files)
+    orders = report['tables']['orders']
+    if object_keys and not orders['rows']:
+        raise ValueError(f"Validation of {partition} scanned 0 rows from {len(object_keys)} new files; "
+                         f"check the partition is registered and the file paths match.")
+
+    quarantined = 0
+    if report['success']:
+        logging.info(f"✅ Validation PASSED for {partition} ({orders['rows']} rows). Routing to Gold aggregation.")
     else:
-        logging.warning(f"❌ Validation FAILED for {object_key}. Routing to Quarantine.")
-        return 'move_to_quarantine'
+        logging.warning(f"❌ Validation FAILED for {partition}: {orders['failures']}. Quarantining failing rows.")
+        quarantined = quarantine_data(SILVER_BUCKET, QUARANTINE_BUCKET, object_keys, ds=kwargs['ds'])
+    return {'partition': partition, 'files': len(object_keys), 'rows': orders['rows'],
+            'quarantined_rows': quarantined, 'failures': orders['failures']}
 
-def quarantine_data(bucket_name, quarantine_bucket, object_key, **kwargs):
+def quarantine_data(bucket_name, quarantine_bucket, object_keys, ds, **kwargs):
     """
-    Moves corrupted or invalid Parquet files to a dedicated quarantine bucket.
-    Prevents the Silver bucket from becoming cluttered with rejected data.
+    Splits the given Silver files row by row (src/validation/quarantine_splitter.py):
+    failing rows, annotated with the rules they broke, go to the quarantine
+    bucket under the same partition path; passing rows stay in Silver.
+    Returns the number of quarantined rows.
     """
-    s3_hook = S3Hook(aws_conn_id='aws_default')
-    new_key = f"rejected/{datetime.now().strftime('%Y-%m-%d')}/{object_key.split('/')[-1]}"
-    
-    logging.info(f"🚀 Moving corrupted data: {object_key} -> {quarantine_bucket}/{new_key}")
-    
-    s3_hook.copy_object(
-        source_bucket_key=object_key,
-        dest_bucket_key=new_key,
-        source_bucket_name=bucket_name,
-        dest_bucket_name=quarantine_bucket
-    )
-    
-    # After copy, delete from Silver to keep it clean
-    s3_hook.delete_objects(bucket_name, [object_key])
-    logging.info("🧹 Silver bucket cleansed of rejected data.")
+    from src.validation.quarantine_splitter import split_files
+
+    results = split_files(f"s3://{bucket_name}", object_keys, f"s3://{quarantine_bucket}", prefix=f"rejected/{ds}")
+    quarantined = sum(r['quarantined'] for r in results)
+    logging.info(f"🧹 Moved {quarantined} failing rows from {len(object_keys)} files to {quarantine_bucket}; "
+                 f"kept {sum(r['rows'] for r in results) - quarantined} rows in Silver.")
+    return quarantined
+
+def validation_results(ti):
+    """Results of the mapped validation tasks (instances that failed return nothing)."""
+    return [r for r in ti.xcom_pull(task_ids='validate_and_route_partition') or [] if r]
+
+def aggregate_to_gold(**kwargs):
+    """
+    Rebuilds Gold fact_sales for the validated partitions in-process with
+    DuckDB (src/gold/fact_sales.py), reading only those Silver partitions
+    and replacing the matching date_key partitions in Gold.
+    """
+    from src.gold.fact_sales import build_fact_sales
+
+    partitions = [r['partition'] for r in validation_results(kwargs['ti'])]
+    if not partitions:
+        logging.info("No validated partitions to aggregate.")
+        return
+    logging.info(f"🏆 Transforming Silver to Gold Star Schema for {len(partitions)} partitions: {partitions}")
+    days = [datetime.strptime(p, '%Y-%m-%d').date() for p in partitions]
+    summary = build_fact_sales(days, silver_root=f"s3://{SILVER_BUCKET}", gold_root=f"s3://{GOLD_BUCKET}/fact_sales")
+    logging.info(f"🏆 fact_sales: {summary['rows']} rows written in {summary['total_seconds']}s.")
+    return summary
+
+def pipeline_summary(**kwargs):
+    results = validation_results(kwargs['ti'])
+    quarantined = sum(r['quarantined_rows'] for r in results)
+    logging.info(f"📋 Daily Medallion Run Complete: {len(results)} partitions to Gold, "
+                 f"{quarantined} rows quarantined.")
 
 # ==========================================
 # 3. DAG DEFINITION
@@ -76,37 +137,33 @@ with DAG(
     tags=['medallion', 'resilience', 'quarantine'],
 ) as dag:
 
-    # 1. Validation Step (Conceptual GX Integration)
-    validate_step = BranchPythonOperator(
-        task_id='validate_and_route_data',
-        python_callable=validate_and_route,
-        provide_context=True,
+    # 1. Discover the Silver partitions that received files in this interval
+    discover_step = PythonOperator(
+        task_id='discover_new_partitions',
+        python_callable=discover_new_partitions,
     )
 
-    # 2. Success Path: Move to Gold
+    # 2. Validate and route each partition independently (one mapped task per partition;
+    #    failing rows are split out to quarantine by that partition's task)
+    validate_step = PythonOperator.partial(
+        task_id='validate_and_route_partition',
+        python_callable=validate_and_route,
+        max_active_tis_per_dag=VALIDATION_PARALLELISM,
+    ).expand(op_kwargs=discover_step.output)
+
+    # 3. Success Path: Move the partitions that passed to Gold
     aggregate_gold = PythonOperator(
         task_id='aggregate_to_gold',
-        python_callable=lambda: logging.info("🏆 Transforming Silver to Gold Star Schema..."),
-    )
-
-    # 3. Failure Path: Dead Letter Quarantine
-    quarantine_step = PythonOperator(
-        task_id='move_to_quarantine',
-        python_callable=quarantine_data,
-        op_kwargs={
-            'bucket_name': SILVER_BUCKET,
-            'quarantine_bucket': QUARANTINE_BUCKET,
-            'object_key': 'cleansed/orders/latest.parquet'
-        },
+        python_callable=aggregate_to_gold,
+        trigger_rule=TriggerRule.ALL_DONE
     )
 
-    # 4. Final Notification (Runs regardless of which path was taken)
-    pipeline_summary = PythonOperator(
+    # 4. Final Notification (Runs regardless of how each partition fared)
+    summary_step = PythonOperator(
         task_id='pipeline_summary',
-        python_callable=lambda: logging.info("📋 Daily Medallion Run Complete."),
+        python_callable=pipeline_summary,
         trigger_rule=TriggerRule.ALL_DONE
     )
 
     # DAG Dependency Graph
-    validate_step >> [aggregate_gold, quarantine_step]
-    [aggregate_gold, quarantine_step] >> pipeline_summary
+    discover_step >> validate_step >> aggregate_gold >> summary_step
@@ -0,0 +1,57 @@
+{#
+    Date range, partition and row filters for the date_key partitioned Gold facts.
+
+    The range comes from --vars:
+      start_date / end_date (YYYY-MM-DD, inclusive)  e.g. a month backfill
+      target_year / target_month / target_day       a single day (older runs)
+    and defaults to the day the run started.
+
+      dbt run -s fact_sales --vars '{start_date: 2018-01-01, end_date: 2018-01-31}'
+#}
+
+{% macro gold_date_range() %}
+    {%- if var('target_year', none) is not none -%}
+        {%- set default = '%04d-%02d-%02d' % (var('target_year') | int, var('target_month') | int, var('target_day') | int) -%}
+    {%- else -%}
+        {%- set default = run_started_at.strftime('%Y-%m-%d') -%}
+    {%- endif -%}
+    {%- set start_date = modules.datetime.datetime.strptime(var('start_date', default) | string, '%Y-%m-%d').date() -%}
+    {%- set end_date = modules.datetime.datetime.strptime(var('end_date', start_date.isoformat()) | string, '%Y-%m-%d').date() -%}
+    {%- if end_date < start_date -%}
+        {{ exceptions.raise_compiler_error("end_date " ~ end_date ~ " is before start_date " ~ start_date) }}
+    {%- endif -%}
+    {{ return((start_date, end_date)) }}
+{% endmacro %}
+
+
+{#
+    Limits a fact to the dates of the range. `date_expression` is the
+    expression date_key is derived from, so the rows produced are exactly the
+    date_key partitions insert_overwrite replaces. Bronze is not partitioned,
+    so this filters rows rather than pruning files.
+#}
+{% macro date_range_filter(date_expression) %}
+    {%- set start_date, end_date = gold_date_range() -%}
+    {{ date_expression }} BETWEEN DATE '{{ start_date }}' AND DATE '{{ end_date }}'
+{% endmacro %}
+
+
+{#
+    year/month/day predicate covering the range, one term per month, so
+    Athena only lists and reads those source partitions. Use it alongside
+    date_range_filter, which keeps the rows exact.
+#}
+{% macro partition_range_filter(alias) %}
+    {%- set start_date, end_date = gold_date_range() -%}
+    {%- set months = (end_date.year - start_date.year) * 12 + end_date.month - start_date.month -%}
+    {%- set terms = [] -%}
+    {%- for i in range(months + 1) -%}
+        {%- set year = start_date.year + (start_date.month - 1 + i) // 12 -%}
+        {%- set month = (start_date.month - 1 + i) % 12 + 1 -%}
+        {%- set first_day = start_date.day if i == 0 else 1 -%}
+        {%- set last_day = end_date.day if i == months else 31 -%}
+        {%- do terms.append("(" ~ alias ~ ".year = " ~ year ~ " AND " ~ alias ~ ".month = " ~ month
+                            ~ " AND " ~ alias ~ ".day BETWEEN " ~ first_day ~ " AND " ~ last_day ~ ")") -%}
+    {%- endfor -%}
+    ({{ terms | join(' OR ') }})
+{% endmacro %}
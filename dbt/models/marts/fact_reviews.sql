@@ -1,7 +1,10 @@
 {{
     config(
         materialized='incremental',
-        incremental_strategy='append',
+        incremental_strategy='insert_overwrite',
+        partitioned_by=['date_key'],
+        table_type='hive',
+        format='parquet',
         on_schema_change='fail'
     )
 }}
@@ -20,12 +23,13 @@ SELECT
     r.review_score,
     r.review_comment_title,
     r.review_comment_message,
-    CAST(FORMAT(CAST(r.review_creation_timestamp AS DATE), 'yyyyMMdd') AS INT) AS date_key,
     r.review_creation_timestamp,
-    r.review_answer_timestamp
+    r.review_answer_timestamp,
+    -- Partition column, last as Athena requires
+    CAST(FORMAT(CAST(r.review_creation_timestamp AS DATE), 'yyyyMMdd') AS INT) AS date_key
 FROM reviews r
 LEFT JOIN orders o ON r.id = o.id
--- ATHENA PARTITIONING: Filter by year/month/day to minimize scan costs
-WHERE r.year = {{ var('target_year', format_date(current_timestamp(), '%Y')) }}
-  AND r.month = {{ var('target_month', format_date(current_timestamp(), '%m')) }}
-  AND r.day = {{ var('target_day', format_date(current_timestamp(), '%d')) }}
+-- Review creation dates of the range (start_date/end_date vars): the year/month/day
+-- predicate prunes the staging source, the derived-date filter matches date_key exactly
+WHERE {{ partition_range_filter('r') }}
+  AND {{ date_range_filter('CAST(r.review_creation_timestamp AS DATE)') }}
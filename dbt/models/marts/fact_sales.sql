@@ -1,7 +1,10 @@
 {{
     config(
         materialized='incremental',
-        incremental_strategy='append',
+        incremental_strategy='insert_overwrite',
+        partitioned_by=['date_key'],
+        table_type='hive',
+        format='parquet',
         on_schema_change='fail'
     )
 }}
@@ -30,18 +33,17 @@ SELECT
     o.customer_id,
     oi.product_id,
     oi.seller_id,
-    CAST(FORMAT(CAST(o.order_purchase_timestamp AS DATE), 'yyyyMMdd') AS INT) AS date_key,
     oi.price,
     oi.freight_value,
     (oi.price + oi.freight_value) AS total_order_item_value,
     p.total_payment_value,
     p.max_payment_installments,
-    DATE_DIFF('day', CAST(o.order_purchase_timestamp AS DATE), CAST(o.order_delivered_customer_date AS DATE)) AS delivery_lag_days
+    DATE_DIFF('day', CAST(o.order_purchase_timestamp AS DATE), CAST(o.order_delivered_customer_date AS DATE)) AS delivery_lag_days,
+    -- Partition column, last as Athena requires; insert_overwrite replaces only the date_keys produced
+    CAST(FORMAT(CAST(o.order_purchase_timestamp AS DATE), 'yyyyMMdd') AS INT) AS date_key
 FROM orders o
 JOIN order_items oi ON o.order_id = oi.order_id
 LEFT JOIN payments p ON o.order_id = p.order_id
 WHERE o.order_status = 'delivered'
-  -- ATHENA PARTITIONING: Filter by year/month/day to minimize scan costs
-  AND o.year = {{ var('target_year', format_date(current_timestamp(), '%Y')) }}
-  AND o.month = {{ var('target_month', format_date(current_timestamp(), '%m')) }}
-  AND o.day = {{ var('target_day', format_date(current_timestamp(), '%d')) }}
+  -- Purchase dates of the range (start_date/end_date vars); stg_orders keeps its table-wide dedup
+  AND {{ date_range_filter('CAST(o.order_purchase_timestamp AS DATE)') }}
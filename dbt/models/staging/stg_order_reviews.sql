@@ -11,6 +11,10 @@ SELECT
     review_comment_title,
     review_comment_message,
     CAST(review_creation_date AS TIMESTAMP) as review_creation_timestamp,
-    CAST(review_answer_timestamp AS TIMESTAMP) as review_answer_timestamp
+    CAST(review_answer_timestamp AS TIMESTAMP) as review_answer_timestamp,
+    -- Partition keys of the review creation date; Bronze has no year/month/day columns
+    YEAR(CAST(review_creation_date AS TIMESTAMP)) as year,
+    MONTH(CAST(review_creation_date AS TIMESTAMP)) as month,
+    DAY(CAST(review_creation_date AS TIMESTAMP)) as day
 FROM raw_reviews
 WHERE review_id IS NOT NULL
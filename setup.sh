@@ -109,6 +109,18 @@ S3_SILVER_BUCKET=olist-data-lake-silver
 S3_GOLD_BUCKET=olist-data-lake-gold
 S3_QUARANTINE_BUCKET=olist-data-lake-quarantine
 
+# S3 Client Tuning (connection pool & multipart uploads)
+S3_MAX_POOL_CONNECTIONS=32
+S3_MULTIPART_THRESHOLD_MB=64
+S3_MULTIPART_CHUNKSIZE_MB=16
+S3_MAX_CONCURRENCY=8
+
+# Bronze Ingestion
+BRONZE_STREAMING=false
+BRONZE_MAX_MEMORY_MB=256
+BRONZE_IN_MEMORY=false
+BRONZE_SPOOL_MAX_MB=128
+
 # Database (RDS PostgreSQL for Airflow)
 DB_HOST=localhost
 DB_PORT=5432
@@ -150,7 +162,7 @@ echo ""
 echo "Next Steps:"
 echo "1. Edit .env file with your AWS credentials"
 echo "2. Download Olist dataset to data/ directory"
-echo "3. Run ingestion script: python src/ingestion/ingest_to_bronze.py"
+echo "3. Run ingestion script: python -m src.ingestion.ingest_to_bronze"
 echo "4. Setup dbt project: dbt init"
 echo "5. Configure Airflow: airflow db init"
 echo ""
@@ -0,0 +1,210 @@
+# fact_sales.py
+# Keystone Nexus - Gold fact_sales from partition-pruned Silver, without Athena
+# Builds the same rows as dbt/models/marts/fact_sales.sql (orders joined to
+# their items, payments aggregated per order, date_key and delivery_lag_days)
+# with DuckDB in-process. Silver orders are scanned through a pyarrow dataset,
+# so only the target year/month/day partitions are read; order items and
+# payments come from Bronze and are limited to those orders. Output is Gold
+# Parquet partitioned by date_key, and every requested day is replaced as a
+# whole (staged first, then swapped in), so daily runs and backfills can be
+# rerun safely. Roots are local paths or URIs (s3://...).
+#
+#   python -m src.gold.fact_sales --date 2018-01-02
+#   python -m src.gold.fact_sales --silver-root /tmp/silver --bronze-root /tmp/bronze --gold-root /tmp/gold \
+#       --start 2018-01-01 --end 2018-01-31
+import argparse
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import date
+
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from src.ingestion.rolling_parquet_writer import resolve_filesystem
+from src.validation.sql_pushdown import date_range, partition_predicate
+
+logger = logging.getLogger(__name__)
+
+GOLD_SILVER_ROOT = os.getenv("GOLD_SILVER_ROOT", "s3://olist-data-lake-silver")
+GOLD_BRONZE_ROOT = os.getenv("GOLD_BRONZE_ROOT", "s3://olist-data-lake-bronze/raw")
+GOLD_ROOT = os.getenv("GOLD_ROOT", "s3://olist-data-lake-gold/fact_sales")
+GOLD_DUCKDB_THREADS = int(os.getenv("GOLD_DUCKDB_THREADS", str(os.cpu_count() or 1)))
+
+
+# ==========================================
+# 1. SQL (mirrors the dbt staging and mart models)
+# ==========================================
+# CAST(... AS TIMESTAMP) before AS DATE because Bronze/Silver keep the raw
+# 'YYYY-MM-DD HH:MM:SS' strings; date_key is FORMAT(..., 'yyyyMMdd') in dbt.
+FACT_SALES_SQL = """
+WITH orders AS (
+    SELECT *
+    FROM silver_orders
+    WHERE order_id IS NOT NULL
+      AND ({partitions})
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY order_id ORDER BY order_purchase_timestamp DESC) = 1
+),
+
+order_items AS (
+    SELECT
+        order_id,
+        order_item_id,
+        product_id,
+        seller_id,
+        CAST(price AS DOUBLE) AS price,
+        CAST(freight_value AS DOUBLE) AS freight_value
+    FROM bronze_order_items
+    WHERE order_id IN (SELECT order_id FROM orders)
+),
+
+payments AS (
+    SELECT
+        order_id,
+        SUM(CAST(payment_value AS DOUBLE)) AS total_payment_value,
+        MAX(payment_installments) AS max_payment_installments
+    FROM bronze_order_payments
+    WHERE order_id IN (SELECT order_id FROM orders)
+    GROUP BY 1
+)
+
+SELECT
+    o.order_id,
+    oi.order_item_id,
+    o.customer_id,
+    oi.product_id,
+    oi.seller_id,
+    CAST(strftime(CAST(CAST(o.order_purchase_timestamp AS TIMESTAMP) AS DATE), '%Y%m%d') AS INTEGER) AS date_key,
+    oi.price,
+    oi.freight_value,
+    (oi.price + oi.freight_value) AS total_order_item_value,
+    p.total_payment_value,
+    p.max_payment_installments,
+    date_diff('day', CAST(CAST(o.order_purchase_timestamp AS TIMESTAMP) AS DATE),
+              CAST(CAST(o.order_delivered_customer_date AS TIMESTAMP) AS DATE)) AS delivery_lag_days
+FROM orders o
+JOIN order_items oi ON o.order_id = oi.order_id
+LEFT JOIN payments p ON o.order_id = p.order_id
+WHERE o.order_status = 'delivered'
+"""
+
+
+def fact_sales_sql(partitions):
+    """The fact_sales query limited to the Silver `partitions` (dates)."""
+    return FACT_SALES_SQL.format(partitions=partition_predicate(partitions))
+
+
+def date_key(day):
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+# ==========================================
+# 2. BUILD
+# ==========================================
+def _dataset(root, table, partitioning=None):
+    filesystem, path = resolve_filesystem(root)
+    return ds.dataset(f"{path}/{table}", filesystem=filesystem, format="parquet", partitioning=partitioning)
+
+
+def compute_fact_sales(partitions, silver_root=GOLD_SILVER_ROOT, bronze_root=GOLD_BRONZE_ROOT, threads=GOLD_DUCKDB_THREADS):
+    """
+    Runs the fact_sales query over Silver orders (year/month/day partitions
+    pruned to `partitions`) and Bronze order_items/order_payments.
+    Returns the rows as a pyarrow Table, ordered by date_key, order_id and order_item_id.
+
+    Orders are deduplicated within the target partitions; Silver partitions
+    by purchase date, so that is every copy of an order unless its purchase
+    timestamp changed between copies.
+    """
+    import duckdb
+
+    con = duckdb.connect()
+    try:
+        con.execute(f"SET threads = {threads}")
+        con.register("silver_orders", _dataset(silver_root, "orders", partitioning="hive"))
+        con.register("bronze_order_items", _dataset(bronze_root, "order_items"))
+        con.register("bronze_order_payments", _dataset(bronze_root, "order_payments"))
+        sql = fact_sales_sql(partitions) + "ORDER BY date_key, order_id, order_item_id"
+        return con.execute(sql).to_arrow_table()
+    finally:
+        con.close()
+
+
+def _parquet_files(filesystem, directory):
+    if filesystem.get_file_info(directory).type != pafs.FileType.Directory:
+        return []
+    return [info.path for info in filesystem.get_file_info(pafs.FileSelector(directory))
+            if info.type == pafs.FileType.File and info.base_name.endswith(".parquet")]
+
+
+def write_fact_sales(table, partitions, gold_root=GOLD_ROOT):
+    """
+    Replaces the date_key=YYYYMMDD partitions of `partitions` under
+    `gold_root` with `table`. The build is written to a `_staging-*` prefix
+    (hidden from Athena) first; only then are its files moved into each
+    partition and the previous files deleted. A failed build therefore
+    leaves Gold as it was, and readers never see a day empty (at worst both
+    versions, briefly). A day without delivered orders ends up empty rather
+    than stale.
+    """
+    filesystem, path = resolve_filesystem(gold_root)
+    build_id = uuid.uuid4().hex
+    staging = f"{path}/_staging-{build_id}"
+    if table.num_rows:
+        pq.write_to_dataset(table, staging, filesystem=filesystem, partition_cols=["date_key"],
+                            basename_template=f"part-{build_id}-{{i}}.parquet")
+
+    for day in partitions:
+        partition_path = f"{path}/date_key={date_key(day)}"
+        previous = _parquet_files(filesystem, partition_path)
+        staged = _parquet_files(filesystem, f"{staging}/date_key={date_key(day)}")
+        if staged:
+            filesystem.create_dir(partition_path, recursive=True)
+        for staged_file in staged:
+            filesystem.move(staged_file, f"{partition_path}/{staged_file.rsplit('/', 1)[1]}")
+        for previous_file in previous:
+            filesystem.delete_file(previous_file)
+        if not staged and previous:
+            filesystem.delete_dir(partition_path)
+    if filesystem.get_file_info(staging).type == pafs.FileType.Directory:
+        filesystem.delete_dir(staging)
+
+
+def build_fact_sales(partitions, silver_root=GOLD_SILVER_ROOT, bronze_root=GOLD_BRONZE_ROOT, gold_root=GOLD_ROOT):
+    """Computes and writes fact_sales for `partitions` (dates). Returns a summary."""
+    partitions = sorted(set(partitions))
+    start = time.perf_counter()
+    table = compute_fact_sales(partitions, silver_root, bronze_root)
+    computed = time.perf_counter() - start
+    write_fact_sales(table, partitions, gold_root)
+    summary = {
+        "partitions": [d.isoformat() for d in partitions],
+        "rows": table.num_rows,
+        "gold_root": gold_root,
+        "compute_seconds": round(computed, 3),
+        "total_seconds": round(time.perf_counter() - start, 3),
+    }
+    logger.info(f"Built fact_sales for {len(partitions)} partitions: {table.num_rows} rows "
+                f"in {summary['total_seconds']}s")
+    return summary
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build Gold fact_sales from Silver with DuckDB")
+    parser.add_argument("--date", action="append", type=date.fromisoformat, help="Partition to build (repeatable)")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    parser.add_argument("--silver-root", default=GOLD_SILVER_ROOT)
+    parser.add_argument("--bronze-root", default=GOLD_BRONZE_ROOT)
+    parser.add_argument("--gold-root", default=GOLD_ROOT)
+    args = parser.parse_args()
+
+    partitions = list(args.date or [])
+    if args.start:
+        partitions += date_range(args.start, args.end or args.start)
+    print(json.dumps(build_fact_sales(partitions or [date.today()], args.silver_root, args.bronze_root,
+                                      args.gold_root), indent=2))
@@ -0,0 +1,305 @@
+# batch_validation.py
+# Keystone Nexus - Batch decode + JSON Schema validation with a dead-letter output
+# Validating every Kafka record on its own puts a Python call per record (and,
+# with the Glue serde, a schema round trip) on the hot path, and a single bad
+# record fails the whole batch. Here a JSON Schema is compiled once into
+# pyarrow.compute predicates that run over the decoded batch column by column;
+# records that cannot be decoded or break the contract are split off and
+# written to a dead-letter dataset, and the rest of the batch carries on.
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pj
+import pyarrow.parquet as pq
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from src.ingestion.rolling_parquet_writer import resolve_filesystem
+
+logger = logging.getLogger("lakehouse")
+
+QUARANTINE_BUCKET = os.getenv("S3_QUARANTINE_BUCKET", "olist-data-lake-quarantine")
+DLQ_ORDERS_PATH = os.getenv("DLQ_ORDERS_PATH", f"s3://{QUARANTINE_BUCKET}/dlq/orders/")
+
+JSON_TO_ARROW_TYPES = {"string": pa.string(), "integer": pa.int64(), "number": pa.float64(), "boolean": pa.bool_()}
+
+# Keywords compiled into column predicates; anything else is checked per record by `jsonschema`
+SCHEMA_KEYWORDS = {"$schema", "$id", "title", "description", "type", "required", "properties"}
+PROPERTY_KEYWORDS = {"type", "enum", "const", "pattern", "minLength", "maxLength", "minimum", "maximum",
+                     "exclusiveMinimum", "exclusiveMaximum", "title", "description", "format", "default"}
+
+DEAD_LETTER_SCHEMA = pa.schema([
+    ("topic", pa.string()),
+    ("partition", pa.int32()),
+    ("offset", pa.int64()),
+    ("reason", pa.string()),
+    ("payload", pa.binary()),
+    ("rejected_at", pa.timestamp("ms", tz="UTC")),
+])
+
+
+def _types(prop):
+    types = prop.get("type", [])
+    return [types] if isinstance(types, str) else list(types)
+
+
+def arrow_schema_from_json_schema(json_schema):
+    """Arrow schema for the scalar properties of an object JSON Schema (nested ones are left out)."""
+    fields = []
+    for name, prop in json_schema.get("properties", {}).items():
+        scalar = [t for t in _types(prop) if t != "null"]
+        if len(scalar) == 1 and scalar[0] in JSON_TO_ARROW_TYPES:
+            fields.append((name, JSON_TO_ARROW_TYPES[scalar[0]]))
+    return pa.schema(fields)
+
+
+def parse_timestamps(strings, format):
+    """
+    Parses timestamp strings with `format` (to seconds). Values that do not
+    parse, or that do not format back to the same string, come out null:
+    strptime rolls impossible dates like 2018-02-30 over into March instead
+    of rejecting them.
+    """
+    timestamps = pc.strptime(strings, format=format, unit="s", error_is_null=True)
+    exact = pc.equal(pc.strftime(timestamps, format=format), strings)
+    return pc.if_else(exact, timestamps, pa.scalar(None, timestamps.type))
+
+
+# ==========================================
+# 1. COMPILED VALIDATOR
+# ==========================================
+class CompiledSchema:
+    """
+    A JSON Schema compiled once into vectorised checks over an Arrow table.
+
+    Types are enforced by decoding against the matching Arrow schema; the
+    value keywords in PROPERTY_KEYWORDS become pyarrow.compute predicates.
+    Arrow cannot tell a missing field from an explicit null, so `required`
+    is enforced as "not null" unless the property's type allows null.
+    `timestamp_formats` ({column: strptime format}) adds a check that those
+    string columns hold real timestamps, which a `pattern` cannot express.
+    Schemas using other keywords (nested objects, additionalProperties, ...)
+    also get a `jsonschema` validator, run only on records that passed the
+    columnar checks.
+    """
+
+    def __init__(self, json_schema, arrow_schema=None, timestamp_formats=None):
+        self.json_schema = json_schema
+        self.arrow_schema = arrow_schema or arrow_schema_from_json_schema(json_schema)
+        self.checks = self._compile(json_schema) + self._compile_timestamps(timestamp_formats or {})
+        self.fallback = None
+        if self._needs_fallback(json_schema):
+            from jsonschema.validators import validator_for
+            self.fallback = validator_for(json_schema)(json_schema)
+
+    def _compile(self, json_schema):
+        """Returns [(column, reason, predicate(array) -> bool array, nulls_pass)]."""
+        checks = []
+        required = set(json_schema.get("required", []))
+        for name, prop in json_schema.get("properties", {}).items():
+            if name not in self.arrow_schema.names:
+                continue
+            if name in required and "null" not in _types(prop):
+                checks.append((name, "is required", pc.is_valid, False))
+            if "enum" in prop:
+                allowed = pa.array([v for v in prop["enum"] if v is not None], self.arrow_schema.field(name).type)
+                checks.append((name, "is not one of the allowed values", lambda a, s=allowed: pc.is_in(a, value_set=s), True))
+            if "const" in prop:
+                checks.append((name, f"must equal {prop['const']!r}", lambda a, v=prop["const"]: pc.equal(a, v), True))
+            if "pattern" in prop:
+                checks.append((name, f"does not match {prop['pattern']}",
+                               lambda a, p=prop["pattern"]: pc.match_substring_regex(a, p), True))
+            if "minLength" in prop:
+                checks.append((name, f"is shorter than {prop['minLength']}",
+                               lambda a, n=prop["minLength"]: pc.greater_equal(pc.utf8_length(a), n), True))
+            if "maxLength" in prop:
+                checks.append((name, f"is longer than {prop['maxLength']}",
+                               lambda a, n=prop["maxLength"]: pc.less_equal(pc.utf8_length(a), n), True))
+            for keyword, op, reason in (("minimum", pc.greater_equal, "is below"), ("maximum", pc.less_equal, "is above"),
+                                        ("exclusiveMinimum", pc.greater, "is not above"),
+                                        ("exclusiveMaximum", pc.less, "is not below")):
+                if keyword in prop:
+                    checks.append((name, f"{reason} {prop[keyword]}", lambda a, o=op, v=prop[keyword]: o(a, v), True))
+        return checks
+
+    def _compile_timestamps(self, timestamp_formats):
+        return [(name, f"is not a valid {fmt} timestamp", lambda a, f=fmt: pc.is_valid(parse_timestamps(a, f)), True)
+                for name, fmt in timestamp_formats.items()
+                if name in self.arrow_schema.names and pa.types.is_string(self.arrow_schema.field(name).type)]
+
+    def _needs_fallback(self, json_schema):
+        if set(json_schema) - SCHEMA_KEYWORDS:
+            return True
+        properties = json_schema.get("properties", {})
+        return any(set(prop) - PROPERTY_KEYWORDS or name not in self.arrow_schema.names
+                   for name, prop in properties.items())
+
+    def validate(self, table):
+        """Returns (valid mask, {row: reason}) for `table`."""
+        valid = pa.array([True] * table.num_rows)
+        reasons = {}
+        for name, reason, predicate, nulls_pass in self.checks:
+            column = table.column(name)
+            ok = predicate(column)
+            if nulls_pass:
+                # Value keywords do not apply to nulls; `required` decides about those.
+                ok = pc.fill_null(pc.or_kleene(pc.is_null(column), ok), True)
+            failed = pc.indices_nonzero(pc.invert(ok)).to_pylist()
+            if failed:
+                for row in failed:
+                    reasons.setdefault(row, f"{name} {reason}")
+                valid = pc.and_(valid, ok)
+        return valid, reasons
+
+
+# ==========================================
+# 2. DECODE + VALIDATE
+# ==========================================
+def _read_json(payloads, schema, unexpected_field_behavior):
+    return pj.read_json(
+        pa.py_buffer(b"\n".join(payloads)),
+        parse_options=pj.ParseOptions(explicit_schema=schema, unexpected_field_behavior=unexpected_field_behavior),
+    )
+
+
+def decode_json_records(payloads, schema, unexpected_field_behavior="ignore"):
+    """
+    Decodes JSON payloads into one Arrow table, isolating the ones that fail.
+
+    The whole batch is parsed in one call; if that fails, the batch is split
+    in half recursively, so k bad records cost O(k log n) extra parses.
+    Returns (table, row -> payload index, [(payload index, error)]).
+    """
+    tables, rows, errors = [], [], []
+
+    def decode(indices):
+        try:
+            table = _read_json([payloads[i] for i in indices], schema, unexpected_field_behavior)
+            # Blank payloads are skipped by the reader rather than failing it.
+            if table.num_rows == len(indices):
+                tables.append(table)
+                rows.extend(indices)
+                return
+            error = "empty record"
+        except pa.ArrowInvalid as e:
+            error = str(e)
+        if len(indices) == 1:
+            try:
+                # Pretty-printed JSON spans several lines; parse it on its own.
+                table = pa.Table.from_pylist([json.loads(payloads[indices[0]])], schema=schema)
+                tables.append(table)
+                rows.extend(indices)
+            except Exception:
+                errors.append((indices[0], error))
+            return
+        middle = len(indices) // 2
+        decode(indices[:middle])
+        decode(indices[middle:])
+
+    if payloads:
+        decode(list(range(len(payloads))))
+    # Fields inferred outside `schema` may come out typed differently per piece
+    table = pa.concat_tables(tables, promote_options="permissive") if tables else schema.empty_table()
+    return table, rows, errors
+
+
+class ValidationStats:
+    """Per-consumer validation counters, including the cost per record."""
+
+    def __init__(self):
+        self.records = 0
+        self.rejected = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, records, rejected, seconds):
+        with self._lock:
+            self.records += records
+            self.rejected += rejected
+            self.seconds += seconds
+
+    def snapshot(self):
+        return {
+            "validated": self.records,
+            "rejected": self.rejected,
+            "validation_us_per_record": round(self.seconds / self.records * 1e6, 2) if self.records else None,
+        }
+
+
+def validate_messages(messages, compiled, stats=None, payloads=None, unexpected_field_behavior="ignore", serde=None):
+    """
+    Decodes and validates a batch of Kafka messages against `compiled`.
+    `payloads` overrides the raw bodies (e.g. with a wire header removed);
+    `serde` decodes non-JSON values (see src.streaming.serializers).
+    Returns (valid Arrow table, dead letters as [(message, reason)]).
+    """
+    start = time.perf_counter()
+    payloads = payloads if payloads is not None else [msg.value() for msg in messages]
+    if serde is None:
+        table, rows, errors = decode_json_records(payloads, compiled.arrow_schema, unexpected_field_behavior)
+        loads = json.loads
+    else:
+        table, rows, errors = serde.decode_batch(payloads, compiled.arrow_schema, unexpected_field_behavior)
+        loads = serde.loads
+    dead = [(messages[i], f"undecodable: {error}") for i, error in errors]
+
+    valid, reasons = compiled.validate(table)
+    if compiled.fallback is not None:
+        for row, ok in enumerate(valid.to_pylist()):
+            if ok:
+                error = next(compiled.fallback.iter_errors(loads(payloads[rows[row]])), None)
+                if error is not None:
+                    reasons[row] = error.message
+        valid = pa.array([row not in reasons for row in range(table.num_rows)])
+    dead.extend((messages[rows[row]], reason) for row, reason in sorted(reasons.items()))
+    if reasons:
+        table = table.filter(valid)
+
+    if stats is not None:
+        stats.record(len(messages), len(dead), time.perf_counter() - start)
+    return table, dead
+
+
+# ==========================================
+# 3. DEAD-LETTER OUTPUT
+# ==========================================
+def dead_letter_table(dead):
+    """Arrow table of rejected records, keeping the raw payload and its Kafka coordinates."""
+    now = datetime.now(timezone.utc)
+    return pa.Table.from_pylist([
+        {"topic": msg.topic(), "partition": msg.partition(), "offset": msg.offset(), "reason": reason,
+         "payload": msg.value(), "rejected_at": now}
+        for msg, reason in dead
+    ], schema=DEAD_LETTER_SCHEMA)
+
+
+class DeadLetterWriter:
+    """Writes rejected records as Parquet files under `root_path/date=YYYY-MM-DD/`."""
+
+    def __init__(self, root_path=DLQ_ORDERS_PATH, filesystem=None):
+        self.root_path = root_path
+        self.filesystem = filesystem
+        self.root = None
+        self.written = 0
+
+    def write(self, dead):
+        if not dead:
+            return
+        self._write(dead_letter_table(dead))
+        self.written += len(dead)
+        logger.warning(f"Routed {len(dead)} invalid record(s) to {self.root}: {dead[0][1]}")
+
+    @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def _write(self, table):
+        if self.root is None:
+            # Resolved on first use: an S3 filesystem looks up the bucket region.
+            self.filesystem, self.root = resolve_filesystem(self.root_path, self.filesystem)
+        directory = f"{self.root}/date={datetime.now(timezone.utc):%Y-%m-%d}"
+        self.filesystem.create_dir(directory, recursive=True)
+        pq.write_table(table, f"{directory}/dlq-{uuid.uuid4().hex}.parquet", filesystem=self.filesystem)
@@ -0,0 +1,260 @@
+# consumer_fleet.py
+# Keystone Nexus - Multi-process supervisor for the lakehouse consumer group
+# One Python process decodes and encodes on one core (GIL), whatever the number
+# of `orders` partitions. The fleet runs N members of the
+# `lakehouse-enterprise-writers` group as separate processes; Kafka spreads the
+# partitions across them, and the supervisor restarts crashed members and
+# aggregates their metrics.
+#
+#   python -m src.ingestion.consumer_fleet --workers 4
+#   python -m src.ingestion.consumer_fleet --fake-partitions 8 --fake-records 100000   # local stand-in
+import argparse
+import functools
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+
+logger = logging.getLogger("lakehouse")
+
+# ==========================================
+# 1. CONFIGURATION
+# ==========================================
+# 0 = one worker per partition, capped at the CPU count
+LAKEHOUSE_WORKERS = int(os.getenv("LAKEHOUSE_WORKERS", "0"))
+FLEET_MAX_RESTARTS = int(os.getenv("FLEET_MAX_RESTARTS", "5"))
+FLEET_RESTART_BACKOFF_S = float(os.getenv("FLEET_RESTART_BACKOFF_S", "2"))
+FLEET_METRICS_INTERVAL_S = float(os.getenv("FLEET_METRICS_INTERVAL_S", "10"))
+
+# ==========================================
+# 2. SIZING
+# ==========================================
+def topic_partition_count(topic, brokers, timeout=10):
+    """Number of partitions of `topic`, or None when the broker cannot be reached."""
+    from confluent_kafka.admin import AdminClient
+
+    try:
+        metadata = AdminClient({'bootstrap.servers': brokers}).list_topics(topic, timeout=timeout)
+        return len(metadata.topics[topic].partitions) or None
+    except Exception as e:
+        logger.warning(f"Could not read partition count of {topic}: {e}")
+        return None
+
+def default_worker_count(partitions=None):
+    """One worker per partition (extra members would sit idle), at most one per core."""
+    cores = os.cpu_count() or 1
+    return max(1, min(cores, partitions)) if partitions else cores
+
+# ==========================================
+# 3. WORKER PROCESS
+# ==========================================
+def kafka_consumer(worker_id, num_workers):
+    """Default consumer factory: every worker joins the same group and Kafka assigns partitions."""
+    from src.ingestion.olist_lakehouse_enterprise import create_consumer
+    return create_consumer()
+
+def run_worker(worker_id, num_workers, consumer_factory, stop_event, metrics_queue, stop_on_idle=False,
+               metrics_interval_s=FLEET_METRICS_INTERVAL_S):
+    """Process entry point: runs one lakehouse consumer and reports its metrics to the supervisor."""
+    from src.ingestion.consumer_pipeline import ConsumerMetrics, run_pipeline
+    from src.ingestion.olist_lakehouse_enterprise import (
+        KAFKA_TOPIC, LAKEHOUSE_PIPELINED, SILVER_ORDERS_PATH, SILVER_ROLLING_WRITER,
+        decode_orders, run_consumer, validation_stats, write_to_s3_resilient,
+    )
+    from src.ingestion.rolling_parquet_writer import RollingParquetWriter
+    from src.observability.metrics import METRICS_PORT, start_metrics_server
+
+    # Ctrl-C reaches the whole process group; shut down through the shared event instead.
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+    if METRICS_PORT:
+        # Every worker has its own registry; scrape METRICS_PORT + 1 + worker_id
+        try:
+            start_metrics_server(METRICS_PORT + 1 + worker_id)
+        except OSError as e:
+            logger.warning(f"Worker {worker_id}: metrics endpoint unavailable: {e}")
+    consumer = consumer_factory(worker_id, num_workers)
+    metrics = ConsumerMetrics(extra=validation_stats.snapshot)
+    done = threading.Event()
+
+    def report():
+        while not done.wait(metrics_interval_s):
+            metrics_queue.put((worker_id, os.getpid(), metrics.snapshot()))
+
+    reporter = threading.Thread(target=report, name="metrics", daemon=True)
+    reporter.start()
+    try:
+        writer = RollingParquetWriter(SILVER_ORDERS_PATH) if SILVER_ROLLING_WRITER else None
+        if LAKEHOUSE_PIPELINED:
+            run_pipeline(consumer, decode_orders, write=lambda table: write_to_s3_resilient(table, SILVER_ORDERS_PATH),
+                         writer=writer, topics=(KAFKA_TOPIC,), stop_event=stop_event, stop_on_idle=stop_on_idle,
+                         metrics=metrics)
+        else:
+            run_consumer(consumer, stop_event=stop_event, stop_on_idle=stop_on_idle, writer=writer, metrics=metrics)
+    finally:
+        done.set()
+        metrics_queue.put((worker_id, os.getpid(), metrics.snapshot()))
+
+# ==========================================
+# 4. SUPERVISOR
+# ==========================================
+def aggregate_metrics(snapshots, current):
+    """
+    Folds per-process snapshots ({pid: snapshot}) into fleet totals.
+    Counters include restarted (dead) incarnations; rates only add up the
+    `current` (latest) pid of each worker slot.
+    """
+    totals = {"workers": len(current), "records": 0, "bytes": 0, "batches": 0, "failed_batches": 0,
+              "records_per_s": 0.0, "mb_per_s": 0.0, "max_lag_s": 0.0}
+    for pid, snap in snapshots.items():
+        for key in ("records", "bytes", "batches", "failed_batches", "rejected"):
+            totals[key] = totals.get(key, 0) + snap.get(key, 0)
+        totals["max_lag_s"] = max(totals["max_lag_s"], snap["max_lag_s"])
+        if pid in current:
+            totals["records_per_s"] += snap["records_per_s"]
+            totals["mb_per_s"] += snap["mb_per_s"]
+    totals["records_per_s"] = round(totals["records_per_s"], 1)
+    totals["mb_per_s"] = round(totals["mb_per_s"], 3)
+    return totals
+
+class ConsumerFleet:
+    """
+    Runs `num_workers` consumer processes in one consumer group.
+
+    A worker that exits non-zero is restarted after an exponential backoff
+    (`restart_backoff_s` doubling per restart of that slot), up to
+    `max_restarts` times; a clean exit is final. Workers are spawned rather
+    than forked, since librdkafka's threads do not survive a fork.
+    `consumer_factory(worker_id, num_workers)` must be picklable.
+    """
+
+    def __init__(self, num_workers, consumer_factory=kafka_consumer, stop_on_idle=False,
+                 max_restarts=FLEET_MAX_RESTARTS, restart_backoff_s=FLEET_RESTART_BACKOFF_S,
+                 metrics_interval_s=FLEET_METRICS_INTERVAL_S):
+        self.num_workers = num_workers
+        self.consumer_factory = consumer_factory
+        self.stop_on_idle = stop_on_idle
+        self.max_restarts = max_restarts
+        self.restart_backoff_s = restart_backoff_s
+        self.metrics_interval_s = metrics_interval_s
+        self.ctx = mp.get_context("spawn")
+        self.stop_event = self.ctx.Event()
+        self.metrics_queue = self.ctx.Queue()
+        self.processes = {}
+        self.pids = {}
+        self.restarts = {i: 0 for i in range(num_workers)}
+        self.restart_at = {}
+        self.snapshots = {}
+
+    def _spawn(self, worker_id):
+        process = self.ctx.Process(
+            target=run_worker, name=f"lakehouse-worker-{worker_id}",
+            args=(worker_id, self.num_workers, self.consumer_factory, self.stop_event, self.metrics_queue,
+                  self.stop_on_idle, self.metrics_interval_s),
+        )
+        process.start()
+        self.processes[worker_id] = process
+        self.pids[worker_id] = process.pid
+        logger.info(f"Started worker {worker_id} (pid {process.pid})")
+
+    def _drain_metrics(self, timeout=0.0):
+        try:
+            while True:
+                _, pid, snapshot = self.metrics_queue.get(timeout=timeout)
+                self.snapshots[pid] = snapshot
+        except queue.Empty:
+            pass
+
+    def _supervise(self):
+        """Reaps exited workers and schedules restarts; returns False once none are left."""
+        now = time.monotonic()
+        for worker_id, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            del self.processes[worker_id]
+            if process.exitcode == 0 or self.stop_event.is_set():
+                logger.info(f"Worker {worker_id} exited (code {process.exitcode})")
+            elif self.restarts[worker_id] >= self.max_restarts:
+                logger.error(f"Worker {worker_id} crashed (code {process.exitcode}); restart limit reached")
+            else:
+                delay = self.restart_backoff_s * 2 ** self.restarts[worker_id]
+                self.restarts[worker_id] += 1
+                self.restart_at[worker_id] = now + delay
+                logger.warning(f"Worker {worker_id} crashed (code {process.exitcode}); restarting in {delay:.1f}s")
+
+        for worker_id, at in list(self.restart_at.items()):
+            if self.stop_event.is_set():
+                del self.restart_at[worker_id]
+            elif now >= at:
+                del self.restart_at[worker_id]
+                self._spawn(worker_id)
+        return bool(self.processes or self.restart_at)
+
+    def metrics(self):
+        return aggregate_metrics(self.snapshots, set(self.pids.values()))
+
+    def run(self, stop_event=None):
+        """
+        Starts the workers and supervises them until they have all exited,
+        or until `stop_event` (a threading.Event) is set. Returns the
+        aggregated metrics.
+        """
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+        last_report = time.monotonic()
+        try:
+            while self._supervise():
+                if stop_event is not None and stop_event.is_set():
+                    self.stop_event.set()
+                self._drain_metrics(timeout=0.5)
+                if time.monotonic() - last_report >= self.metrics_interval_s:
+                    logger.info(f"Fleet metrics: {json.dumps(self.metrics())}")
+                    last_report = time.monotonic()
+        finally:
+            self.shutdown()
+        totals = self.metrics()
+        logger.info(f"Fleet stopped: {json.dumps(totals)}")
+        return totals
+
+    def shutdown(self, timeout=60):
+        """Asks every worker to commit and exit, terminating stragglers after `timeout`."""
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Terminating unresponsive worker pid {process.pid}")
+                process.terminate()
+                process.join()
+        self.processes.clear()
+        self._drain_metrics()
+
+if __name__ == "__main__":
+    from src.ingestion.olist_lakehouse_enterprise import KAFKA_BROKERS, KAFKA_TOPIC
+
+    parser = argparse.ArgumentParser(description="Run the lakehouse consumer group as multiple processes")
+    parser.add_argument("--workers", type=int, default=LAKEHOUSE_WORKERS, help="0 = min(partitions, CPU count)")
+    parser.add_argument("--fake-partitions", type=int, default=0, help="Consume an in-process stand-in topic instead of Kafka")
+    parser.add_argument("--fake-records", type=int, default=100000, help="Records per stand-in partition")
+    args = parser.parse_args()
+
+    if args.fake_partitions:
+        from src.streaming.fakes import fake_group_consumer
+        factory = functools.partial(fake_group_consumer, num_partitions=args.fake_partitions,
+                                    records_per_partition=args.fake_records)
+        partitions = args.fake_partitions
+    else:
+        factory = kafka_consumer
+        partitions = topic_partition_count(KAFKA_TOPIC, KAFKA_BROKERS)
+    workers = args.workers or default_worker_count(partitions)
+
+    logger.info(f"🚀 Lakehouse consumer fleet starting: {workers} worker(s), {partitions or 'unknown'} partition(s)")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    ConsumerFleet(workers, factory, stop_on_idle=bool(args.fake_partitions)).run(stop)
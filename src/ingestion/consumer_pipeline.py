@@ -0,0 +1,413 @@
+# consumer_pipeline.py
+# Keystone Nexus - Shared micro-batching and staged pipeline for the lakehouse consumers
+# Used by olist_lakehouse_enterprise.py and olist_lakehouse_enterprise_glue.py.
+# Logging goes to the "lakehouse" logger configured by whichever consumer runs.
+import logging
+import os
+import queue
+import threading
+import time
+
+import pyarrow.compute as pc
+from confluent_kafka import TopicPartition
+
+from src.ingestion.batch_validation import parse_timestamps
+from src.ingestion.olist_schemas import OLIST_TIMESTAMP_FORMAT
+from src.observability.metrics import BATCH_RECORDS, RECORDS, stage_means_ms, timed
+
+logger = logging.getLogger("lakehouse")
+
+# ==========================================
+# 1. CONFIGURATION
+# ==========================================
+# Micro-batching: a batch is flushed when ANY trigger is reached
+BATCH_MAX_RECORDS = int(os.getenv("BATCH_MAX_RECORDS", "100000"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(64 * 1024 * 1024)))
+BATCH_MAX_LATENCY_S = float(os.getenv("BATCH_MAX_LATENCY_S", "60"))
+POLL_NUM_MESSAGES = int(os.getenv("POLL_NUM_MESSAGES", "1000"))
+POLL_TIMEOUT_S = float(os.getenv("POLL_TIMEOUT_S", "1.0"))
+
+# Staged pipeline: batches allowed to wait between fetch -> decode -> write
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+
+# Offset commits: written offsets are committed asynchronously at this interval
+COMMIT_INTERVAL_S = float(os.getenv("COMMIT_INTERVAL_S", "5"))
+
+# ==========================================
+# 2. BATCH HELPERS
+# ==========================================
+def add_partition_columns(arrow_table):
+    """
+    Derives the year/month/day partition columns from the purchase timestamp.
+    A timestamp that is not a real date gets null partition columns rather
+    than failing the batch; validated batches have those rows dead-lettered
+    already (see ORDER_EVENT_TIMESTAMPS).
+    """
+    timestamps = parse_timestamps(arrow_table.column('order_purchase_timestamp'), OLIST_TIMESTAMP_FORMAT)
+    arrow_table = arrow_table.append_column('year', pc.year(timestamps))
+    arrow_table = arrow_table.append_column('month', pc.month(timestamps))
+    arrow_table = arrow_table.append_column('day', pc.day(timestamps))
+    return arrow_table
+
+def batch_offsets(messages):
+    """Returns {(topic, partition): next offset to consume} covering `messages`."""
+    # Within a partition messages arrive in offset order, so the last one wins.
+    return {(m.topic(), m.partition()): m.offset() + 1 for m in messages}
+
+def batch_start_offsets(messages):
+    """Returns {(topic, partition): first offset} of `messages`, for seeking back."""
+    offsets = {}
+    for msg in messages:
+        offsets.setdefault((msg.topic(), msg.partition()), msg.offset())
+    return offsets
+
+def merge_offsets(into, offsets, pick=max):
+    """Folds {(topic, partition): offset} into `into`, keeping the `pick` per partition."""
+    for key, offset in offsets.items():
+        into[key] = pick(into[key], offset) if key in into else offset
+    return into
+
+def to_topic_partitions(offsets):
+    return [TopicPartition(t, p, o) for (t, p), o in offsets.items()]
+
+def rewind(consumer, start_offsets):
+    """Seeks each partition back to `start_offsets` so unwritten records are re-consumed."""
+    for tp in to_topic_partitions(start_offsets):
+        consumer.seek(tp)
+
+def log_commit_result(err, partitions):
+    """`on_commit` callback for the consumer config: surfaces async commit failures."""
+    if err:
+        logger.warning(f"Offset commit failed: {err}")
+
+class OffsetTracker:
+    """
+    Tracks the highest durably-written offset per topic-partition and commits
+    exactly those offsets, never the consumer's current position.
+
+    `maybe_commit()` sends an asynchronous commit at most every `interval_s`
+    (a failed async commit is superseded by the next one). `commit_final()`
+    commits everything written synchronously, and is used on shutdown and
+    from the rebalance callback for partitions being revoked. Offsets for
+    partitions this consumer no longer owns are ignored, so a batch finishing
+    after a rebalance cannot move the new owner's committed offset backwards.
+    """
+
+    def __init__(self, consumer, interval_s=COMMIT_INTERVAL_S, asynchronous=True):
+        self.consumer = consumer
+        self.interval_s = interval_s
+        self.asynchronous = asynchronous
+        self.written = {}
+        self.sent = {}
+        self.assigned = None
+        self.last_commit = time.monotonic()
+        self.commits = 0
+
+    def mark_written(self, offsets):
+        owned = {k: o for k, o in offsets.items() if self.assigned is None or k in self.assigned}
+        merge_offsets(self.written, owned)
+
+    def maybe_commit(self):
+        if time.monotonic() - self.last_commit >= self.interval_s:
+            self._commit(self._unsent(), self.asynchronous)
+
+    def commit_final(self, partitions=None):
+        keys = self.written if partitions is None else [(tp.topic, tp.partition) for tp in partitions]
+        self._commit({k: self.written[k] for k in keys if k in self.written}, asynchronous=False)
+
+    def on_assign(self, consumer, partitions):
+        self.assigned = (self.assigned or set()) | {(tp.topic, tp.partition) for tp in partitions}
+
+    def on_revoke(self, consumer, partitions):
+        self.commit_final(partitions)
+        for tp in partitions:
+            key = (tp.topic, tp.partition)
+            if self.assigned is not None:
+                self.assigned.discard(key)
+            self.written.pop(key, None)
+            self.sent.pop(key, None)
+
+    def _unsent(self):
+        return {k: o for k, o in self.written.items() if self.sent.get(k) != o}
+
+    def _commit(self, offsets, asynchronous):
+        self.last_commit = time.monotonic()
+        if not offsets:
+            return
+        try:
+            with timed("offset_commit_async" if asynchronous else "offset_commit_sync"):
+                self.consumer.commit(offsets=to_topic_partitions(offsets), asynchronous=asynchronous)
+            self.sent.update(offsets)
+            self.commits += 1
+        except Exception as e:
+            # Offsets stay in `written`, so the next commit retries them.
+            logger.warning(f"Offset commit failed: {e}")
+
+class ConsumerMetrics:
+    """
+    Throughput and end-to-end lag counters for the poll loop.
+    `extra` is an optional callable whose dict is merged into snapshots.
+    """
+
+    def __init__(self, extra=None):
+        self.extra = extra
+        self.started = time.monotonic()
+        self.records = 0
+        self.bytes = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_lag_s = None
+        self.max_lag_s = 0.0
+
+    def record_flush(self, messages, size, ok):
+        self.batches += 1
+        if not ok:
+            self.failed_batches += 1
+            return
+        self.records += len(messages)
+        self.bytes += size
+        BATCH_RECORDS.observe(len(messages))
+        RECORDS.inc(len(messages), stage="silver")
+
+        # End-to-end lag: produce time of the oldest record -> durable write.
+        produced = [m.timestamp()[1] for m in messages if m.timestamp()[0]]
+        if produced:
+            self.last_lag_s = time.time() - min(produced) / 1000
+            self.max_lag_s = max(self.max_lag_s, self.last_lag_s)
+
+    def snapshot(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "records": self.records,
+            "bytes": self.bytes,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "records_per_s": round(self.records / elapsed, 1),
+            "mb_per_s": round(self.bytes / elapsed / 2**20, 3),
+            "last_lag_s": None if self.last_lag_s is None else round(self.last_lag_s, 3),
+            "max_lag_s": round(self.max_lag_s, 3),
+            **(self.extra() if self.extra else {}),
+        }
+
+class MicroBatcher:
+    """
+    Accumulates polled messages until a record, byte or latency trigger fires.
+    Latency is measured from the first message buffered into the batch.
+    """
+
+    def __init__(self, max_records=BATCH_MAX_RECORDS, max_bytes=BATCH_MAX_BYTES, max_latency_s=BATCH_MAX_LATENCY_S):
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_latency_s = max_latency_s
+        self.messages, self.bytes, self.first_at = [], 0, None
+
+    def add(self, messages):
+        for msg in messages:
+            if msg.error():
+                logger.warning(f"Consumer error: {msg.error()}")
+                continue
+            self.messages.append(msg)
+            self.bytes += len(msg.value() or b"")
+        if self.messages and self.first_at is None:
+            self.first_at = time.monotonic()
+
+    def trigger(self):
+        """Returns the name of the trigger that fired, or None."""
+        if len(self.messages) >= self.max_records:
+            return "records"
+        if self.bytes >= self.max_bytes:
+            return "bytes"
+        if self.messages and time.monotonic() - self.first_at >= self.max_latency_s:
+            return "latency"
+        return None
+
+    def capacity(self, poll_num_messages=POLL_NUM_MESSAGES):
+        """Never fetch past the record trigger."""
+        return max(1, min(poll_num_messages, self.max_records - len(self.messages)))
+
+    def poll_timeout(self, default=POLL_TIMEOUT_S):
+        """Wake up in time for the latency trigger."""
+        if self.first_at is None:
+            return default
+        return max(0.0, min(default, self.max_latency_s - (time.monotonic() - self.first_at)))
+
+    def take(self):
+        batch = (self.messages, self.bytes)
+        self.messages, self.bytes, self.first_at = [], 0, None
+        return batch
+
+# ==========================================
+# 3. STAGED PIPELINE (FETCH -> DECODE -> WRITE)
+# ==========================================
+def run_pipeline(consumer, decode, write=None, writer=None, topics=("orders",), max_records=BATCH_MAX_RECORDS,
+                 max_bytes=BATCH_MAX_BYTES, max_latency_s=BATCH_MAX_LATENCY_S, queue_size=PIPELINE_QUEUE_SIZE,
+                 commit_interval_s=COMMIT_INTERVAL_S, stop_event=None, stop_on_idle=False, metrics=None):
+    """
+    Runs fetch, decode and write as separate stages joined by bounded queues.
+
+    The calling thread owns the consumer: it polls, micro-batches and issues
+    every commit. `decode(messages)` (-> Arrow table) and the write run on
+    their own threads, so fetching continues while a write is retrying. When
+    the queues are full the assigned partitions are paused (polling goes on,
+    so the consumer stays in its group) until the writer catches up.
+
+    Offsets are committed only for batches that are durable: after
+    `write(table)` returns, or, with a RollingParquetWriter, once the writer
+    has closed the files holding them. Batches are written in fetch order,
+    so committed offsets only ever move forward; they are sent through an
+    OffsetTracker every `commit_interval_s`. A batch that fails to decode,
+    or whose write still fails after its retries, stops the pipeline: the
+    batches before it are committed, it and everything fetched after it are
+    not (they are re-consumed on restart), and the error is re-raised.
+    Pass `metrics` to read live counters from another thread.
+    Returns the final metrics snapshot.
+    """
+    stop_event = stop_event or threading.Event()
+    failed = threading.Event()
+    errors = []
+    metrics = metrics or ConsumerMetrics()
+    decode_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    durable_queue = queue.Queue()
+
+    def put(q, item):
+        """Blocking put that gives up once another stage has failed."""
+        while not failed.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def decode_stage():
+        while True:
+            try:
+                item = decode_queue.get(timeout=0.1)
+            except queue.Empty:
+                if failed.is_set():
+                    return
+                continue
+            if item is None:
+                put(write_queue, None)
+                return
+            messages, size = item
+            try:
+                with timed("kafka_decode"):
+                    table = decode(messages)
+            except Exception as e:
+                # Handed to the write stage so the batches queued before it still become durable
+                logger.error(f"Batch Decode Error (stopping pipeline, {len(messages)} records not committed): {e}")
+                errors.append(e)
+                put(write_queue, (None, messages, size))
+                return
+            if not put(write_queue, (table, messages, size)):
+                return
+
+    def write_stage():
+        pending = {}
+
+        def make_durable():
+            nonlocal pending
+            if writer is not None:
+                writer.close()
+            if pending:
+                durable_queue.put(pending)
+                pending = {}
+
+        while True:
+            try:
+                item = write_queue.get(timeout=POLL_TIMEOUT_S)
+            except queue.Empty:
+                if writer is not None and writer.should_flush():
+                    make_durable()
+                continue
+            if item is None:
+                make_durable()
+                return
+
+            table, messages, size = item
+            if table is None:
+                metrics.record_flush(messages, size, False)
+                make_durable()
+                failed.set()
+                return
+            try:
+                with timed("parquet_write"):
+                    if writer is not None:
+                        writer.write(table)
+                    else:
+                        write(table)
+            except Exception as e:
+                logger.error(f"Batch Write Error (stopping pipeline): {e}")
+                if writer is not None:
+                    writer.abort()
+                errors.append(e)
+                failed.set()
+                return
+
+            metrics.record_flush(messages, size, True)
+            pending.update(batch_offsets(messages))
+            if writer is None or writer.should_flush():
+                make_durable()
+
+    tracker = OffsetTracker(consumer, commit_interval_s)
+
+    def drain_durable():
+        while True:
+            try:
+                tracker.mark_written(durable_queue.get_nowait())
+            except queue.Empty:
+                return
+
+    stages = [threading.Thread(target=decode_stage, name="decode", daemon=True),
+              threading.Thread(target=write_stage, name="write", daemon=True)]
+    for stage in stages:
+        stage.start()
+
+    batcher = MicroBatcher(max_records, max_bytes, max_latency_s)
+    paused = False
+    def on_revoke(consumer, partitions):
+        drain_durable()
+        tracker.on_revoke(consumer, partitions)
+
+    consumer.subscribe(list(topics), on_assign=tracker.on_assign, on_revoke=on_revoke)
+    try:
+        while not stop_event.is_set() and not failed.is_set():
+            drain_durable()
+            tracker.maybe_commit()
+
+            # Backpressure: stop fetching (but keep polling) while the writer is behind.
+            if decode_queue.full():
+                if not paused:
+                    consumer.pause(consumer.assignment())
+                    paused = True
+                # Newly assigned (unpaused) partitions may still deliver here.
+                batcher.add(consumer.consume(num_messages=1, timeout=0.1))
+                continue
+            if paused:
+                consumer.resume(consumer.assignment())
+                paused = False
+
+            messages = consumer.consume(num_messages=batcher.capacity(), timeout=batcher.poll_timeout())
+            batcher.add(messages)
+            if batcher.trigger():
+                put(decode_queue, batcher.take())
+            elif not messages and stop_on_idle:
+                break
+
+        if batcher.messages:
+            put(decode_queue, batcher.take())
+        put(decode_queue, None)
+        for stage in stages:
+            stage.join()
+        drain_durable()
+        tracker.commit_final()
+    finally:
+        consumer.close()
+
+    snapshot = metrics.snapshot()
+    logger.info(f"Pipeline stopped: {snapshot}", extra={"timings": stage_means_ms()})
+    if errors:
+        raise errors[0]
+    return snapshot
@@ -1,40 +1,62 @@
 import os
+import csv
 import json
-import logging
+import time
+import tempfile
+import threading
 import boto3
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from src.ingestion.ingestion_state import IngestionState
+from src.ingestion.olist_schemas import OLIST_SCHEMAS, OLIST_SOURCE_FILES, NEWLINES_IN_VALUES
+from src.observability.metrics import RECORDS, Timings, stage_means_ms, start_metrics_server
+from src.observability.structured_logging import setup_logger
+from src.validation.arrow_expectations import suite_for_table
+
 # ==========================================
 # 1. CONFIGURATION & LOGGING
 # ==========================================
-class JsonFormatter(logging.Formatter):
-    """Custom JSON formatter for structured logging."""
-    def format(self, record):
-        log_obj = {
-            "timestamp": self.formatTime(record),
-            "level": record.levelname,
-            "message": record.getMessage(),
-            "module": record.module,
-            "func": record.funcName
-        }
-        if record.exc_info:
-            log_obj["exception"] = self.formatException(record.exc_info)
-        return json.dumps(log_obj)
-
-# Setup logging
-logger = logging.getLogger("ingestion")
-handler = logging.StreamHandler()
-handler.setFormatter(JsonFormatter())
-logger.addHandler(handler)
-logger.setLevel(logging.INFO)
+# Setup logging: JSON lines written by a background thread
+logger = setup_logger("ingestion", fields=("timestamp", "level", "message", "module", "func"))
 
 # Environment variables
 S3_BRONZE_BUCKET = os.getenv("S3_BRONZE_BUCKET", "olist-data-lake-bronze")
 AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1")
 
+# S3 client pooling & multipart tuning (S3_ENDPOINT_URL targets MinIO/moto locally)
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "64"))
+S3_MULTIPART_CHUNKSIZE_MB = int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "16"))
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+
+# Streaming conversion (bounded memory for large exports such as geolocation)
+BRONZE_STREAMING = os.getenv("BRONZE_STREAMING", "false").lower() == "true"
+BRONZE_MAX_MEMORY_MB = int(os.getenv("BRONZE_MAX_MEMORY_MB", "256"))
+
+# In-memory upload (Parquet is spooled in RAM and only spills to disk above the threshold)
+BRONZE_IN_MEMORY = os.getenv("BRONZE_IN_MEMORY", "false").lower() == "true"
+BRONZE_SPOOL_MAX_MB = int(os.getenv("BRONZE_SPOOL_MAX_MB", "128"))
+
+# Batch ingestion (local Olist export directory and pool sizes)
+BRONZE_DATA_DIR = os.getenv("BRONZE_DATA_DIR", "data")
+BRONZE_CONVERT_WORKERS = int(os.getenv("BRONZE_CONVERT_WORKERS", str(os.cpu_count() or 1)))
+BRONZE_UPLOAD_WORKERS = int(os.getenv("BRONZE_UPLOAD_WORKERS", "4"))
+
+# Evaluate the olist_logistics_rules expectations on each chunk as it is converted (report only;
+# Bronze keeps the raw rows either way). Opt-in: stream-wide uniqueness keeps every order_id
+# in memory, and Silver validation covers the same rules
+BRONZE_VALIDATE = os.getenv("BRONZE_VALIDATE", "false").lower() == "true"
+
 # ==========================================
 # 2. AWS HELPERS (SECRETS & S3)
 # ==========================================
@@ -49,55 +71,423 @@ def get_secret(secret_name):
         logger.error(f"Failed to retrieve secret {secret_name}: {e}")
         return None
 
+_s3_client = None
+_s3_client_pid = None
+_s3_client_lock = threading.Lock()
+
+def create_s3_client():
+    """Builds an S3 client with a connection pool sized for concurrent uploads."""
+    config = Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS, region_name=AWS_REGION)
+    return boto3.session.Session().client('s3', endpoint_url=S3_ENDPOINT_URL, config=config)
+
+def get_s3_client():
+    """
+    Returns the shared S3 client, creating it once per process.
+    boto3 clients are thread-safe, so the upload thread pool and tenacity
+    retries all reuse the same credentials and connection pool. The client is
+    rebuilt after a fork because its pooled sockets must not cross processes.
+    """
+    global _s3_client, _s3_client_pid
+    if _s3_client is None or _s3_client_pid != os.getpid():
+        with _s3_client_lock:
+            if _s3_client is None or _s3_client_pid != os.getpid():
+                _s3_client = create_s3_client()
+                _s3_client_pid = os.getpid()
+    return _s3_client
+
+def get_transfer_config():
+    """Multipart settings for managed transfers, driven by the S3_* environment."""
+    return TransferConfig(
+        multipart_threshold=S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+        multipart_chunksize=S3_MULTIPART_CHUNKSIZE_MB * 1024 * 1024,
+        max_concurrency=S3_MAX_CONCURRENCY,
+    )
+
 @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10))
-def upload_to_s3(file_path, bucket, object_name):
+def upload_to_s3(file_path, bucket, object_name, s3_client=None):
     """Uploads a file to S3 with exponential backoff retry logic."""
-    s3_client = boto3.client('s3', region_name=AWS_REGION)
+    s3_client = s3_client or get_s3_client()
     try:
-        s3_client.upload_file(file_path, bucket, object_name)
+        s3_client.upload_file(file_path, bucket, object_name, Config=get_transfer_config())
         logger.info(f"Successfully uploaded {file_path} to s3://{bucket}/{object_name}")
         return True
     except ClientError as e:
         logger.error(f"Upload failed for {file_path}: {e}")
         raise e
 
+@retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10))
+def upload_fileobj_to_s3(fileobj, bucket, object_name, s3_client=None):
+    """Streams a seekable buffer to S3 (multipart above the threshold) with retry logic."""
+    s3_client = s3_client or get_s3_client()
+    try:
+        # Rewind on every attempt: a failed try leaves the buffer part-read.
+        fileobj.seek(0)
+        s3_client.upload_fileobj(fileobj, bucket, object_name, Config=get_transfer_config())
+        logger.info(f"Successfully streamed buffer to s3://{bucket}/{object_name}")
+        return True
+    except ClientError as e:
+        logger.error(f"Upload failed for s3://{bucket}/{object_name}: {e}")
+        raise e
+
 # ==========================================
-# 3. CORE INGESTION LOGIC
+# 3. CSV -> PARQUET CONVERSION
 # ==========================================
-def process_file_to_bronze(local_csv_path, table_name):
+# pandas dtypes that read a column as its pinned Arrow type (nullable ints stay ints)
+PANDAS_DTYPES = {pa.string(): "string", pa.int64(): "Int64", pa.float64(): "float64"}
+
+def convert_csv_to_parquet(local_csv_path, parquet_path, table_name, timings=None, suite=None):
+    """
+    Converts a CSV to Parquet in one pass, holding the whole file in memory.
+    Columns are read as the pinned schema, like the streaming variant, so
+    the Bronze schema does not depend on BRONZE_STREAMING (pandas inference
+    would, for one, turn zip code prefixes into ints). `parquet_path` may
+    also be a writable binary buffer, and the table is checked against
+    `suite` when one is given.
+    """
+    timings = timings or Timings()
+    schema = get_arrow_schema(local_csv_path, table_name)
+    with timings.time("csv_parse"):
+        df = pd.read_csv(local_csv_path, dtype={f.name: PANDAS_DTYPES.get(f.type, "string") for f in schema})
+    if list(df.columns) != schema.names:
+        raise ValueError(f"Schema drift in {local_csv_path}: expected {schema.names}, got {list(df.columns)}")
+    with timings.time("parquet_encode"):
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        pq.write_table(table, parquet_path)
+    if suite is not None:
+        with timings.time("expectations"):
+            suite.validate(table)
+    return len(df)
+
+def get_arrow_schema(local_csv_path, table_name):
+    """
+    Returns the pinned Arrow schema for a table.
+    Tables without a pinned schema are read as all-string columns taken from
+    the CSV header, so types never depend on what the first chunk looks like.
+    """
+    if table_name in OLIST_SCHEMAS:
+        return OLIST_SCHEMAS[table_name]
+
+    with open(local_csv_path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    logger.warning(f"No pinned schema for {table_name}; reading all {len(header)} columns as strings.")
+    return pa.schema([(name, pa.string()) for name in header])
+
+def iter_csv_chunks(f, block_size):
+    """Yields byte chunks of roughly `block_size` that always end on a line boundary."""
+    remainder = b""
+    while True:
+        data = f.read(block_size)
+        if not data:
+            break
+        data = remainder + data
+        cut = data.rfind(b"\n") + 1
+        remainder = data[cut:]
+        if cut:
+            yield memoryview(data)[:cut]
+    if remainder:
+        yield remainder
+
+def convert_csv_to_parquet_streaming(local_csv_path, parquet_path, table_name, max_memory_mb=BRONZE_MAX_MEMORY_MB,
+                                     timings=None, suite=None):
+    """
+    Converts a CSV to Parquet in bounded chunks.
+
+    Each chunk is parsed against the pinned schema and appended as row groups
+    through a single ParquetWriter, so peak memory follows `max_memory_mb`
+    rather than the size of the source file. Parse and encode time are added
+    to `timings` (csv_parse, parquet_encode). With a `suite`
+    (arrow_expectations.py), every chunk is validated as it passes through.
+    """
+    timings = timings or Timings()
+    schema = get_arrow_schema(local_csv_path, table_name)
+    convert_options = pv.ConvertOptions(column_types=schema, strings_can_be_null=True)
+
+    # Working set per chunk is ~6 blocks: the raw read, its line-boundary copy,
+    # the parsed columns (~2.5x the CSV bytes) and the writer's encode buffers.
+    # The ceiling budgets that working set; allocator slack and the interpreter
+    # baseline come on top but, like it, stay flat as the source file grows.
+    block_size = max(1024 * 1024, max_memory_mb * 1024 * 1024 // 6)
+
+    rows = 0
+    with pq.ParquetWriter(parquet_path, schema, compression='snappy') as writer:
+        if table_name in NEWLINES_IN_VALUES:
+            # Quoted line breaks make byte-level splitting unsafe; let Arrow's
+            # streaming reader find record boundaries (its read-ahead is not
+            # bounded, which is acceptable for these small free-text tables).
+            reader = pv.open_csv(
+                local_csv_path,
+                read_options=pv.ReadOptions(block_size=block_size),
+                parse_options=pv.ParseOptions(newlines_in_values=True),
+                convert_options=convert_options,
+            )
+            if not reader.schema.equals(schema):
+                raise ValueError(f"Schema drift in {local_csv_path}: expected {schema.names}, got {reader.schema.names}")
+            batches = iter(reader)
+            while True:
+                with timings.time("csv_parse"):
+                    batch = next(batches, None)
+                if batch is None:
+                    return rows
+                if suite is not None:
+                    with timings.time("expectations"):
+                        suite.validate(batch)
+                with timings.time("parquet_encode"):
+                    writer.write_batch(batch)
+                rows += batch.num_rows
+
+        read_options = pv.ReadOptions(column_names=schema.names)
+        with open(local_csv_path, 'rb') as f:
+            header = next(csv.reader([f.readline().decode('utf-8-sig')]))
+            if header != schema.names:
+                raise ValueError(f"Schema drift in {local_csv_path}: expected {schema.names}, got {header}")
+
+            for chunk in iter_csv_chunks(f, block_size):
+                with timings.time("csv_parse"):
+                    table = pv.read_csv(pa.py_buffer(chunk), read_options=read_options, convert_options=convert_options)
+                if suite is not None:
+                    with timings.time("expectations"):
+                        suite.validate(table)
+                with timings.time("parquet_encode"):
+                    writer.write_table(table)
+                rows += table.num_rows
+    return rows
+
+def convert_csv(local_csv_path, parquet_path, table_name, streaming, timings=None, suite=None):
+    """Dispatches to the streaming or in-memory converter; returns the row count."""
+    if streaming:
+        return convert_csv_to_parquet_streaming(local_csv_path, parquet_path, table_name, timings=timings, suite=suite)
+    return convert_csv_to_parquet(local_csv_path, parquet_path, table_name, timings, suite)
+
+def bronze_suite(table_name):
+    """The table's expectation suite when BRONZE_VALIDATE is on, else None."""
+    return suite_for_table(table_name) if BRONZE_VALIDATE else None
+
+def log_expectations(table_name, summary):
+    """Logs the failure counts of a suite summary, if any rule failed."""
+    if summary is not None and not summary["success"]:
+        logger.warning(f"{table_name}: {summary['unsuccessful_expectations']} of {summary['evaluated_expectations']} "
+                       f"expectations failed: {json.dumps(summary['failures'])}")
+
+# ==========================================
+# 4. CORE INGESTION LOGIC
+# ==========================================
+def bronze_targets(table_name):
+    """Returns the (local temp path, S3 key) pair for a new Bronze object."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"/tmp/{table_name}_{timestamp}.parquet", f"raw/{table_name}/{table_name}_{timestamp}.parquet"
+
+def ingest_table_in_memory(local_csv_path, table_name, streaming=BRONZE_STREAMING):
+    """
+    Encodes Parquet into a spooled buffer and streams it straight to S3.
+    The buffer stays in RAM up to BRONZE_SPOOL_MAX_MB and only then spills to
+    a temp file, so small workers are no longer bounded by /tmp capacity.
+    """
+    start = time.perf_counter()
+    timings = Timings()
+    suite = bronze_suite(table_name)
+    _, s3_key = bronze_targets(table_name)
+
+    with tempfile.SpooledTemporaryFile(max_size=BRONZE_SPOOL_MAX_MB * 1024 * 1024) as buffer:
+        rows = convert_csv(local_csv_path, buffer, table_name, streaming, timings, suite)
+        size = buffer.tell()
+        convert_seconds = round(time.perf_counter() - start, 3)
+
+        upload_start = time.perf_counter()
+        with timings.time("s3_upload"):
+            upload_fileobj_to_s3(buffer, S3_BRONZE_BUCKET, s3_key)
+
+    return {
+        "s3_key": s3_key,
+        "rows": rows,
+        "bytes": size,
+        "convert_seconds": convert_seconds,
+        "upload_seconds": round(time.perf_counter() - upload_start, 3),
+        "timings": timings.seconds,
+        "expectations": suite.summary() if suite is not None else None,
+    }
+
+def process_file_to_bronze(local_csv_path, table_name, streaming=BRONZE_STREAMING, in_memory=BRONZE_IN_MEMORY):
     """
     Converts local CSV to Parquet and uploads to Bronze layer.
+    With `streaming=True` the CSV is converted chunk by chunk (see
+    `convert_csv_to_parquet_streaming`) instead of being loaded whole; with
+    `in_memory=True` the Parquet never touches /tmp (see `ingest_table_in_memory`).
     """
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        parquet_path = f"/tmp/{table_name}_{timestamp}.parquet"
-        
-        # 1. Read CSV and convert to Parquet
-        logger.info(f"Processing {local_csv_path} to Parquet...")
-        df = pd.read_csv(local_csv_path)
-        df.to_parquet(parquet_path, index=False)
-        
-        # 2. Upload to S3 Bronze
-        s3_key = f"raw/{table_name}/{table_name}_{timestamp}.parquet"
-        upload_to_s3(parquet_path, S3_BRONZE_BUCKET, s3_key)
-        
-        # 3. Cleanup local temp file
-        os.remove(parquet_path)
+        logger.info(f"Processing {local_csv_path} to Parquet (streaming={streaming}, in_memory={in_memory})...")
+        if in_memory:
+            result = ingest_table_in_memory(local_csv_path, table_name, streaming)
+            rows, timings = result["rows"], Timings(result["timings"])
+            log_expectations(table_name, result["expectations"])
+        else:
+            timings = Timings()
+            suite = bronze_suite(table_name)
+            parquet_path, s3_key = bronze_targets(table_name)
+
+            # 1. Read CSV and convert to Parquet (validating it on the way)
+            rows = convert_csv(local_csv_path, parquet_path, table_name, streaming, timings, suite)
+            log_expectations(table_name, suite.summary() if suite is not None else None)
+
+            # 2. Upload to S3 Bronze
+            with timings.time("s3_upload"):
+                upload_to_s3(parquet_path, S3_BRONZE_BUCKET, s3_key)
+
+            # 3. Cleanup local temp file
+            os.remove(parquet_path)
+
+        timings.observe()
+        RECORDS.inc(rows, stage="bronze")
+        logger.info(f"Ingested {rows} {table_name} rows to Bronze", extra={"timings": timings.fields()})
         return True
         
     except Exception as e:
         logger.error(f"Failed to process {table_name}: {e}")
         return False
 
+# ==========================================
+# 5. BATCH INGESTION (PARALLEL)
+# ==========================================
+def build_manifest(data_dir=BRONZE_DATA_DIR, tables=None):
+    """
+    Returns a {table_name: local_csv_path} manifest for the Olist exports
+    found in `data_dir`. Missing files are logged and left out.
+    """
+    manifest = {}
+    for table in tables or OLIST_SOURCE_FILES:
+        path = os.path.join(data_dir, OLIST_SOURCE_FILES[table])
+        if os.path.exists(path):
+            manifest[table] = path
+        else:
+            logger.warning(f"File {path} not found. Skipping...")
+    return manifest
+
+def convert_table_to_parquet(local_csv_path, table_name, streaming=BRONZE_STREAMING):
+    """
+    Process-pool worker: converts one CSV to a local Parquet file.
+    Returns the paths, row count and timing needed to schedule the upload.
+    """
+    start = time.perf_counter()
+    timings = Timings()
+    suite = bronze_suite(table_name)
+    parquet_path, s3_key = bronze_targets(table_name)
+
+    try:
+        rows = convert_csv(local_csv_path, parquet_path, table_name, streaming, timings, suite)
+    except Exception:
+        if os.path.exists(parquet_path):
+            os.remove(parquet_path)
+        raise
+
+    return {
+        "parquet_path": parquet_path,
+        "s3_key": s3_key,
+        "rows": rows,
+        "bytes": os.path.getsize(parquet_path),
+        "convert_seconds": round(time.perf_counter() - start, 3),
+        "timings": timings.seconds,
+        "expectations": suite.summary() if suite is not None else None,
+    }
+
+def upload_table_to_bronze(converted):
+    """Thread-pool worker: uploads a converted table and removes the temp file."""
+    start = time.perf_counter()
+    try:
+        upload_to_s3(converted["parquet_path"], S3_BRONZE_BUCKET, converted["s3_key"])
+    finally:
+        os.remove(converted["parquet_path"])
+    seconds = time.perf_counter() - start
+    Timings({"s3_upload": seconds}).observe()
+    return round(seconds, 3)
+
+def ingest_batch_to_bronze(manifest, convert_workers=BRONZE_CONVERT_WORKERS, upload_workers=BRONZE_UPLOAD_WORKERS,
+                           streaming=BRONZE_STREAMING, in_memory=BRONZE_IN_MEMORY, state=None):
+    """
+    Ingests every table in `manifest` ({table_name: local_csv_path}).
+
+    CSV parsing and Parquet encoding run in a process pool (one core per
+    table); each finished file is handed straight to a thread pool for upload,
+    so uploads overlap with the remaining conversions. In `in_memory` mode each
+    worker uploads its own spooled buffer, since buffers cannot be handed
+    across processes without copying.
+
+    When an `IngestionState` is passed, sources whose content is unchanged
+    since their last successful upload are skipped, and the state is saved
+    with every newly uploaded source. Returns a report with per-table status,
+    rows, Parquet bytes and seconds.
+    """
+    worker = ingest_table_in_memory if in_memory else convert_table_to_parquet
+    start = time.perf_counter()
+    results = {table: {"table": table, "source": path, "status": "failed"} for table, path in manifest.items()}
+
+    fingerprints = {}
+    pending = dict(manifest)
+    if state is not None:
+        for table, path in manifest.items():
+            changed, fingerprint = state.fingerprint(path)
+            if changed:
+                fingerprints[table] = fingerprint
+            else:
+                logger.info(f"Source {path} unchanged since last upload. Skipping...")
+                results[table].update(status="skipped", s3_key=fingerprint["s3_key"])
+                del pending[table]
+
+    with ProcessPoolExecutor(max_workers=max(1, min(convert_workers, len(pending)))) as converters, \
+            ThreadPoolExecutor(max_workers=upload_workers) as uploaders:
+        conversions = {
+            converters.submit(worker, path, table, streaming): table
+            for table, path in pending.items()
+        }
+        uploads = {}
+        for future in as_completed(conversions):
+            table = conversions[future]
+            try:
+                converted = future.result()
+            except Exception as e:
+                logger.error(f"Failed to ingest {table}: {e}")
+                results[table]["error"] = str(e)
+                continue
+            results[table].update({k: converted[k] for k in ("s3_key", "rows", "bytes", "convert_seconds")})
+            # Workers run in other processes; their stage timings are recorded here.
+            timings = Timings(converted["timings"]).observe()
+            results[table]["timings"] = timings.fields()
+            if converted["expectations"] is not None:
+                results[table]["expectations"] = converted["expectations"]
+                log_expectations(table, converted["expectations"])
+            RECORDS.inc(converted["rows"], stage="bronze")
+            if "upload_seconds" in converted:
+                results[table].update(upload_seconds=converted["upload_seconds"], status="uploaded")
+            else:
+                uploads[uploaders.submit(upload_table_to_bronze, converted)] = table
+
+        for future in as_completed(uploads):
+            table = uploads[future]
+            try:
+                results[table]["upload_seconds"] = future.result()
+                results[table]["status"] = "uploaded"
+            except Exception as e:
+                logger.error(f"Failed to upload {table}: {e}")
+                results[table]["error"] = str(e)
+
+    if state is not None:
+        for table, result in results.items():
+            if result["status"] == "uploaded":
+                state.record(manifest[table], fingerprints[table], table, result["s3_key"])
+        state.save()
+
+    statuses = [r["status"] for r in results.values()]
+    report = {
+        "tables": list(results.values()),
+        "succeeded": statuses.count("uploaded"),
+        "skipped": statuses.count("skipped"),
+        "failed": statuses.count("failed"),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    logger.info(f"Bronze batch ingestion report: {json.dumps(report)}", extra={"timings": stage_means_ms()})
+    return report
+
 if __name__ == "__main__":
-    # Example usage for one table
+    start_metrics_server()
     # In production, this would be triggered by Airflow with dynamic paths
-    tables = ["orders", "order_items", "customers"]
-    
-    for table in tables:
-        # Mock local file path for testing
-        mock_path = f"data/olist_{table}_dataset.csv"
-        if os.path.exists(mock_path):
-            process_file_to_bronze(mock_path, table)
-        else:
-            logger.warning(f"File {mock_path} not found. Skipping...")
+    report = ingest_batch_to_bronze(build_manifest(), state=IngestionState())
+    if report["failed"]:
+        raise SystemExit(1)
@@ -0,0 +1,75 @@
+# ingestion_state.py
+# Keystone Nexus - Local manifest of already-ingested Bronze sources
+# Lets `ingest_to_bronze.py` skip CSVs that have not changed since their last
+# successful upload instead of re-converting them under a new timestamped key.
+import os
+import json
+import hashlib
+from datetime import datetime
+
+BRONZE_STATE_PATH = os.getenv("BRONZE_STATE_PATH", "data/.bronze_state.json")
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """Streams a file through SHA-256 without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionState:
+    """
+    JSON-backed state store keyed by absolute source path.
+
+    Each entry holds the size, mtime and SHA-256 of the source as it was last
+    uploaded, plus the Bronze key it landed under. Size and mtime are a cheap
+    first check; the content hash is only computed when they differ, so a
+    touched-but-identical file is still recognised as unchanged.
+    """
+
+    def __init__(self, path=BRONZE_STATE_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def fingerprint(self, source_path):
+        """
+        Returns (changed, fingerprint) for a source file.
+        The fingerprint is what `record` stores once the upload succeeds.
+        """
+        key = os.path.abspath(source_path)
+        stat = os.stat(source_path)
+        previous = self.entries.get(key)
+
+        if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+            return False, previous
+
+        fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_sha256(source_path)}
+        if previous and previous["sha256"] == fingerprint["sha256"]:
+            # Same content under a new mtime: refresh the stat so the next run is cheap again.
+            previous.update(mtime=stat.st_mtime)
+            return False, previous
+        return True, fingerprint
+
+    def record(self, source_path, fingerprint, table_name, s3_key):
+        """Marks a source as ingested at its current fingerprint."""
+        self.entries[os.path.abspath(source_path)] = {
+            **fingerprint,
+            "table": table_name,
+            "s3_key": s3_key,
+            "ingested_at": datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def save(self):
+        """Writes the state atomically so a crash mid-write cannot corrupt it."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
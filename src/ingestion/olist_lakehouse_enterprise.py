@@ -2,47 +2,70 @@
 # Kafka -> S3 Parquet with Apache Arrow
 # Resolved: Retry logic, Structured Logging, and Security
 import json
-import logging
 import os
+import signal
+import threading
 import pyarrow as pa
+import pyarrow.json as pj
 import pyarrow.parquet as pq
-import pyarrow.compute as pc
 from confluent_kafka import Consumer
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from src.ingestion.consumer_pipeline import (
+    BATCH_MAX_BYTES, BATCH_MAX_LATENCY_S, BATCH_MAX_RECORDS, COMMIT_INTERVAL_S, POLL_NUM_MESSAGES,
+    ConsumerMetrics, MicroBatcher, OffsetTracker, add_partition_columns, batch_offsets,
+    batch_start_offsets, log_commit_result, merge_offsets, rewind, run_pipeline,
+)
+from src.ingestion.batch_validation import (
+    DLQ_ORDERS_PATH, CompiledSchema, DeadLetterWriter, ValidationStats, validate_messages,
+)
+from src.ingestion.olist_schemas import OLIST_SCHEMAS, ORDER_EVENT_CONTRACT, ORDER_EVENT_TIMESTAMPS
+from src.ingestion.rolling_parquet_writer import RollingParquetWriter
+from src.observability.metrics import EXPECTATION_FAILURES, stage_means_ms, start_metrics_server, timed
+from src.observability.structured_logging import setup_logger
+from src.streaming.serializers import JsonSerde, group_by_format, serde_for_content_type
+from src.validation.arrow_expectations import suite_for_table
+
 # ==========================================
 # 1. STRUCTURED LOGGING
 # ==========================================
-class JsonFormatter(logging.Formatter):
-    def format(self, record):
-        log_obj = {
-            "timestamp": self.formatTime(record),
-            "level": record.levelname,
-            "message": record.getMessage(),
-            "module": record.module
-        }
-        if record.exc_info:
-            log_obj["exception"] = self.formatException(record.exc_info)
-        return json.dumps(log_obj)
-
-logger = logging.getLogger("lakehouse")
-handler = logging.StreamHandler()
-handler.setFormatter(JsonFormatter())
-logger.addHandler(handler)
-logger.setLevel(logging.INFO)
+# JSON lines written by a background thread (see structured_logging.py)
+logger = setup_logger("lakehouse", level=os.getenv("LAKEHOUSE_LOG_LEVEL", "INFO"))
 
 # ==========================================
 # 2. CONFIGURATION (SECURITY)
 # ==========================================
 KAFKA_BROKERS = os.getenv("KAFKA_BROKERS", "localhost:9092")
+KAFKA_TOPIC = os.getenv("KAFKA_TOPIC", "orders")
 S3_BUCKET = os.getenv("S3_SILVER_BUCKET", "olist-data-lake-silver")
+# Overridable so the consumer can run against a local directory instead of S3
+SILVER_ORDERS_PATH = os.getenv("SILVER_ORDERS_PATH", f"s3://{S3_BUCKET}/orders/")
+# Keep one open file per partition across batches (see rolling_parquet_writer.py)
+SILVER_ROLLING_WRITER = os.getenv("SILVER_ROLLING_WRITER", "false").lower() == "true"
+# Run fetch, decode and write as separate stages (see consumer_pipeline.py)
+LAKEHOUSE_PIPELINED = os.getenv("LAKEHOUSE_PIPELINED", "true").lower() == "true"
+# Check events against ORDER_EVENT_CONTRACT and route rejects to DLQ_ORDERS_PATH
+LAKEHOUSE_VALIDATE = os.getenv("LAKEHOUSE_VALIDATE", "true").lower() == "true"
+# Evaluate the olist_logistics_rules expectations on each decoded batch (failures are logged and counted)
+LAKEHOUSE_EXPECTATIONS = os.getenv("LAKEHOUSE_EXPECTATIONS", "true").lower() == "true"
+
+# Order events carry the Olist `orders` columns; fields outside it are dropped
+ORDER_EVENT_SCHEMA = OLIST_SCHEMAS["orders"]
+# Compiled once; validates whole batches column by column
+ORDER_EVENT_VALIDATOR = CompiledSchema(ORDER_EVENT_CONTRACT, ORDER_EVENT_SCHEMA, ORDER_EVENT_TIMESTAMPS)
+validation_stats = ValidationStats()
+dead_letters = DeadLetterWriter(DLQ_ORDERS_PATH)
+# Uniqueness is checked within each batch; a stream-wide key set would grow without bound
+ORDER_EXPECTATIONS = suite_for_table("orders", unique_scope="batch")
 
-consumer = Consumer({
-    'bootstrap.servers': KAFKA_BROKERS,
-    'group.id': 'lakehouse-enterprise-writers',
-    'auto.offset.reset': 'earliest',
-    'enable.auto.commit': False
-})
+def create_consumer():
+    return Consumer({
+        'bootstrap.servers': KAFKA_BROKERS,
+        'group.id': 'lakehouse-enterprise-writers',
+        'auto.offset.reset': 'earliest',
+        'enable.auto.commit': False,
+        'on_commit': log_commit_result
+    })
 
 # ==========================================
 # 3. CORE LOGIC (RESILIENCE)
@@ -57,34 +80,183 @@ def write_to_s3_resilient(table, path):
             partition_cols=['year', 'month', 'day'],
             compression='snappy'
         )
-        logger.info(f"Successfully wrote batch to {path}")
+        logger.info(f"Successfully wrote batch to {path}", extra={"timings": stage_means_ms()})
     except Exception as e:
         logger.error(f"S3 Write Failure: {e}")
         raise e
 
-def process_batch(messages):
+def decode_batch(messages, schema=ORDER_EVENT_SCHEMA):
+    """
+    Decodes a batch of JSON messages straight into an Arrow table.
+
+    Payloads are joined into one newline-delimited buffer and parsed by
+    Arrow's multi-threaded JSON reader against a fixed schema, so no Python
+    dict is built per record and column types never depend on the batch.
+    """
+    buffer = b"\n".join(msg.value() for msg in messages)
+    return pj.read_json(
+        pa.py_buffer(buffer),
+        parse_options=pj.ParseOptions(explicit_schema=schema, unexpected_field_behavior="ignore"),
+    )
+
+def decode_orders(messages):
+    """
+    Decode stage of the pipeline: order events -> partitioned Arrow table.
+    Each value is decoded according to its content-type header (JSON when
+    absent, see serializers.py). Records that fail to decode or break the
+    order contract go to the dead-letter output instead of failing the batch.
+    """
+    tables, dead = [], []
+    for content_type, group in group_by_format(messages):
+        try:
+            serde = serde_for_content_type(content_type)
+        except (ValueError, KeyError, ImportError) as e:
+            dead.extend((msg, f"undecodable: {e}") for msg in group)
+            continue
+        if LAKEHOUSE_VALIDATE:
+            table, rejected = validate_messages(group, ORDER_EVENT_VALIDATOR, validation_stats, serde=serde)
+            dead.extend(rejected)
+        elif isinstance(serde, JsonSerde):
+            table = decode_batch(group)
+        else:
+            table, _, errors = serde.decode_batch([msg.value() for msg in group], ORDER_EVENT_SCHEMA)
+            dead.extend((group[i], f"undecodable: {error}") for i, error in errors)
+        tables.append(table)
+    dead_letters.write(dead)
+    table = pa.concat_tables(tables) if tables else ORDER_EVENT_SCHEMA.empty_table()
+    if LAKEHOUSE_EXPECTATIONS:
+        check_expectations(table)
+    return add_partition_columns(table)
+
+def check_expectations(table, suite=ORDER_EXPECTATIONS):
+    """Runs the order expectations over a decoded batch and logs/counts the failing rows."""
+    with timed("expectations"):
+        result = suite.validate(table)
+    if not result.success:
+        failures = result.failure_counts()
+        for rule, count in failures.items():
+            EXPECTATION_FAILURES.inc(count, rule=rule)
+        logger.warning(f"Expectation failures in batch of {table.num_rows}: {json.dumps(failures)}")
+    return result
+
+def process_batch(messages, writer=None):
+    """
+    Decodes a batch, derives partition columns and writes it to Silver.
+    Without a rolling `writer` each batch is its own durable dataset write;
+    with one, rows are appended to open files that become durable when the
+    writer closes them. Returns False on failure; committing (or rewinding)
+    is left to `run_consumer`.
+    """
     try:
         if not messages:
-            return
-
-        valid_data = [json.loads(msg.value().decode('utf-8')) for msg in messages]
-        arrow_table = pa.Table.from_pylist(valid_data)
-        
-        # Extract partition columns
-        timestamps = pc.strptime(arrow_table.column('order_purchase_timestamp'), format='%Y-%m-%d %H:%M:%S', unit='s')
-        arrow_table = arrow_table.append_column('year', pc.year(timestamps))
-        arrow_table = arrow_table.append_column('month', pc.month(timestamps))
-        arrow_table = arrow_table.append_column('day', pc.day(timestamps))
-
-        # RESILIENCE: Execute S3 write with exponential backoff
-        s3_path = f"s3://{S3_BUCKET}/orders/"
-        write_to_s3_resilient(arrow_table, s3_path)
-        
-        consumer.commit()
+            return True
+
+        with timed("kafka_decode"):
+            arrow_table = decode_orders(messages)
+
+        with timed("parquet_write"):
+            if writer is not None:
+                writer.write(arrow_table)
+            else:
+                # RESILIENCE: Execute S3 write with exponential backoff
+                write_to_s3_resilient(arrow_table, SILVER_ORDERS_PATH)
+        return True
 
     except Exception as e:
         logger.error(f"Batch Processing Error: {e}")
+        if writer is not None:
+            writer.abort()
+        return False
+
+# ==========================================
+# 4. POLL LOOP (MICRO-BATCHING)
+# ==========================================
+def run_consumer(consumer, topics=(KAFKA_TOPIC,), max_records=BATCH_MAX_RECORDS, max_bytes=BATCH_MAX_BYTES,
+                 max_latency_s=BATCH_MAX_LATENCY_S, stop_event=None, stop_on_idle=False, handler=process_batch,
+                 writer=None, commit_interval_s=COMMIT_INTERVAL_S, async_commits=True, metrics=None):
+    """
+    Polls `consumer` and flushes micro-batches to `handler(messages, writer)`.
+
+    Messages accumulate until `max_records`, `max_bytes` or `max_latency_s`
+    (measured from the first buffered message) is reached, so each flush
+    produces one large Parquet write instead of one per poll. The loop runs
+    until `stop_event` is set or, with `stop_on_idle`, until a poll comes back
+    empty (a drained topic); the remaining buffer is flushed on the way out.
+
+    Only offsets of durably written records are committed, per partition,
+    through an OffsetTracker (async every `commit_interval_s`, sync on
+    shutdown and rebalance). With a RollingParquetWriter, records count as
+    written once the writer closes their files. A failed batch is re-consumed
+    by seeking its partitions back instead of being skipped by later commits.
+    Returns the final metrics snapshot.
+    """
+    stop_event = stop_event or threading.Event()
+    metrics = metrics or ConsumerMetrics(extra=validation_stats.snapshot)
+    batcher = MicroBatcher(max_records, max_bytes, max_latency_s)
+    tracker = OffsetTracker(consumer, commit_interval_s, async_commits)
+    # Rolling mode: offset range held in files the writer still has open
+    open_start, open_end = {}, {}
+
+    def make_durable():
+        nonlocal open_start, open_end
+        closed = writer.close()
+        tracker.mark_written(open_end)
+        open_start, open_end = {}, {}
+        logger.info(f"Rolled {len(closed)} Silver file(s).")
+
+    def flush(trigger):
+        nonlocal open_start, open_end
+        messages, size = batcher.take()
+        ok = handler(messages, writer)
+        metrics.record_flush(messages, size, ok)
+        if ok and writer is None:
+            tracker.mark_written(batch_offsets(messages))
+        elif ok:
+            merge_offsets(open_start, batch_start_offsets(messages), min)
+            merge_offsets(open_end, batch_offsets(messages))
+        else:
+            # The writer discards its open files on failure, so rewind past those too.
+            rewind(consumer, merge_offsets(batch_start_offsets(messages), open_start, min))
+            open_start, open_end = {}, {}
+        logger.info(f"Flushed {len(messages)} records ({size} bytes, trigger={trigger}): {json.dumps(metrics.snapshot())}",
+                    extra={"timings": stage_means_ms()})
+
+    consumer.subscribe(list(topics), on_assign=tracker.on_assign, on_revoke=tracker.on_revoke)
+    try:
+        while not stop_event.is_set():
+            messages = consumer.consume(num_messages=batcher.capacity(POLL_NUM_MESSAGES), timeout=batcher.poll_timeout())
+            batcher.add(messages)
+
+            trigger = batcher.trigger()
+            if trigger:
+                flush(trigger)
+            elif not messages and stop_on_idle:
+                break
+
+            if writer is not None and writer.should_flush():
+                make_durable()
+            tracker.maybe_commit()
+
+        if batcher.messages:
+            flush("shutdown")
+        if writer is not None and writer.open_files:
+            make_durable()
+        tracker.commit_final()
+    finally:
+        consumer.close()
+
+    return metrics.snapshot()
 
 if __name__ == "__main__":
     logger.info("🚀 Lakehouse Consumer Starting...")
-    # Polling loop would go here
+    start_metrics_server()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    writer = RollingParquetWriter(SILVER_ORDERS_PATH) if SILVER_ROLLING_WRITER else None
+    if LAKEHOUSE_PIPELINED:
+        run_pipeline(create_consumer(), decode_orders, write=lambda table: write_to_s3_resilient(table, SILVER_ORDERS_PATH),
+                     writer=writer, topics=(KAFKA_TOPIC,), stop_event=stop,
+                     metrics=ConsumerMetrics(extra=validation_stats.snapshot))
+    else:
+        run_consumer(create_consumer(), stop_event=stop, writer=writer)
@@ -1,51 +1,54 @@
 import json
 import logging
 import os
+import signal
+import threading
 import boto3
 import pyarrow as pa
 import pyarrow.parquet as pq
-import pyarrow.compute as pc
 from confluent_kafka import Consumer
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-# AWS Glue Schema Registry Integration
-from aws_glue_schema_registry.serde import KafkaDeserializer
+from src.ingestion.batch_validation import (
+    DLQ_ORDERS_PATH, CompiledSchema, DeadLetterWriter, ValidationStats, validate_messages,
+)
+from src.ingestion.consumer_pipeline import (
+    ConsumerMetrics, add_partition_columns, log_commit_result, run_pipeline,
+)
+from src.ingestion.olist_schemas import OLIST_SCHEMAS, ORDER_EVENT_TIMESTAMPS
+from src.streaming.glue_schema_cache import GLUE_PREWARM_SCHEMAS, CachingGlueClient, decode_glue_payload
+from src.observability.metrics import start_metrics_server
+from src.observability.structured_logging import setup_logger
+from src.streaming.serializers import AvroSerde
 
 # ==========================================
 # 1. STRUCTURED LOGGING
 # ==========================================
-class JsonFormatter(logging.Formatter):
-    def format(self, record):
-        log_obj = {
-            "timestamp": self.formatTime(record),
-            "level": record.levelname,
-            "message": record.getMessage(),
-        }
-        return json.dumps(log_obj)
-
-logger = logging.getLogger("lakehouse")
-handler = logging.StreamHandler()
-handler.setFormatter(JsonFormatter())
-logger.addHandler(handler)
-logger.setLevel(logging.INFO)
+# JSON lines written by a background thread (see structured_logging.py)
+logger = setup_logger("lakehouse", level=logging.INFO, fields=("timestamp", "level", "message"))
 
 # ==========================================
 # 2. CONFIGURATION
 # ==========================================
 KAFKA_BROKERS = os.getenv("KAFKA_BROKERS", "localhost:9092")
 S3_BUCKET = os.getenv("S3_SILVER_BUCKET", "olist-data-lake-silver")
+SILVER_ORDERS_PATH = os.getenv("SILVER_ORDERS_PATH", f"s3://{S3_BUCKET}/orders/")
 
-# 3. Initialize Glue Deserializer
-glue_client = boto3.client('glue', region_name=os.getenv("AWS_REGION", "ap-southeast-1"))
-deserializer = KafkaDeserializer(glue_client=glue_client)
+# 3. Initialize Glue Schema Registry access (schema lookups are served from a local cache)
+glue_client = CachingGlueClient(boto3.client('glue', region_name=os.getenv("AWS_REGION", "ap-southeast-1")))
+# Registered schemas compiled into (batch validator, body decoder), keyed by schema version ID
+compiled_schemas = {}
+validation_stats = ValidationStats()
+dead_letters = DeadLetterWriter(DLQ_ORDERS_PATH)
 
-consumer = Consumer({
-    'bootstrap.servers': KAFKA_BROKERS,
-    'group.id': 'lakehouse-enterprise-writers',
-    'auto.offset.reset': 'earliest',
-    'enable.auto.commit': False
-})
-consumer.subscribe(['orders'])
+def create_consumer():
+    return Consumer({
+        'bootstrap.servers': KAFKA_BROKERS,
+        'group.id': 'lakehouse-enterprise-writers',
+        'auto.offset.reset': 'earliest',
+        'enable.auto.commit': False,
+        'on_commit': log_commit_result
+    })
 
 # ==========================================
 # 4. CORE LOGIC (RESILIENCE)
@@ -59,28 +62,74 @@ def write_to_s3_resilient(table, path):
         compression='snappy'
     )
 
-def process_batch(messages):
-    try:
-        valid_data = []
-        for msg in messages:
-            # INTEGRATION: Deserialize and validate against Glue Registry
-            payload = deserializer.deserialize(msg.value())
-            valid_data.append(payload.data)
-        
-        arrow_table = pa.Table.from_pylist(valid_data)
-        
-        # Partitioning logic
-        timestamps = pc.strptime(arrow_table.column('order_purchase_timestamp'), format='%Y-%m-%d %H:%M:%S', unit='s')
-        arrow_table = arrow_table.append_column('year', pc.year(timestamps))
-        arrow_table = arrow_table.append_column('month', pc.month(timestamps))
-        arrow_table = arrow_table.append_column('day', pc.day(timestamps))
+def compiled_schema(version_id):
+    """
+    Fetches (through the cache) and compiles a registered schema once per version.
+    Returns (CompiledSchema, serde); the serde is None for JSON bodies. Avro
+    versions are decoded with their registered definition and type-checked
+    by the Avro decoder itself. Both also check the order timestamps parse,
+    as the purchase timestamp picks the Silver partition.
+    """
+    compiled = compiled_schemas.get(version_id)
+    if compiled is None:
+        version = glue_client.get_schema_version(SchemaVersionId=version_id)
+        definition = json.loads(version["SchemaDefinition"])
+        if version["DataFormat"] == "JSON":
+            compiled = (CompiledSchema(definition, timestamp_formats=ORDER_EVENT_TIMESTAMPS), None)
+        elif version["DataFormat"] == "AVRO":
+            serde = AvroSerde(definition, single_object=False)
+            compiled = (CompiledSchema({"type": "object"}, serde.arrow_schema, ORDER_EVENT_TIMESTAMPS), serde)
+        else:
+            raise ValueError(f"Schema version {version_id} is {version['DataFormat']}, expected JSON or AVRO")
+        compiled_schemas[version_id] = compiled
+    return compiled
+
+def decode_glue_batch(messages):
+    """
+    Decode stage: Glue-framed records -> partitioned Arrow table.
+
+    Records are grouped by the schema version ID in their Glue header and
+    each group is decoded and validated as one batch against that version's
+    compiled schema. Records that fail go to the dead-letter output.
+    """
+    groups, dead = {}, []
+    for msg in messages:
+        try:
+            version_id, body = decode_glue_payload(msg.value())
+        except ValueError as e:
+            dead.append((msg, str(e)))
+            continue
+        group = groups.setdefault(version_id, ([], []))
+        group[0].append(msg)
+        group[1].append(body)
 
-        write_to_s3_resilient(arrow_table, f"s3://{S3_BUCKET}/orders/")
-        consumer.commit()
-        logger.info(f"Schema-validated batch written to Silver layer.")
+    tables = []
+    for version_id, (group, bodies) in groups.items():
+        try:
+            compiled, serde = compiled_schema(version_id)
+        except Exception as e:
+            dead.extend((msg, f"schema {version_id} unavailable: {e}") for msg in group)
+            continue
+        # INTEGRATION: Validate against the schema registered in the Glue Registry
+        table, rejected = validate_messages(group, compiled, validation_stats, payloads=bodies,
+                                            unexpected_field_behavior="infer", serde=serde)
+        tables.append(table)
+        dead.extend(rejected)
+    dead_letters.write(dead)
 
-    except Exception as e:
-        logger.error(f"Batch Processing Error: {e}")
+    # Partitioning logic (a batch rejected in full is an empty table: handled, nothing to write)
+    if not tables:
+        return add_partition_columns(OLIST_SCHEMAS["orders"].empty_table())
+    return add_partition_columns(pa.concat_tables(tables, promote_options="permissive"))
 
 if __name__ == "__main__":
     logger.info("🚀 Lakehouse Consumer with AWS Glue Integration Starting...")
+    start_metrics_server()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    glue_client.prewarm(schema_names=GLUE_PREWARM_SCHEMAS)
+    # Fetch, Glue deserialization and the S3 write run as separate stages
+    run_pipeline(create_consumer(), decode_glue_batch, write=lambda table: write_to_s3_resilient(table, SILVER_ORDERS_PATH),
+                 topics=('orders',), stop_event=stop, metrics=ConsumerMetrics(extra=validation_stats.snapshot))
+    logger.info(f"Schema cache: {glue_client.stats()}")
@@ -0,0 +1,142 @@
+# olist_schemas.py
+# Keystone Nexus - Pinned Arrow schemas for the Olist source tables
+# Shared by the batch (CSV -> Bronze) and streaming (Kafka -> Silver) paths so
+# that column types are declared once instead of inferred per chunk/batch.
+import pyarrow as pa
+
+# ==========================================
+# 1. SOURCE FILES
+# ==========================================
+# Kaggle "Brazilian E-Commerce Public Dataset by Olist" file names, keyed by
+# the table name used in Bronze (`raw/{table}/...`) and the dbt sources.
+OLIST_SOURCE_FILES = {
+    "orders": "olist_orders_dataset.csv",
+    "order_items": "olist_order_items_dataset.csv",
+    "order_payments": "olist_order_payments_dataset.csv",
+    "order_reviews": "olist_order_reviews_dataset.csv",
+    "customers": "olist_customers_dataset.csv",
+    "products": "olist_products_dataset.csv",
+    "sellers": "olist_sellers_dataset.csv",
+    "geolocation": "olist_geolocation_dataset.csv",
+    "product_category_name_translation": "product_category_name_translation.csv",
+}
+
+# ==========================================
+# 2. PINNED SCHEMAS
+# ==========================================
+# Bronze is the raw layer: timestamps stay as strings (exactly as exported) and
+# are cast in the dbt staging models. Zip code prefixes are identifiers with
+# leading zeros, so they are pinned as strings rather than inferred as ints.
+OLIST_SCHEMAS = {
+    "orders": pa.schema([
+        ("order_id", pa.string()),
+        ("customer_id", pa.string()),
+        ("order_status", pa.string()),
+        ("order_purchase_timestamp", pa.string()),
+        ("order_approved_at", pa.string()),
+        ("order_delivered_carrier_date", pa.string()),
+        ("order_delivered_customer_date", pa.string()),
+        ("order_estimated_delivery_date", pa.string()),
+    ]),
+    "order_items": pa.schema([
+        ("order_id", pa.string()),
+        ("order_item_id", pa.int64()),
+        ("product_id", pa.string()),
+        ("seller_id", pa.string()),
+        ("shipping_limit_date", pa.string()),
+        ("price", pa.float64()),
+        ("freight_value", pa.float64()),
+    ]),
+    "order_payments": pa.schema([
+        ("order_id", pa.string()),
+        ("payment_sequential", pa.int64()),
+        ("payment_type", pa.string()),
+        ("payment_installments", pa.int64()),
+        ("payment_value", pa.float64()),
+    ]),
+    "order_reviews": pa.schema([
+        ("review_id", pa.string()),
+        ("order_id", pa.string()),
+        ("review_score", pa.int64()),
+        ("review_comment_title", pa.string()),
+        ("review_comment_message", pa.string()),
+        ("review_creation_date", pa.string()),
+        ("review_answer_timestamp", pa.string()),
+    ]),
+    "customers": pa.schema([
+        ("customer_id", pa.string()),
+        ("customer_unique_id", pa.string()),
+        ("customer_zip_code_prefix", pa.string()),
+        ("customer_city", pa.string()),
+        ("customer_state", pa.string()),
+    ]),
+    "products": pa.schema([
+        ("product_id", pa.string()),
+        ("product_category_name", pa.string()),
+        ("product_name_lenght", pa.int64()),
+        ("product_description_lenght", pa.int64()),
+        ("product_photos_qty", pa.int64()),
+        ("product_weight_g", pa.int64()),
+        ("product_length_cm", pa.int64()),
+        ("product_height_cm", pa.int64()),
+        ("product_width_cm", pa.int64()),
+    ]),
+    "sellers": pa.schema([
+        ("seller_id", pa.string()),
+        ("seller_zip_code_prefix", pa.string()),
+        ("seller_city", pa.string()),
+        ("seller_state", pa.string()),
+    ]),
+    "geolocation": pa.schema([
+        ("geolocation_zip_code_prefix", pa.string()),
+        ("geolocation_lat", pa.float64()),
+        ("geolocation_lng", pa.float64()),
+        ("geolocation_city", pa.string()),
+        ("geolocation_state", pa.string()),
+    ]),
+    "product_category_name_translation": pa.schema([
+        ("product_category_name", pa.string()),
+        ("product_category_name_english", pa.string()),
+    ]),
+}
+
+# Free-text review comments contain quoted line breaks; the CSV parser has to
+# be told, which disables its fast newline-splitting for these tables only.
+NEWLINES_IN_VALUES = {"order_reviews"}
+
+# ==========================================
+# 3. EVENT CONTRACTS
+# ==========================================
+# JSON Schema for order events on the `orders` topic, enforced by the
+# lakehouse consumer before Silver (the Glue consumer uses the registered
+# schema of each record instead). Timestamps use the Olist export format.
+OLIST_TIMESTAMP_PATTERN = r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$"
+OLIST_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+ORDER_EVENT_CONTRACT = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": "OlistOrderEvent",
+    "type": "object",
+    "required": ["order_id", "customer_id", "order_status", "order_purchase_timestamp"],
+    "properties": {
+        "order_id": {"type": "string", "pattern": "^[0-9a-f]{32}$"},
+        "customer_id": {"type": "string", "pattern": "^[0-9a-f]{32}$"},
+        "order_status": {
+            "type": "string",
+            "enum": ["created", "approved", "invoiced", "processing", "shipped", "delivered", "unavailable", "canceled"],
+        },
+        "order_purchase_timestamp": {"type": "string", "pattern": OLIST_TIMESTAMP_PATTERN},
+        "order_approved_at": {"type": ["string", "null"], "pattern": OLIST_TIMESTAMP_PATTERN},
+        "order_delivered_carrier_date": {"type": ["string", "null"], "pattern": OLIST_TIMESTAMP_PATTERN},
+        "order_delivered_customer_date": {"type": ["string", "null"], "pattern": OLIST_TIMESTAMP_PATTERN},
+        "order_estimated_delivery_date": {"type": ["string", "null"], "pattern": OLIST_TIMESTAMP_PATTERN},
+    },
+}
+
+# The pattern alone lets impossible dates through (2018-02-30, 2018-13-45 99:99:99),
+# so these columns are also parsed; the purchase timestamp picks the Silver partition.
+ORDER_EVENT_TIMESTAMPS = {
+    name: OLIST_TIMESTAMP_FORMAT
+    for name, prop in ORDER_EVENT_CONTRACT["properties"].items()
+    if prop.get("pattern") == OLIST_TIMESTAMP_PATTERN
+}
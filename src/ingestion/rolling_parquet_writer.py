@@ -0,0 +1,219 @@
+# rolling_parquet_writer.py
+# Keystone Nexus - Partition-aware rolling Parquet writer & small-file compaction
+# `pq.write_to_dataset` creates a new file in every year/month/day partition on
+# each flush; after a day of streaming, Athena spends its time opening files.
+# This writer keeps one open file per partition and appends row groups across
+# batches, closing files at a target size or age.
+#
+# Offline compaction:
+#   python -m src.ingestion.rolling_parquet_writer s3://olist-data-lake-silver/orders/ --target-mb 128
+import argparse
+import logging
+import os
+import time
+import uuid
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+logger = logging.getLogger("lakehouse")
+
+TARGET_FILE_MB = int(os.getenv("SILVER_TARGET_FILE_MB", "128"))
+MAX_FILE_AGE_S = float(os.getenv("SILVER_MAX_FILE_AGE_S", "900"))
+
+# Directory name Hive, Athena and pyarrow read back as a null partition value
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def resolve_filesystem(root_path, filesystem=None):
+    """Returns (filesystem, path) for a local path or a URI such as s3://bucket/prefix."""
+    if filesystem is not None:
+        return filesystem, root_path.rstrip("/")
+    filesystem, path = pafs.FileSystem.from_uri(root_path if "://" in root_path else os.path.abspath(root_path))
+    return filesystem, path.rstrip("/")
+
+
+def hidden_path(path):
+    """Athena/Hive skip files whose names start with '.' or '_'."""
+    directory, name = path.rsplit("/", 1)
+    return f"{directory}/.{name}.inprogress"
+
+
+class _OpenFile:
+    def __init__(self, filesystem, path, schema, compression, stage):
+        self.path = path
+        # S3 objects only become visible when the multipart upload completes,
+        # so only local files need a hidden staging name until they are closed.
+        self.write_path = hidden_path(path) if stage else path
+        self.sink = filesystem.open_output_stream(self.write_path)
+        self.writer = pq.ParquetWriter(self.sink, schema, compression=compression)
+        self.opened = time.monotonic()
+        self.rows = 0
+
+    @property
+    def size(self):
+        return self.sink.tell()
+
+
+class RollingParquetWriter:
+    """
+    Hive-partitioned Parquet writer that coalesces batches into large files.
+
+    Each partition (e.g. year=2018/month=1/day=5) has at most one open file;
+    every `write` appends row groups to it. A file is closed once it reaches
+    `target_file_bytes`. `should_flush()` turns true once the oldest open file
+    is older than `max_file_age_s`; the caller then calls `close()`, which
+    makes all buffered data durable together (the point to commit offsets).
+    """
+
+    def __init__(self, root_path, partition_cols=("year", "month", "day"), target_file_bytes=TARGET_FILE_MB * 2**20,
+                 max_file_age_s=MAX_FILE_AGE_S, compression="snappy", filesystem=None):
+        self.filesystem, self.root = resolve_filesystem(root_path, filesystem)
+        self.partition_cols = list(partition_cols)
+        self.target_file_bytes = target_file_bytes
+        self.max_file_age_s = max_file_age_s
+        self.compression = compression
+        self.stage = isinstance(self.filesystem, pafs.LocalFileSystem)
+        self.open_files = {}
+        self.closed_files = []
+
+    def write(self, table):
+        """Appends `table` to the open file of every partition it touches."""
+        for key, part in self._split(table):
+            open_file = self.open_files.get(key)
+            if open_file is None:
+                open_file = self._open(key, part.schema)
+            open_file.writer.write_table(part)
+            open_file.rows += part.num_rows
+            if open_file.size >= self.target_file_bytes:
+                self._close(key)
+
+    def should_flush(self):
+        """True when the oldest open file has reached `max_file_age_s`."""
+        now = time.monotonic()
+        return any(now - f.opened >= self.max_file_age_s for f in self.open_files.values())
+
+    def close(self):
+        """Closes every open file and returns the paths closed since the last call."""
+        for key in list(self.open_files):
+            self._close(key)
+        closed, self.closed_files = self.closed_files, []
+        return closed
+
+    def abort(self):
+        """Discards open files after a failed write so no partial file is published."""
+        for key, open_file in list(self.open_files.items()):
+            try:
+                open_file.writer.close()
+                open_file.sink.close()
+                self.filesystem.delete_file(open_file.write_path)
+            except Exception as e:
+                logger.warning(f"Could not discard {open_file.write_path}: {e}")
+            del self.open_files[key]
+
+    def _split(self, table):
+        """Yields (partition values, table without partition columns) pairs."""
+        data = table.drop_columns(self.partition_cols)
+        keys = table.select(self.partition_cols).group_by(self.partition_cols).aggregate([])
+        for row in keys.to_pylist():
+            mask = None
+            for col in self.partition_cols:
+                # pc.equal is null (not true) for null keys, which would drop those rows
+                eq = pc.is_null(table.column(col)) if row[col] is None else pc.equal(table.column(col), row[col])
+                mask = eq if mask is None else pc.and_(mask, eq)
+            yield tuple(row[col] for col in self.partition_cols), data.filter(mask)
+
+    def _open(self, key, schema):
+        directory = "/".join([self.root] + [f"{col}={NULL_PARTITION if value is None else value}"
+                                            for col, value in zip(self.partition_cols, key)])
+        self.filesystem.create_dir(directory, recursive=True)
+        path = f"{directory}/part-{uuid.uuid4().hex}.parquet"
+        open_file = self.open_files[key] = _OpenFile(self.filesystem, path, schema, self.compression, self.stage)
+        return open_file
+
+    def _close(self, key):
+        open_file = self.open_files.pop(key)
+        open_file.writer.close()
+        size = open_file.size
+        open_file.sink.close()
+        if open_file.write_path != open_file.path:
+            self.filesystem.move(open_file.write_path, open_file.path)
+        self.closed_files.append(open_file.path)
+        logger.info(f"Closed {open_file.path} ({open_file.rows} rows, {size} bytes)")
+
+
+# ==========================================
+# OFFLINE COMPACTION
+# ==========================================
+def compact_partition(partition_path, target_file_bytes=TARGET_FILE_MB * 2**20, compression="snappy", filesystem=None):
+    """
+    Merges the small Parquet files of one partition into target-sized files.
+
+    Rows are streamed batch by batch, never loaded whole. New files are
+    written under hidden names first and revealed before the originals are
+    deleted, so no row is ever missing: a reader may briefly see both copies,
+    and a crash in between leaves duplicates rather than data only in hidden
+    files. Returns (files_before, files_after).
+    """
+    filesystem, path = resolve_filesystem(partition_path, filesystem)
+    small = [
+        info.path for info in filesystem.get_file_info(pafs.FileSelector(path))
+        if info.type == pafs.FileType.File and info.base_name.endswith(".parquet")
+        and not info.base_name.startswith((".", "_")) and info.size < target_file_bytes
+    ]
+    if len(small) < 2:
+        return len(small), len(small)
+
+    dataset = ds.dataset(small, filesystem=filesystem, format="parquet")
+    staged, sink, writer = [], None, None
+    for batch in dataset.to_batches():
+        if writer is None:
+            final = f"{path}/part-{uuid.uuid4().hex}.parquet"
+            staged.append(final)
+            sink = filesystem.open_output_stream(hidden_path(final))
+            writer = pq.ParquetWriter(sink, dataset.schema, compression=compression)
+        writer.write_batch(batch)
+        if sink.tell() >= target_file_bytes:
+            writer.close()
+            sink.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+        sink.close()
+
+    for final in staged:
+        filesystem.move(hidden_path(final), final)
+    for old in small:
+        filesystem.delete_file(old)
+
+    logger.info(f"Compacted {path}: {len(small)} files -> {len(staged)} files")
+    return len(small), len(staged)
+
+
+def compact_dataset(root_path, target_file_bytes=TARGET_FILE_MB * 2**20, compression="snappy", filesystem=None):
+    """Compacts every leaf partition directory under `root_path`."""
+    filesystem, root = resolve_filesystem(root_path, filesystem)
+    directories = {root}
+    for info in filesystem.get_file_info(pafs.FileSelector(root, recursive=True)):
+        if info.type == pafs.FileType.File and info.base_name.endswith(".parquet"):
+            directories.add(info.path.rsplit("/", 1)[0])
+
+    summary = {}
+    for directory in sorted(directories):
+        before, after = compact_partition(directory, target_file_bytes, compression, filesystem)
+        if before != after:
+            summary[directory] = (before, after)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact small Parquet files per partition")
+    parser.add_argument("root_path", help="Dataset root (local path or s3://bucket/prefix/)")
+    parser.add_argument("--target-mb", type=int, default=TARGET_FILE_MB)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for directory, (before, after) in compact_dataset(args.root_path, args.target_mb * 2**20).items():
+        print(f"{directory}: {before} -> {after} files")
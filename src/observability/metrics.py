@@ -0,0 +1,218 @@
+# metrics.py
+# Keystone Nexus - In-process counters and timers for the ingestion and streaming hot paths
+# Stage timings (CSV parse, Parquet encode, S3 upload, Kafka decode, Parquet
+# write, offset commit), batch sizes and record counts are kept in a
+# process-wide registry, rendered in the Prometheus text format and served on
+# an optional local HTTP `/metrics` endpoint (METRICS_PORT, off by default).
+# The same timings are added to the structured JSON logs (`timings` field).
+#
+# Each process has its own registry: worker processes either serve their own
+# port (consumer fleet) or return their timings to the parent (Bronze pool).
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.observability.structured_logging import setup_logger
+
+logger = setup_logger(__name__)
+
+# 0 disables the HTTP endpoint
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+LATENCY_BUCKETS_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+BATCH_SIZE_BUCKETS = (1, 10, 100, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter, one series per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in self.values.items()]
+
+
+class Histogram:
+    """Bucketed observations with their sum and count, one series per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS_S):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def means(self, label):
+        """{label value: mean} over the process lifetime, e.g. mean seconds per stage."""
+        with self._lock:
+            index = self.labelnames.index(label)
+            return {key[index]: total / count for key, (_, total, count) in self.series.items() if count}
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in self.series.items():
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS_S):
+        return self._get(Histogram, name, help, labelnames, buckets)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("keystone_stage_seconds", "Time spent per pipeline stage", ("stage",))
+RECORDS = REGISTRY.counter("keystone_records_total", "Records processed per pipeline stage", ("stage",))
+BATCH_RECORDS = REGISTRY.histogram("keystone_batch_records", "Records per flushed consumer batch",
+                                   buckets=BATCH_SIZE_BUCKETS)
+EXPECTATION_FAILURES = REGISTRY.counter("keystone_expectation_failures_total",
+                                        "Rows failing each data quality expectation", ("rule",))
+
+
+def timed(stage):
+    """Context manager timing one pass of `stage` into STAGE_SECONDS."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def stage_means_ms():
+    """Mean milliseconds per stage since start, for log lines and metrics snapshots."""
+    return {f"{stage}_ms": round(seconds * 1000, 2) for stage, seconds in STAGE_SECONDS.means("stage").items()}
+
+
+class Timings:
+    """
+    Stage durations of one unit of work (a file, a batch). `fields()` goes
+    into log lines; `observe()` adds them to STAGE_SECONDS once the unit is
+    done, in whichever process owns the registry that is served.
+    """
+
+    def __init__(self, seconds=None):
+        self.seconds = dict(seconds or {})
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def observe(self):
+        for stage, seconds in self.seconds.items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+        return self
+
+    def fields(self):
+        return {f"{stage}_ms": round(seconds * 1000, 2) for stage, seconds in self.seconds.items()}
+
+
+# ==========================================
+# HTTP ENDPOINT
+# ==========================================
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serves REGISTRY on http://host:port/metrics from a daemon thread; returns the server (None if port is 0)."""
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,220 @@
+# structured_logging.py
+# Keystone Nexus - Shared structured JSON logging for the pipelines
+# Log calls on the hot path only build the message and enqueue the record
+# (QueueHandler); JSON encoding (orjson when installed) and batched stream
+# writes happen on a background writer thread. Per-record log lines can be
+# sampled and rate limited per call site, so a chatty producer or consumer
+# loop cannot turn logging into a measurable share of CPU.
+import atexit
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj, default=str).decode("utf-8")
+except ImportError:
+    import json
+
+    def _dumps(obj):
+        return json.dumps(obj, default=str)
+
+# Loggers given a RateLimitFilter (the producers' per-record lines): at most
+# LOG_RATE_LIMIT_PER_S lines/s per call site, bursts up to LOG_RATE_LIMIT_BURST; 0 disables
+LOG_RATE_LIMIT_PER_S = float(os.getenv("LOG_RATE_LIMIT_PER_S", "10"))
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "20"))
+# Fraction of INFO/DEBUG lines kept on those loggers (1 keeps all)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+# Set to false to format and write on the calling thread
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+
+DEFAULT_FIELDS = ("timestamp", "level", "message", "module")
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line with the chosen `fields` (timestamp, level,
+    message, module, func, logger), plus `timings` / `suppressed` when the
+    record carries them and the exception text when there is one.
+    """
+
+    def __init__(self, fields=DEFAULT_FIELDS):
+        super().__init__()
+        self.fields = tuple(fields)
+
+    def format(self, record):
+        values = {
+            "timestamp": lambda: self.formatTime(record),
+            "level": lambda: record.levelname,
+            "message": record.getMessage,
+            "module": lambda: record.module,
+            "func": lambda: record.funcName,
+            "logger": lambda: record.name,
+        }
+        log_obj = {field: values[field]() for field in self.fields}
+        # Stage timings passed as `extra={"timings": ...}`
+        if hasattr(record, "timings"):
+            log_obj["timings"] = record.timings
+        if getattr(record, "suppressed", 0):
+            log_obj["suppressed"] = record.suppressed
+        if record.exc_info:
+            log_obj["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_obj["exception"] = record.exc_text
+        return _dumps(log_obj)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site (file, line): at most `per_second` records/s
+    after a burst of `burst`. WARNING and above always pass. Of the records
+    that fit the budget, INFO/DEBUG ones are kept with probability
+    `sample_rate`. The next record let through from a call site reports how
+    many were dropped since (`suppressed`).
+    """
+
+    def __init__(self, per_second=LOG_RATE_LIMIT_PER_S, burst=LOG_RATE_LIMIT_BURST, sample_rate=LOG_SAMPLE_RATE):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self.sample_rate = sample_rate
+        self.sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self.sites.get(site, (self.burst, now, 0))
+            if self.per_second > 0:
+                tokens = min(self.burst, tokens + (now - last) * self.per_second)
+            keep = (self.per_second <= 0 or tokens >= 1) and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+            if keep:
+                if self.per_second > 0:
+                    tokens -= 1
+                record.suppressed = suppressed
+                suppressed = 0
+            else:
+                suppressed += 1
+            self.sites[site] = (tokens, now, suppressed)
+        return keep
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener: only the message
+    text and the exception traceback are resolved on the calling thread
+    (the arguments may change after the call returns). It is the logger's
+    only handler, so the record is updated in place rather than copied.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class BackgroundWriter:
+    """
+    Drains a log queue on a daemon thread: formats whatever records have
+    queued up (up to `max_batch`) and writes them with a single write and
+    flush, instead of one of each per record.
+    """
+
+    def __init__(self, log_queue, stream, formatter, max_batch=1024):
+        self.queue = log_queue
+        self.stream = stream
+        self.formatter = formatter
+        self.max_batch = max_batch
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Writes everything queued so far and stops the thread."""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def restart_in_child(self, handler):
+        """
+        Forked children inherit the queue and handler but not the writer
+        thread, so their records would never be written. Starts a new thread
+        on a fresh queue (records the parent had queued stay the parent's).
+        """
+        self.queue = handler.queue = queue.SimpleQueue()
+        self.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not None]
+            if records:
+                try:
+                    self.stream.write("\n".join(map(self.formatter.format, records)) + "\n")
+                    self.stream.flush()
+                except Exception as e:
+                    sys.__stderr__.write(f"Log write failed, dropped {len(records)} record(s): {e!r}\n")
+            if len(records) < len(batch):
+                return
+
+
+def setup_logger(name, level=logging.INFO, fields=DEFAULT_FIELDS, stream=None, asynchronous=LOG_ASYNC,
+                 rate_limit=None):
+    """
+    Configures `name` to log JSON lines to `stream` (stderr by default)
+    through a BackgroundWriter, and returns the logger. Pass a
+    RateLimitFilter as `rate_limit` for loggers with per-record lines.
+    The logger does not propagate, so a root handler cannot print lines twice.
+    Calling it again for the same name returns the logger unchanged.
+    """
+    logger = logging.getLogger(name)
+    if getattr(logger, "_structured", False):
+        return logger
+    stream = stream or sys.stderr
+    if asynchronous:
+        log_queue = queue.SimpleQueue()
+        listener = BackgroundWriter(log_queue, stream, JsonFormatter(fields))
+        handler = BackgroundQueueHandler(log_queue)
+        listener.start()
+        # Flush on interpreter exit, and in multiprocessing children, which skip atexit
+        atexit.register(listener.stop)
+        multiprocessing.util.Finalize(listener, listener.stop, exitpriority=10)
+        # Forked children (ProcessPoolExecutor/multiprocessing workers) get their own writer;
+        # multiprocessing clears inherited finalizers in the child, so register it again there
+        os.register_at_fork(after_in_child=lambda: listener.restart_in_child(handler))
+        multiprocessing.util.register_after_fork(
+            listener, lambda l: multiprocessing.util.Finalize(l, l.stop, exitpriority=10))
+        logger.addHandler(handler)
+        logger.listener = listener
+    else:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter(fields))
+        logger.addHandler(handler)
+    if rate_limit is not None:
+        logger.addFilter(rate_limit)
+    logger.setLevel(level)
+    logger.propagate = False
+    logger._structured = True
+    return logger
@@ -0,0 +1,347 @@
+# fakes.py
+# Keystone Nexus - In-process Kafka stand-ins for tests, local runs and benchmarks
+# Mirrors the subset of the confluent_kafka Consumer/Message API used by the
+# lakehouse consumers, so their poll loops run without a broker.
+import json
+import random
+import time
+import threading
+
+from confluent_kafka import TopicPartition
+
+TIMESTAMP_NOT_AVAILABLE = 0
+TIMESTAMP_CREATE_TIME = 1
+
+ORDER_STATUSES = ["created", "approved", "invoiced", "processing", "shipped", "delivered", "unavailable", "canceled"]
+
+
+def make_order(i, rng):
+    """A synthetic order event with the Olist `orders` columns."""
+    purchase = f"2018-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+    return {
+        "order_id": f"{i:032x}",
+        "customer_id": f"{rng.getrandbits(128):032x}",
+        "order_status": rng.choice(ORDER_STATUSES),
+        "order_purchase_timestamp": purchase,
+        "order_approved_at": purchase,
+        "order_delivered_carrier_date": None,
+        "order_delivered_customer_date": None,
+        "order_estimated_delivery_date": "2018-12-31 00:00:00",
+    }
+
+
+class FakeMessage:
+    """A confluent_kafka.Message look-alike."""
+
+    def __init__(self, value, topic="orders", partition=0, offset=0, key=None, timestamp_ms=None, headers=None):
+        self._value = value
+        self._key = key
+        self._headers = headers
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._timestamp_ms = int(time.time() * 1000) if timestamp_ms is None else timestamp_ms
+
+    def value(self):
+        return self._value
+
+    def key(self):
+        return self._key
+
+    def headers(self):
+        return self._headers
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+    def timestamp(self):
+        return TIMESTAMP_CREATE_TIME, self._timestamp_ms
+
+    def error(self):
+        return None
+
+    def __len__(self):
+        return len(self._value or b"")
+
+
+class FakeConsumer:
+    """
+    A confluent_kafka.Consumer look-alike backed by in-memory partitions.
+
+    `partitions` maps partition number -> list of payloads (bytes) for `topic`;
+    `consume` interleaves partitions round-robin like a real fetch would.
+    Returns an empty list once drained, after waiting up to `timeout` only if
+    `block_when_drained` is set (to exercise latency-based flushing).
+    Synchronous commits block for `commit_latency_s` to model the broker
+    round trip. `headers` are attached to every message.
+    """
+
+    def __init__(self, partitions, topic="orders", block_when_drained=False, commit_latency_s=0.0, headers=None):
+        self.topic = topic
+        self.block_when_drained = block_when_drained
+        self.commit_latency_s = commit_latency_s
+        self.queues = {
+            p: [FakeMessage(v, topic=topic, partition=p, offset=i, headers=headers) for i, v in enumerate(values)]
+            for p, values in partitions.items()
+        }
+        self.positions = {p: 0 for p in self.queues}
+        self.paused = set()
+        self.committed = {}
+        self.commit_calls = 0
+        self.subscribed = []
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics, on_assign=None, on_revoke=None):
+        self.subscribed = list(topics)
+
+    def consume(self, num_messages=1, timeout=-1):
+        batch = []
+        with self._lock:
+            while len(batch) < num_messages:
+                progressed = False
+                for p, queue in self.queues.items():
+                    if p in self.paused:
+                        continue
+                    if self.positions[p] < len(queue) and len(batch) < num_messages:
+                        batch.append(queue[self.positions[p]])
+                        self.positions[p] += 1
+                        progressed = True
+                if not progressed:
+                    break
+        if not batch and self.block_when_drained and timeout and timeout > 0:
+            time.sleep(timeout)
+        return batch
+
+    def assignment(self):
+        return [TopicPartition(self.topic, p) for p in self.queues]
+
+    def pause(self, partitions):
+        self.paused.update(tp.partition for tp in partitions)
+
+    def resume(self, partitions):
+        self.paused.difference_update(tp.partition for tp in partitions)
+
+    def seek(self, partition):
+        with self._lock:
+            self.positions[partition.partition] = partition.offset
+
+    def commit(self, message=None, offsets=None, asynchronous=True):
+        if not asynchronous and self.commit_latency_s:
+            time.sleep(self.commit_latency_s)
+        with self._lock:
+            self.commit_calls += 1
+            if offsets is not None:
+                for tp in offsets:
+                    self.committed[tp.partition] = tp.offset
+            elif message is not None:
+                self.committed[message.partition()] = message.offset() + 1
+            else:
+                self.committed.update(self.positions)
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def drained(self):
+        return all(self.positions[p] >= len(q) for p, q in self.queues.items())
+
+
+def fake_group_consumer(worker_id, num_workers, num_partitions=8, records_per_partition=100000, seed=7):
+    """
+    Stand-in for one member of a consumer group on a multi-partition `orders`
+    topic: partitions are assigned round-robin (p % num_workers == worker_id),
+    each holding `records_per_partition` JSON order events. Picklable, so it
+    can be passed to the consumer fleet as a consumer factory.
+    """
+    partitions = {}
+    for p in range(worker_id, num_partitions, num_workers):
+        rng = random.Random(seed + p)
+        partitions[p] = [
+            json.dumps(make_order(p * records_per_partition + i, rng)).encode("utf-8")
+            for i in range(records_per_partition)
+        ]
+    return FakeConsumer(partitions)
+
+
+class FakeFuture:
+    """A kafka-python FutureRecordMetadata look-alike."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.value = None
+        self.exception = None
+        self._callbacks = []
+        self._errbacks = []
+        self._lock = threading.Lock()
+
+    def add_callback(self, fn, *args, **kwargs):
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append((fn, args, kwargs))
+                return self
+        if self.exception is None:
+            fn(*args, self.value, **kwargs)
+        return self
+
+    def add_errback(self, fn, *args, **kwargs):
+        with self._lock:
+            if not self._done.is_set():
+                self._errbacks.append((fn, args, kwargs))
+                return self
+        if self.exception is not None:
+            fn(*args, self.exception, **kwargs)
+        return self
+
+    def succeeded(self):
+        return self._done.is_set() and self.exception is None
+
+    def get(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError("Timed out waiting for delivery")
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+    def _resolve(self, value=None, exception=None):
+        with self._lock:
+            self.value, self.exception = value, exception
+            self._done.set()
+            callbacks = self._errbacks if exception is not None else self._callbacks
+        for fn, args, kwargs in callbacks:
+            fn(*args, exception if exception is not None else value, **kwargs)
+
+
+class FakeRecordMetadata:
+    def __init__(self, topic, partition, offset):
+        self.topic = topic
+        self.partition = partition
+        self.offset = offset
+
+
+class FakeKafkaProducer:
+    """
+    A kafka-python KafkaProducer look-alike that models the broker round trip.
+
+    Records are accumulated per partition and sent as one produce request
+    per batch once it reaches `batch_size` bytes or `linger_ms` age (or on
+    `flush`). Each request costs `request_latency_s`, with up to
+    `max_in_flight_requests_per_connection` requests outstanding. Batches
+    are really compressed with `compression_type` (gzip only, the codec
+    needing no extra library), so its CPU cost and `bytes_sent` are real.
+    """
+
+    def __init__(self, value_serializer=None, key_serializer=None, linger_ms=0, batch_size=16384,
+                 compression_type=None, max_in_flight_requests_per_connection=5, request_latency_s=0.002,
+                 partitions=8, **config):
+        import gzip
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.value_serializer = value_serializer
+        self.key_serializer = key_serializer
+        self.linger_s = linger_ms / 1000
+        self.batch_size = batch_size
+        self.compress = gzip.compress if compression_type == "gzip" else None
+        self.request_latency_s = request_latency_s
+        self.partitions = partitions
+        self.config = config
+        self.requests = 0
+        self.records_sent = 0
+        self.bytes_sent = 0
+        self._batches = {}   # partition -> [opened_at, size, [(payload, future)]]
+        self._offsets = {p: 0 for p in range(partitions)}
+        self._next_partition = 0
+        self._in_flight = threading.Semaphore(max_in_flight_requests_per_connection)
+        self._pool = ThreadPoolExecutor(max_in_flight_requests_per_connection)
+        self._pending = []
+        self._cond = threading.Condition()
+        self._flushing = False
+        self._closed = False
+        self._sender = threading.Thread(target=self._run, name="fake-kafka-sender", daemon=True)
+        self._sender.start()
+
+    def send(self, topic, value=None, key=None, headers=None, partition=None, timestamp_ms=None):
+        payload = self.value_serializer(value) if self.value_serializer else value
+        if key is not None and self.key_serializer:
+            key = self.key_serializer(key)
+        future = FakeFuture()
+        with self._cond:
+            if partition is None:
+                if key is not None:
+                    partition = hash(key) % self.partitions
+                else:
+                    partition = self._next_partition
+            batch = self._batches.get(partition)
+            if batch is None:
+                # Wake the sender to schedule this batch's linger deadline
+                batch = self._batches[partition] = [time.monotonic(), 0, []]
+                self._cond.notify()
+            batch[1] += len(payload) + (len(key) if key else 0)
+            batch[2].append((topic, payload, future))
+            self._pending.append(future)
+            if batch[1] >= self.batch_size:
+                if key is None:
+                    # Sticky partitioning: move on once a batch is full
+                    self._next_partition = (self._next_partition + 1) % self.partitions
+                self._cond.notify()
+        return future
+
+    def flush(self, timeout=None):
+        with self._cond:
+            self._flushing = True
+            pending, self._pending = self._pending, []
+            self._cond.notify()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in pending:
+            future._done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            self._flushing = False
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._sender.join()
+        self._pool.shutdown()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                ready = [p for p, (opened, size, _) in self._batches.items()
+                         if self._flushing or size >= self.batch_size or now - opened >= self.linger_s]
+                if not ready:
+                    if self._closed:
+                        return
+                    opened = [b[0] for b in self._batches.values()]
+                    wait = max(0.0, min(opened) + self.linger_s - now) if opened else None
+                    self._cond.wait(wait)
+                    continue
+                batches = [(p, self._batches.pop(p)[2]) for p in ready]
+            for partition, records in batches:
+                self._in_flight.acquire()
+                self._pool.submit(self._produce, partition, records)
+
+    def _produce(self, partition, records):
+        try:
+            data = b"".join(payload for _, payload, _ in records)
+            if self.compress:
+                data = self.compress(data)
+            time.sleep(self.request_latency_s)
+            with self._cond:
+                self.requests += 1
+                self.records_sent += len(records)
+                self.bytes_sent += len(data)
+                base = self._offsets[partition]
+                self._offsets[partition] += len(records)
+            for i, (topic, _, future) in enumerate(records):
+                future._resolve(FakeRecordMetadata(topic, partition, base + i))
+        finally:
+            self._in_flight.release()
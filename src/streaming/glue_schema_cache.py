@@ -0,0 +1,175 @@
+# glue_schema_cache.py
+# Keystone Nexus - Local schema cache for the AWS Glue Schema Registry serde
+# Every Glue-framed Kafka record names its schema by version ID; resolving that
+# ID (or, when producing, a schema definition) is a Glue API round trip. This
+# module wraps the boto3 Glue client handed to KafkaSerializer/KafkaDeserializer
+# so those lookups are answered from a bounded LRU cache with a TTL.
+import logging
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+GLUE_REGISTRY_NAME = os.getenv("GLUE_REGISTRY_NAME", "keystone-registry")
+GLUE_SCHEMA_CACHE_SIZE = int(os.getenv("GLUE_SCHEMA_CACHE_SIZE", "1000"))
+GLUE_SCHEMA_CACHE_TTL_S = float(os.getenv("GLUE_SCHEMA_CACHE_TTL_S", "3600"))
+# Comma-separated schema names whose latest version is fetched at startup
+GLUE_PREWARM_SCHEMAS = [s for s in os.getenv("GLUE_PREWARM_SCHEMAS", "").split(",") if s]
+
+# Glue wire format: header version byte, compression byte, 16-byte schema version UUID
+HEADER_VERSION_BYTE = 3
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 5
+HEADER_SIZE = 18
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire `ttl_s` after insertion."""
+
+    def __init__(self, max_size=GLUE_SCHEMA_CACHE_SIZE, ttl_s=GLUE_SCHEMA_CACHE_TTL_S):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_s:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CachingGlueClient:
+    """
+    Drop-in wrapper for a boto3 Glue client that caches schema lookups.
+
+    `get_schema_version` responses are keyed by SchemaVersionId (a version's
+    definition never changes); "latest version of schema X" lookups share
+    the cache but are only trusted for `ttl_s`, which bounds how long a new
+    version can go unnoticed. Definition -> version ID lookups made when
+    producing (`get_schema_by_definition`, `register_schema_version`) are
+    cached per (registry, schema, definition). Anything else is passed
+    through to the wrapped client.
+    """
+
+    def __init__(self, glue_client, max_size=GLUE_SCHEMA_CACHE_SIZE, ttl_s=GLUE_SCHEMA_CACHE_TTL_S):
+        self.client = glue_client
+        self.cache = TTLCache(max_size, ttl_s)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def get_schema_version(self, SchemaVersionId=None, SchemaId=None, SchemaVersionNumber=None, **kwargs):
+        if SchemaVersionId is not None:
+            key = ("id", SchemaVersionId)
+        else:
+            key = ("number", _schema_key(SchemaId), tuple(sorted((SchemaVersionNumber or {}).items())))
+        response = self.cache.get(key)
+        if response is None:
+            request = {k: v for k, v in (("SchemaVersionId", SchemaVersionId), ("SchemaId", SchemaId),
+                                         ("SchemaVersionNumber", SchemaVersionNumber)) if v is not None}
+            response = self.client.get_schema_version(**request, **kwargs)
+            self.cache.put(key, response)
+            if SchemaVersionId is None:
+                self.cache.put(("id", response["SchemaVersionId"]), response)
+        return response
+
+    def get_schema_by_definition(self, SchemaId, SchemaDefinition, **kwargs):
+        return self._by_definition("get_schema_by_definition", SchemaId, SchemaDefinition, **kwargs)
+
+    def register_schema_version(self, SchemaId, SchemaDefinition, **kwargs):
+        return self._by_definition("register_schema_version", SchemaId, SchemaDefinition, **kwargs)
+
+    def _by_definition(self, method, SchemaId, SchemaDefinition, **kwargs):
+        key = ("definition", _schema_key(SchemaId), SchemaDefinition)
+        response = self.cache.get(key)
+        if response is None:
+            response = getattr(self.client, method)(SchemaId=SchemaId, SchemaDefinition=SchemaDefinition, **kwargs)
+            # A pending registration has no usable version yet; ask again next time.
+            if response.get("Status", "AVAILABLE") == "AVAILABLE":
+                self.cache.put(key, response)
+        return response
+
+    def prewarm(self, version_ids=(), schema_names=(), definitions=(), registry_name=GLUE_REGISTRY_NAME):
+        """
+        Loads schemas before traffic arrives: known `version_ids`, the latest
+        version of `schema_names` (for both consuming and producing with that
+        definition) and explicit (schema name, definition) pairs.
+        """
+        for version_id in version_ids:
+            self.get_schema_version(SchemaVersionId=version_id)
+        for name in schema_names:
+            schema_id = {"RegistryName": registry_name, "SchemaName": name}
+            response = self.get_schema_version(SchemaId=schema_id, SchemaVersionNumber={"LatestVersion": True})
+            self.cache.put(("definition", _schema_key(schema_id), response["SchemaDefinition"]), response)
+        for name, definition in definitions:
+            self.get_schema_by_definition(SchemaId={"RegistryName": registry_name, "SchemaName": name},
+                                          SchemaDefinition=definition)
+        # Prewarming is not traffic: start the counters from zero.
+        self.cache.hits = self.cache.misses = 0
+        logger.info(f"Prewarmed Glue schema cache with {len(self.cache)} entries")
+
+    def stats(self):
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "evictions": self.cache.evictions,
+            "size": len(self.cache),
+            "hit_rate": round(self.cache.hits / lookups, 4) if lookups else None,
+        }
+
+
+def _schema_key(schema_id):
+    schema_id = schema_id or {}
+    return schema_id.get("SchemaArn") or (schema_id.get("RegistryName"), schema_id.get("SchemaName"))
+
+
+# ==========================================
+# WIRE FORMAT
+# ==========================================
+def encode_glue_payload(version_id, body, compress=False):
+    """Frames `body` with the Glue header naming schema version `version_id`."""
+    compression = COMPRESSION_ZLIB if compress else COMPRESSION_NONE
+    if compress:
+        body = zlib.compress(body)
+    return bytes([HEADER_VERSION_BYTE, compression]) + uuid.UUID(version_id).bytes + body
+
+
+def decode_glue_payload(payload):
+    """Returns (schema version ID, body) of a Glue-framed record."""
+    if len(payload) < HEADER_SIZE or payload[0] != HEADER_VERSION_BYTE:
+        raise ValueError("Record is not framed with a Glue Schema Registry header")
+    version_id = str(uuid.UUID(bytes=bytes(payload[2:HEADER_SIZE])))
+    body = payload[HEADER_SIZE:]
+    if payload[1] == COMPRESSION_ZLIB:
+        body = zlib.decompress(body)
+    elif payload[1] != COMPRESSION_NONE:
+        raise ValueError(f"Unknown Glue compression byte {payload[1]}")
+    return version_id, body
@@ -1,34 +1,159 @@
-import json
 import time
 import os
+import threading
+from collections import Counter
 from kafka import KafkaProducer
+from kafka.codec import has_gzip, has_lz4, has_snappy, has_zstd
 from kafka.errors import KafkaError
-import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+from src.observability.metrics import RECORDS
+from src.observability.structured_logging import RateLimitFilter, setup_logger
+from src.streaming.serializers import CONTENT_TYPE_HEADER, PRODUCER_VALUE_FORMAT, get_serde
+
+# Configure logging: JSON lines written off the send path, per-record lines rate limited
+logger = setup_logger(__name__, rate_limit=RateLimitFilter())
+
+# Throughput tuning: records wait up to PRODUCER_LINGER_MS to fill batches of
+# PRODUCER_BATCH_SIZE bytes; batches are compressed with the first available
+# codec in PRODUCER_COMPRESSION ("none" disables compression).
+PRODUCER_LINGER_MS = int(os.getenv("PRODUCER_LINGER_MS", "20"))
+PRODUCER_BATCH_SIZE = int(os.getenv("PRODUCER_BATCH_SIZE", str(256 * 1024)))
+PRODUCER_COMPRESSION = os.getenv("PRODUCER_COMPRESSION", "zstd,lz4,gzip")
+
+CODECS = {"zstd": has_zstd, "lz4": has_lz4, "snappy": has_snappy, "gzip": has_gzip}
+
+def pick_compression(preference=PRODUCER_COMPRESSION):
+    """First codec in the comma-separated `preference` whose library is installed, or None."""
+    for name in preference.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name == "none":
+            return None
+        available = CODECS.get(name)
+        if available is None:
+            logger.warning(f"Unknown compression codec '{name}' in PRODUCER_COMPRESSION "
+                           f"(expected one of {', '.join(CODECS)} or none)")
+            continue
+        if available():
+            return name
+        logger.warning(f"Compression codec '{name}' unavailable (library not installed)")
+    return None
+
+def encode_key(key):
+    return key.encode('utf-8') if isinstance(key, str) else key
+
+class DeliveryReport:
+    """
+    Aggregated delivery results of records sent without blocking.
+    Filled in by producer callbacks; `wait()` flushes and returns the report.
+    """
+
+    def __init__(self, producer, max_errors=10):
+        self.producer = producer
+        self.max_errors = max_errors
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.errors = []
+        self.partitions = Counter()
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def on_success(self, metadata):
+        with self._lock:
+            self.delivered += 1
+            self.partitions[metadata.partition] += 1
+        RECORDS.inc(stage="produced")
+
+    def on_error(self, exc):
+        RECORDS.inc(stage="produce_failed")
+        with self._lock:
+            self.failed += 1
+            if len(self.errors) < self.max_errors:
+                self.errors.append(repr(exc))
+
+    @property
+    def done(self):
+        return self.delivered + self.failed >= self.enqueued
+
+    def wait(self, timeout=None):
+        self.producer.flush(timeout)
+        return self
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "records_per_s": round(self.delivered / elapsed, 1),
+            "partitions": dict(self.partitions),
+            "errors": self.errors,
+        }
 
 class MSKProducer:
-    def __init__(self, bootstrap_servers):
+    def __init__(self, bootstrap_servers, linger_ms=PRODUCER_LINGER_MS, batch_size=PRODUCER_BATCH_SIZE,
+                 compression=PRODUCER_COMPRESSION, serializer=PRODUCER_VALUE_FORMAT, producer_factory=KafkaProducer,
+                 **producer_config):
+        # Value format (see serializers.py); consumers pick the decoder from the content-type header
+        self.serde = get_serde(serializer) if isinstance(serializer, str) else serializer
+        self.headers = [(CONTENT_TYPE_HEADER, self.serde.content_type.encode('utf-8'))]
         # In production with MSK, you'd typically use IAM authentication
         # For development/public MSK, plain or SASL_SSL is common
-        self.producer = KafkaProducer(
+        self.producer = producer_factory(
             bootstrap_servers=bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+            value_serializer=self.serde.dumps,
+            key_serializer=encode_key,
             retries=5,
-            acks='all' # Ensure data durability
+            acks='all', # Ensure data durability
+            linger_ms=linger_ms,
+            batch_size=batch_size,
+            compression_type=pick_compression(compression),
+            **producer_config
         )
 
     def send_order(self, topic, order_data):
+        """Sends one record and blocks until it is acknowledged; use `send_many` for throughput."""
         try:
-            future = self.producer.send(topic, order_data)
+            future = self.producer.send(topic, order_data, headers=self.headers)
             # Wait for record to be effectively sent
             record_metadata = future.get(timeout=10)
             logger.info(f"Sent message to {record_metadata.topic} partition {record_metadata.partition}")
         except KafkaError as e:
             logger.error(f"Error sending to MSK: {e}")
 
+    def send_async(self, topic, value, key=None, on_success=None, on_error=None):
+        """Enqueues one record without waiting; delivery is reported to the callbacks."""
+        future = self.producer.send(topic, value=value, key=key, headers=self.headers)
+        if on_success is not None:
+            future.add_callback(on_success)
+        if on_error is not None:
+            future.add_errback(on_error)
+        return future
+
+    def send_many(self, topic, records, key=None, report=None):
+        """
+        Enqueues `records` without waiting for acknowledgements and returns a
+        DeliveryReport (pass `report` to accumulate over several calls).
+        `key(record)` picks the message key, e.g. the order_id so that all
+        events of an order stay in one partition. `send` only blocks when
+        the producer's buffer is full, which throttles the caller.
+        """
+        report = report or DeliveryReport(self.producer)
+        for record in records:
+            report.enqueued += 1
+            try:
+                self.send_async(topic, record, key=key(record) if key else None,
+                                on_success=report.on_success, on_error=report.on_error)
+            except Exception as e:
+                # Serialization errors and buffer timeouts are raised by `send` itself
+                report.on_error(e)
+        return report
+
+    def flush(self, timeout=None):
+        self.producer.flush(timeout)
+
 if __name__ == "__main__":
     BOOTSTRAP_SERVERS = os.getenv("MSK_BOOTSTRAP_SERVERS", "localhost:9092")
     TOPIC = "orders"
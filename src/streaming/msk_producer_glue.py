@@ -1,7 +1,6 @@
 import json
 import time
 import os
-import logging
 import boto3
 from kafka import KafkaProducer
 from kafka.errors import KafkaError
@@ -10,20 +9,28 @@ from kafka.errors import KafkaError
 from aws_glue_schema_registry.serde import KafkaSerializer
 from aws_glue_schema_registry.adapter.jsonschema import JsonSchemaAdapter
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+from src.observability.structured_logging import RateLimitFilter, setup_logger
+from src.streaming.glue_schema_cache import GLUE_PREWARM_SCHEMAS, CachingGlueClient
+from src.streaming.msk_producer import (
+    PRODUCER_BATCH_SIZE, PRODUCER_COMPRESSION, PRODUCER_LINGER_MS, DeliveryReport, encode_key, pick_compression,
+)
+
+# Configure logging: JSON lines written off the send path, per-record lines rate limited
+logger = setup_logger(__name__, rate_limit=RateLimitFilter())
 
 class MSKProducer:
-    def __init__(self, bootstrap_servers, registry_name='keystone-registry'):
+    def __init__(self, bootstrap_servers, registry_name='keystone-registry', prewarm_schemas=GLUE_PREWARM_SCHEMAS,
+                 linger_ms=PRODUCER_LINGER_MS, batch_size=PRODUCER_BATCH_SIZE, compression=PRODUCER_COMPRESSION):
         self.bootstrap_servers = bootstrap_servers
         self.registry_name = registry_name
         
         # 1. Initialize AWS Glue Schema Registry Serializer
-        # This automatically registers/retrieves schemas from AWS Glue
-        glue_client = boto3.client('glue', region_name=os.getenv("AWS_REGION", "ap-southeast-1"))
+        # This automatically registers/retrieves schemas from AWS Glue; the
+        # caching client keeps those lookups off the per-record path.
+        self.glue_client = CachingGlueClient(boto3.client('glue', region_name=os.getenv("AWS_REGION", "ap-southeast-1")))
+        self.glue_client.prewarm(schema_names=prewarm_schemas, registry_name=registry_name)
         self.serializer = KafkaSerializer(
-            glue_client=glue_client,
+            glue_client=self.glue_client,
             registry_name=self.registry_name,
             adapter=JsonSchemaAdapter()
         )
@@ -32,8 +39,12 @@ class MSKProducer:
         self.producer = KafkaProducer(
             bootstrap_servers=bootstrap_servers,
             value_serializer=self.serializer, # Enforces schema contracts
+            key_serializer=encode_key,
             retries=5,
-            acks='all'
+            acks='all',
+            linger_ms=linger_ms,
+            batch_size=batch_size,
+            compression_type=pick_compression(compression)
         )
 
     def send_record(self, topic, data, schema_name):
@@ -48,6 +59,24 @@ class MSKProducer:
         except Exception as e:
             logger.error(f"Schema Validation or Send Failure: {e}")
 
+    def send_many(self, topic, records, schema_name, key=None, report=None):
+        """
+        Enqueues `records` under `schema_name` without waiting for each
+        acknowledgement; returns a DeliveryReport (see MSKProducer.send_many).
+        Serialization (and so schema validation) still happens in `send`.
+        """
+        report = report or DeliveryReport(self.producer)
+        for record in records:
+            report.enqueued += 1
+            try:
+                future = self.producer.send(topic, value=(record, schema_name), key=key(record) if key else None)
+            except Exception as e:
+                report.on_error(e)
+                continue
+            future.add_callback(report.on_success)
+            future.add_errback(report.on_error)
+        return report
+
 if __name__ == "__main__":
     BOOTSTRAP_SERVERS = os.getenv("MSK_BOOTSTRAP_SERVERS", "localhost:9092")
     TOPIC = "orders"
@@ -0,0 +1,205 @@
+# replay_producer.py
+# Keystone Nexus - Replays historical Olist data into Kafka
+# Streams a CSV or Parquet source through MSKProducer, keyed by `order_id` so
+# every event of an order lands in the same partition, either as fast as the
+# producer accepts records or paced to a target rate. Progress, achieved rate
+# and delivery-latency percentiles are logged, so the same entry point serves
+# topic backfills and load generation for the consumer benchmarks.
+#
+#   python -m src.streaming.replay_producer --source data/olist_orders_dataset.csv --rate 5000
+#   python -m src.streaming.replay_producer --fake --limit 200000   # no broker needed
+import argparse
+import functools
+import json
+import os
+import random
+import threading
+import time
+
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from src.ingestion.olist_schemas import NEWLINES_IN_VALUES, OLIST_SCHEMAS, OLIST_SOURCE_FILES
+from src.observability.metrics import STAGE_SECONDS, start_metrics_server
+from src.observability.structured_logging import setup_logger
+from src.streaming.msk_producer import DeliveryReport, MSKProducer
+
+logger = setup_logger(__name__)
+
+REPLAY_DATA_DIR = os.getenv("REPLAY_DATA_DIR", os.getenv("BRONZE_DATA_DIR", "data"))
+REPLAY_TOPIC = os.getenv("REPLAY_TOPIC", "orders")
+# Target records/s; 0 sends as fast as the producer accepts records
+REPLAY_RATE = float(os.getenv("REPLAY_RATE", "0"))
+REPLAY_BATCH_ROWS = int(os.getenv("REPLAY_BATCH_ROWS", "10000"))
+REPLAY_PROGRESS_INTERVAL_S = float(os.getenv("REPLAY_PROGRESS_INTERVAL_S", "5"))
+# Delivery latencies kept for percentiles (reservoir sample, bounds memory on long replays)
+REPLAY_LATENCY_SAMPLES = int(os.getenv("REPLAY_LATENCY_SAMPLES", "100000"))
+
+
+# ==========================================
+# 1. SOURCE
+# ==========================================
+def iter_source_batches(path, table_name="orders", batch_rows=REPLAY_BATCH_ROWS):
+    """Yields RecordBatches of a CSV or Parquet source, read incrementally against the pinned schema."""
+    if path.endswith(".parquet"):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_rows)
+        return
+    schema = OLIST_SCHEMAS.get(table_name)
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=8 * 1024 * 1024),
+        parse_options=pv.ParseOptions(newlines_in_values=table_name in NEWLINES_IN_VALUES),
+        convert_options=pv.ConvertOptions(column_types=schema, strings_can_be_null=True) if schema else None,
+    )
+    for batch in reader:
+        # CSV blocks are sized in bytes; re-slice to the requested row count
+        for offset in range(0, batch.num_rows, batch_rows):
+            yield batch.slice(offset, batch_rows)
+
+
+def iter_records(batches, limit=None):
+    """Flattens RecordBatches into dicts, stopping after `limit` records."""
+    emitted = 0
+    for batch in batches:
+        for record in batch.to_pylist():
+            if limit is not None and emitted >= limit:
+                return
+            yield record
+            emitted += 1
+
+
+# ==========================================
+# 2. PACING & REPORTING
+# ==========================================
+class RatePacer:
+    """
+    Holds the sender to `rate` records/s against a fixed schedule (start +
+    n / rate), so short stalls are caught up instead of lowering the rate.
+    """
+
+    def __init__(self, rate=REPLAY_RATE):
+        self.rate = rate
+        self.started = None
+        self.sent = 0
+
+    def pace(self):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        self.sent += 1
+        ahead = self.started + self.sent / self.rate - now
+        if ahead > 0.001:
+            time.sleep(ahead)
+
+
+class ReplayReport(DeliveryReport):
+    """DeliveryReport that also samples enqueue -> acknowledgement latency."""
+
+    def __init__(self, producer, max_errors=10, max_samples=REPLAY_LATENCY_SAMPLES, seed=7):
+        super().__init__(producer, max_errors)
+        self.max_samples = max_samples
+        self.latencies = []
+        self._seen = 0
+        self._rng = random.Random(seed)
+
+    def on_delivered(self, sent_at, metadata):
+        latency = time.monotonic() - sent_at
+        self.on_success(metadata)
+        STAGE_SECONDS.observe(latency, stage="kafka_delivery")
+        with self._lock:
+            self._seen += 1
+            if len(self.latencies) < self.max_samples:
+                self.latencies.append(latency)
+            else:
+                slot = self._rng.randrange(self._seen)
+                if slot < self.max_samples:
+                    self.latencies[slot] = latency
+
+    def latency_ms(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return {}
+        pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2)
+        return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(latencies[-1] * 1000, 2)}
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {**super().summary(), "sent_per_s": round(self.enqueued / elapsed, 1),
+                "latency_ms": self.latency_ms()}
+
+
+# ==========================================
+# 3. REPLAY
+# ==========================================
+def replay(producer, records, topic=REPLAY_TOPIC, rate=REPLAY_RATE, key_field="order_id",
+           progress_interval_s=REPLAY_PROGRESS_INTERVAL_S, stop_event=None):
+    """
+    Sends `records` through `producer` (an MSKProducer) without waiting on
+    acknowledgements, paced to `rate` records/s (0 = unpaced). Blocks until
+    every record is acknowledged or failed and returns the report summary.
+    """
+    stop_event = stop_event or threading.Event()
+    report = ReplayReport(producer.producer)
+    pacer = RatePacer(rate)
+    next_progress = time.monotonic() + progress_interval_s
+    for record in records:
+        if stop_event.is_set():
+            break
+        pacer.pace()
+        report.enqueued += 1
+        try:
+            producer.send_async(topic, record, key=record.get(key_field),
+                                on_success=functools.partial(report.on_delivered, time.monotonic()),
+                                on_error=report.on_error)
+        except Exception as e:
+            # Serialization errors and buffer timeouts are raised by `send` itself
+            report.on_error(e)
+        if time.monotonic() >= next_progress:
+            next_progress += progress_interval_s
+            logger.info(f"Replay progress: {json.dumps(report.summary())}")
+    report.wait()
+    summary = report.summary()
+    logger.info(f"Replay finished: {json.dumps(summary)}")
+    return summary
+
+
+if __name__ == "__main__":
+    import signal
+
+    parser = argparse.ArgumentParser(description="Replay an Olist CSV/Parquet source into Kafka")
+    parser.add_argument("--table", default="orders")
+    parser.add_argument("--source", help="CSV or Parquet file (default: the table's Olist CSV in REPLAY_DATA_DIR)")
+    parser.add_argument("--topic", default=REPLAY_TOPIC)
+    parser.add_argument("--rate", type=float, default=REPLAY_RATE, help="Target records/s, 0 = as fast as possible")
+    parser.add_argument("--limit", type=int, help="Stop after this many records")
+    parser.add_argument("--key-field", default="order_id")
+    parser.add_argument("--format", default=None, help="Value format (default: PRODUCER_VALUE_FORMAT)")
+    parser.add_argument("--fake", action="store_true", help="Send to an in-process broker stand-in with generated orders")
+    parser.add_argument("--fake-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    start_metrics_server()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    serializer = {"serializer": args.format} if args.format else {}
+
+    if args.fake:
+        from src.streaming.fakes import FakeKafkaProducer, make_order
+        latency_s = args.fake_latency_ms / 1000
+        producer = MSKProducer("fake:9092", producer_factory=lambda **c: FakeKafkaProducer(request_latency_s=latency_s, **c),
+                               **serializer)
+        rng = random.Random(7)
+        source = args.source
+        records = (iter_records(iter_source_batches(source, args.table), args.limit) if source
+                   else (make_order(i, rng) for i in range(args.limit or 100000)))
+    else:
+        producer = MSKProducer(os.getenv("MSK_BOOTSTRAP_SERVERS", "localhost:9092"), **serializer)
+        source = args.source or os.path.join(REPLAY_DATA_DIR, OLIST_SOURCE_FILES[args.table])
+        records = iter_records(iter_source_batches(source, args.table), args.limit)
+
+    logger.info(f"🚀 Replaying {source or 'generated orders'} into '{args.topic}' (rate={args.rate or 'unlimited'})")
+    print(json.dumps(replay(producer, records, args.topic, args.rate, args.key_field, stop_event=stop), indent=2))
@@ -0,0 +1,284 @@
+# serializers.py
+# Keystone Nexus - Pluggable value formats for the order topics
+# Producers pick a format by name (`PRODUCER_VALUE_FORMAT`) and tag every
+# record with a `content-type` header; the lakehouse consumers read that header
+# to pick the matching batch decoder, so formats can be switched (or mixed,
+# during a migration) without coordinating deploys.
+#
+#   json     stdlib json                 application/json
+#   orjson   orjson, same JSON on the wire application/json
+#   msgpack  MessagePack array in registered field order   application/x-msgpack; schema=<name>
+#   avro     Avro single-object encoding (schema fingerprint + binary)   avro/binary; schema=<name>
+#
+# Binary formats need a registered schema: the Arrow schemas in
+# REGISTERED_SCHEMAS fix the field order (msgpack) and the Avro record schema.
+# Changing a registered schema changes the wire format for both.
+import io
+import json
+import logging
+import os
+
+import pyarrow as pa
+
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+# json keeps the bytes producers have always emitted; orjson/msgpack/avro are opt-in
+PRODUCER_VALUE_FORMAT = os.getenv("PRODUCER_VALUE_FORMAT", "json")
+# Assumed for records without a content-type header (producers predating the header)
+DEFAULT_CONTENT_TYPE = os.getenv("LAKEHOUSE_DEFAULT_CONTENT_TYPE", "application/json")
+
+CONTENT_TYPE_HEADER = "content-type"
+
+REGISTERED_SCHEMAS = {"orders": OLIST_SCHEMAS["orders"]}
+
+AVRO_TYPES = {pa.string(): "string", pa.int64(): "long", pa.int32(): "int", pa.float64(): "double",
+              pa.float32(): "float", pa.bool_(): "boolean"}
+ARROW_TYPES = {"string": pa.string(), "long": pa.int64(), "int": pa.int64(), "double": pa.float64(),
+               "float": pa.float64(), "boolean": pa.bool_()}
+
+# Avro single-object encoding marker
+AVRO_MAGIC = b"\xc3\x01"
+
+
+def records_to_table(records, schema):
+    """
+    Builds an Arrow table from decoded dicts, isolating rows that do not fit `schema`.
+    Returns (table, kept row indices into `records`, [(row, error)]).
+    """
+    try:
+        return pa.Table.from_pylist(records, schema=schema), list(range(len(records))), []
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as batch_error:
+        logger.debug(f"Batch conversion failed, isolating rows: {batch_error}")
+    tables, rows, errors = [], [], []
+    for i, record in enumerate(records):
+        try:
+            tables.append(pa.Table.from_pylist([record], schema=schema))
+            rows.append(i)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as e:
+            errors.append((i, str(e)))
+    return (pa.concat_tables(tables) if tables else schema.empty_table()), rows, errors
+
+
+def _decode_each(payloads, loads):
+    """Decodes payloads one by one; returns (records, payload index per record, errors)."""
+    records, indices, errors = [], [], []
+    for i, payload in enumerate(payloads):
+        try:
+            records.append(loads(payload))
+            indices.append(i)
+        except Exception as e:
+            errors.append((i, str(e)))
+    return records, indices, errors
+
+
+def _decode_batch_each(payloads, schema, loads):
+    records, indices, errors = _decode_each(payloads, loads)
+    table, rows, row_errors = records_to_table(records, schema)
+    errors.extend((indices[row], error) for row, error in row_errors)
+    return table, [indices[row] for row in rows], sorted(errors)
+
+
+# ==========================================
+# 1. FORMATS
+# ==========================================
+class JsonSerde:
+    """
+    Plain JSON values. Consumers decode whole batches with Arrow's JSON
+    reader (see batch_validation.decode_json_records).
+    """
+
+    name = "json"
+    content_type = "application/json"
+
+    def dumps(self, record):
+        return json.dumps(record).encode("utf-8")
+
+    def loads(self, payload):
+        return json.loads(payload)
+
+    def decode_batch(self, payloads, schema, unexpected_field_behavior="ignore"):
+        """Returns (Arrow table, payload index per row, [(payload index, error)])."""
+        from src.ingestion.batch_validation import decode_json_records
+        return decode_json_records(payloads, schema, unexpected_field_behavior)
+
+
+class OrjsonSerde(JsonSerde):
+    """JSON encoded by orjson: same bytes on the wire, several times faster to produce."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, record):
+        return self._orjson.dumps(record)
+
+    def loads(self, payload):
+        return self._orjson.loads(payload)
+
+
+class MsgpackSerde:
+    """
+    MessagePack array holding the values of a registered schema in field
+    order. Field names are not repeated in every record, which is where most
+    of the size of a JSON order event goes; fields outside the schema are dropped.
+    """
+
+    name = "msgpack"
+
+    def __init__(self, schema_name="orders"):
+        import msgpack
+        self._msgpack = msgpack
+        self.schema_name = schema_name
+        self.schema = REGISTERED_SCHEMAS[schema_name]
+        self.fields = self.schema.names
+        self.content_type = f"application/x-msgpack; schema={schema_name}"
+
+    def dumps(self, record):
+        return self._msgpack.packb([record.get(field) for field in self.fields])
+
+    def loads(self, payload):
+        values = self._msgpack.unpackb(payload)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise ValueError(f"Expected a {len(self.fields)}-value array for schema '{self.schema_name}'")
+        return dict(zip(self.fields, values))
+
+    def decode_batch(self, payloads, schema=None, unexpected_field_behavior="ignore"):
+        schema = schema or self.schema
+        rows, indices, errors = _decode_each(payloads, self._msgpack.unpackb)
+        width = len(self.fields)
+        good = [(i, row) for i, row in zip(indices, rows) if isinstance(row, list) and len(row) == width]
+        errors.extend((i, f"Expected a {width}-value array") for i, row in zip(indices, rows)
+                      if not (isinstance(row, list) and len(row) == width))
+        try:
+            # Positional rows transpose straight into columns
+            columns = list(zip(*(row for _, row in good))) or [()] * width
+            by_name = dict(zip(self.fields, columns))
+            table = pa.table({f.name: pa.array(by_name.get(f.name, [None] * len(good)), f.type) for f in schema},
+                             schema=schema)
+            return table, [i for i, _ in good], sorted(errors)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            table, rows, row_errors = records_to_table([dict(zip(self.fields, row)) for _, row in good], schema)
+            errors.extend((good[row][0], error) for row, error in row_errors)
+            return table, [good[row][0] for row in rows], sorted(errors)
+
+
+def avro_schema_from_arrow(schema, name):
+    """Avro record schema with every field nullable (mirrors the Arrow schema)."""
+    return {
+        "type": "record",
+        "name": name,
+        "namespace": "keystone.olist",
+        "fields": [{"name": f.name, "type": ["null", AVRO_TYPES[f.type]], "default": None} for f in schema],
+    }
+
+
+def arrow_schema_from_avro(avro_schema):
+    """Arrow schema for the primitive (optionally nullable) fields of an Avro record schema."""
+    fields = []
+    for field in avro_schema["fields"]:
+        types = field["type"] if isinstance(field["type"], list) else [field["type"]]
+        primitive = [t for t in types if t != "null"]
+        if len(primitive) == 1 and isinstance(primitive[0], str) and primitive[0] in ARROW_TYPES:
+            fields.append((field["name"], ARROW_TYPES[primitive[0]]))
+    return pa.schema(fields)
+
+
+class AvroSerde:
+    """
+    Avro binary encoding. With `single_object` (the default) every value
+    carries the Avro single-object header: a 2-byte marker and the 8-byte
+    CRC-64-AVRO fingerprint of the writer schema, checked on decode. Glue
+    Schema Registry Avro bodies are plain schemaless Avro (`single_object=False`).
+    """
+
+    name = "avro"
+
+    def __init__(self, avro_schema, schema_name=None, single_object=True):
+        import fastavro
+        from fastavro.schema import fingerprint, to_parsing_canonical_form
+        self._fastavro = fastavro
+        self.avro_schema = avro_schema
+        self.parsed = fastavro.parse_schema(avro_schema)
+        self.arrow_schema = arrow_schema_from_avro(avro_schema)
+        self.single_object = single_object
+        canonical = to_parsing_canonical_form(self.parsed)
+        self.header = AVRO_MAGIC + int(fingerprint(canonical, "CRC-64-AVRO"), 16).to_bytes(8, "little")
+        self.content_type = f"avro/binary; schema={schema_name or avro_schema['name']}"
+
+    @classmethod
+    def registered(cls, schema_name="orders"):
+        return cls(avro_schema_from_arrow(REGISTERED_SCHEMAS[schema_name], schema_name), schema_name)
+
+    def dumps(self, record):
+        buffer = io.BytesIO()
+        if self.single_object:
+            buffer.write(self.header)
+        self._fastavro.schemaless_writer(buffer, self.parsed, record)
+        return buffer.getvalue()
+
+    def loads(self, payload):
+        if self.single_object:
+            if payload[:10] != self.header:
+                raise ValueError("Avro value was not written with the registered schema")
+            payload = payload[10:]
+        return self._fastavro.schemaless_reader(io.BytesIO(payload), self.parsed)
+
+    def decode_batch(self, payloads, schema=None, unexpected_field_behavior="ignore"):
+        return _decode_batch_each(payloads, schema or self.arrow_schema, self.loads)
+
+
+def get_serde(name=PRODUCER_VALUE_FORMAT, schema_name="orders"):
+    """Producer-side lookup by format name."""
+    if name == "json":
+        return JsonSerde()
+    if name == "orjson":
+        return OrjsonSerde()
+    if name == "msgpack":
+        return MsgpackSerde(schema_name)
+    if name == "avro":
+        return AvroSerde.registered(schema_name)
+    raise ValueError(f"Unknown value format '{name}'")
+
+
+# ==========================================
+# 2. CONSUMER-SIDE DISPATCH
+# ==========================================
+_decoders = {}
+
+
+def serde_for_content_type(content_type):
+    """Decoder for a content-type header value, built once per distinct value."""
+    serde = _decoders.get(content_type)
+    if serde is None:
+        mime, _, params = content_type.partition(";")
+        schema_name = dict(p.strip().split("=", 1) for p in params.split(";") if "=" in p).get("schema", "orders")
+        mime = mime.strip()
+        if mime == "application/json":
+            serde = JsonSerde()
+        elif mime == "application/x-msgpack":
+            serde = MsgpackSerde(schema_name)
+        elif mime == "avro/binary":
+            serde = AvroSerde.registered(schema_name)
+        else:
+            raise ValueError(f"Unsupported content type '{content_type}'")
+        _decoders[content_type] = serde
+    return serde
+
+
+def content_type_of(msg, default=DEFAULT_CONTENT_TYPE):
+    for key, value in msg.headers() or ():
+        if key == CONTENT_TYPE_HEADER:
+            return value.decode("utf-8") if isinstance(value, bytes) else value
+    return default
+
+
+def group_by_format(messages, default=DEFAULT_CONTENT_TYPE):
+    """Splits a batch into [(content type, messages)], keeping the first-seen order of types."""
+    groups = {}
+    for msg in messages:
+        groups.setdefault(content_type_of(msg, default), []).append(msg)
+    return list(groups.items())
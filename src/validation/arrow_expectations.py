@@ -0,0 +1,313 @@
+# arrow_expectations.py
+# Keystone Nexus - The `olist_logistics_rules` suite evaluated on Arrow batches
+# init_olist_expectations.py builds the suite from OLIST_LOGISTICS_RULES for a
+# Great Expectations pandas checkpoint over a whole CSV. The same expectations
+# are compiled here into pyarrow.compute kernels that run over record batches
+# as they stream through the Bronze converter and the lakehouse consumer: one
+# vectorised pass per rule, no DataFrame, no per-batch checkpoint setup. Each
+# batch yields per-rule failure counts and the indices of the failing rows.
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Failing row indices kept per rule in a suite's running summary (counts are always exact)
+EXPECTATIONS_MAX_FAILING_ROWS = int(os.getenv("EXPECTATIONS_MAX_FAILING_ROWS", "1000"))
+
+OLIST_ORDER_STATUSES = ["created", "approved", "invoiced", "processing", "shipped", "delivered", "unavailable",
+                        "canceled"]
+
+# The `olist_logistics_rules` suite, the single definition of these rules:
+# init_olist_expectations.py builds the Great Expectations suite from it, and
+# it runs here and in sql_pushdown.py as is. `meta.table` names the Olist table
+# a rule applies to, since the suite spans orders and items.
+OLIST_LOGISTICS_RULES = [
+    # Primary key integrity: lost or duplicated order IDs break fulfilment tracking and double-count revenue
+    {"expectation_type": "expect_column_values_to_not_be_null", "kwargs": {"column": "order_id"},
+     "meta": {"table": "orders", "business_impact": "Critical - Lost orders cannot be tracked for fulfillment",
+              "data_quality_dimension": "Completeness"}},
+    {"expectation_type": "expect_column_values_to_be_unique", "kwargs": {"column": "order_id"},
+     "meta": {"table": "orders", "business_impact": "Critical - Duplicate IDs cause double-counting revenue",
+              "data_quality_dimension": "Uniqueness"}},
+    # Chronological integrity: nothing is delivered before it was purchased (orders in transit are ignored)
+    {"expectation_type": "expect_column_pair_values_A_to_be_greater_than_B",
+     "kwargs": {"column_A": "order_delivered_customer_date", "column_B": "order_purchase_timestamp",
+                "ignore_row_if": "either_value_is_missing"},
+     "meta": {"table": "orders",
+              "business_impact": "High - Prevents impossible logistics metrics from reaching dashboards",
+              "data_quality_dimension": "Validity (Temporal Logic)"}},
+    # The delivery estimate baseline of the "Estimated vs Actual" SLA queries comes after the purchase
+    {"expectation_type": "expect_column_pair_values_A_to_be_greater_than_B",
+     "kwargs": {"column_A": "order_estimated_delivery_date", "column_B": "order_purchase_timestamp"},
+     "meta": {"table": "orders", "business_impact": "Medium - Ensures SLA metrics are based on valid estimates",
+              "data_quality_dimension": "Validity (Business Rule)"}},
+    # Known Olist states only, so funnel reports do not break on unknown strings
+    {"expectation_type": "expect_column_values_to_be_in_set",
+     "kwargs": {"column": "order_status", "value_set": OLIST_ORDER_STATUSES},
+     "meta": {"table": "orders",
+              "business_impact": "Medium - Prevents unknown statuses from breaking funnel reports",
+              "data_quality_dimension": "Validity (Domain Constraint)"}},
+    # Revenue integrity: no negative prices (and no upper limit, luxury items exist)
+    {"expectation_type": "expect_column_values_to_be_between",
+     "kwargs": {"column": "price", "min_value": 0, "max_value": None},
+     "meta": {"table": "order_items", "business_impact": "Critical - Negative prices corrupt financial reporting",
+              "data_quality_dimension": "Validity (Range Check)"}},
+    # Foreign key integrity: every order is attributable to a customer
+    {"expectation_type": "expect_column_values_to_not_be_null", "kwargs": {"column": "customer_id"},
+     "meta": {"table": "orders",
+              "business_impact": "High - Orphaned orders cannot be attributed to customers",
+              "data_quality_dimension": "Completeness (Foreign Key)"}},
+]
+
+RuleResult = namedtuple("RuleResult", ["rule", "failures", "rows", "skipped"])
+
+
+def rule_columns(kwargs):
+    return [kwargs[k] for k in ("column", "column_A", "column_B") if k in kwargs]
+
+
+def rule_name(expectation_type, kwargs):
+    """Display name of a rule, e.g. `expect_column_values_to_not_be_null(order_id)`."""
+    return f"{expectation_type}({', '.join(rule_columns(kwargs))})"
+
+
+def _all(n, value):
+    return pa.nulls(n, pa.bool_()).fill_null(value)
+
+
+# ==========================================
+# 1. RULES
+# ==========================================
+class Expectation:
+    """
+    One expectation compiled into a kernel over an Arrow table. `failing`
+    returns a boolean array that is True for the rows breaking the rule.
+    Like GX's column map expectations, nulls are ignored unless the rule is
+    about nulls.
+    """
+
+    def __init__(self, expectation_type, kwargs, meta=None):
+        self.expectation_type = expectation_type
+        self.kwargs = dict(kwargs)
+        self.meta = dict(meta or {})
+        self.columns = rule_columns(self.kwargs)
+        self.name = rule_name(expectation_type, self.kwargs)
+
+    def failing(self, table):
+        raise NotImplementedError
+
+    def reset(self):
+        """Forgets state carried across batches (only uniqueness keeps any)."""
+
+
+class NotNull(Expectation):
+    def failing(self, table):
+        return pc.is_null(table.column(self.kwargs["column"]))
+
+
+class InSet(Expectation):
+    def __init__(self, expectation_type, kwargs, meta=None):
+        super().__init__(expectation_type, kwargs, meta)
+        self._value_sets = {}
+
+    def failing(self, table):
+        column = table.column(self.kwargs["column"])
+        # Built once per column type rather than per batch
+        value_set = self._value_sets.get(column.type)
+        if value_set is None:
+            value_set = self._value_sets[column.type] = pa.array(self.kwargs["value_set"]).cast(column.type)
+        return pc.fill_null(pc.invert(pc.is_in(column, value_set=value_set)), False)
+
+
+class Between(Expectation):
+    def failing(self, table):
+        column = table.column(self.kwargs["column"])
+        ok = pa.scalar(True)
+        if self.kwargs.get("min_value") is not None:
+            op = pc.greater if self.kwargs.get("strict_min") else pc.greater_equal
+            ok = pc.and_(ok, op(column, self.kwargs["min_value"]))
+        if self.kwargs.get("max_value") is not None:
+            op = pc.less if self.kwargs.get("strict_max") else pc.less_equal
+            ok = pc.and_(ok, op(column, self.kwargs["max_value"]))
+        if isinstance(ok, pa.Scalar):
+            return _all(len(column), False)
+        return pc.fill_null(pc.invert(ok), False)
+
+
+class PairGreater(Expectation):
+    """
+    A > B per row (A >= B with `or_equal`). String columns compare as strings,
+    which for the fixed-width Olist timestamps is chronological order and is
+    also what the GX pandas checkpoint does on the raw CSV. `ignore_row_if`
+    follows GX: rows with both values missing are ignored by default, rows
+    with either one missing under "either_value_is_missing".
+    """
+
+    def failing(self, table):
+        a, b = table.column(self.kwargs["column_A"]), table.column(self.kwargs["column_B"])
+        # An all-empty CSV column comes out of pandas as float64; it holds no values to compare
+        if a.type != b.type:
+            if a.null_count == len(a):
+                a = pa.nulls(len(a), b.type)
+            elif b.null_count == len(b):
+                b = pa.nulls(len(b), a.type)
+        op = pc.greater_equal if self.kwargs.get("or_equal") else pc.greater
+        ok = pc.fill_null(op(a, b), False)
+        if self.kwargs.get("ignore_row_if", "both_values_are_missing") == "either_value_is_missing":
+            ignored = pc.or_(pc.is_null(a), pc.is_null(b))
+        elif self.kwargs.get("ignore_row_if") == "neither":
+            return pc.invert(ok)
+        else:
+            ignored = pc.and_(pc.is_null(a), pc.is_null(b))
+        return pc.invert(pc.or_(ok, ignored))
+
+
+class Unique(Expectation):
+    """
+    No value repeats. Batches arrive one at a time, so a row fails when its
+    value already appeared earlier in the stream (or, with scope "batch",
+    earlier in the same batch); the first occurrence passes. GX, seeing the
+    whole file, flags every occurrence. The distinct values of earlier
+    batches are kept in a Python set, so stream scope costs one conversion
+    per distinct value and memory proportional to the key count.
+    """
+
+    def __init__(self, expectation_type, kwargs, meta=None, scope="stream"):
+        super().__init__(expectation_type, kwargs, meta)
+        self.scope = scope
+        self.seen = set()
+
+    def failing(self, table):
+        column = table.column(self.kwargs["column"])
+        distinct = pc.unique(column.drop_null())
+        if len(distinct) == len(column) - column.null_count:
+            failing = _all(len(column), False)
+        else:
+            indexed = pa.table({"value": column, "row": np.arange(len(column), dtype=np.int64)})
+            firsts = indexed.group_by("value", use_threads=False).aggregate([("row", "min")]).column("row_min")
+            # Nulls are not values; the not-null rules decide about them
+            failing = pc.and_(pc.invert(pc.is_in(indexed.column("row"), value_set=firsts)), pc.is_valid(column))
+        if self.scope == "stream":
+            values = distinct.to_pylist()
+            repeated = self.seen.intersection(values)
+            if repeated:
+                earlier = pc.fill_null(pc.is_in(column, value_set=pa.array(list(repeated), column.type)), False)
+                failing = pc.or_(failing, earlier)
+            self.seen.update(values)
+        return failing
+
+    def reset(self):
+        self.seen.clear()
+
+
+EXPECTATION_TYPES = {
+    "expect_column_values_to_not_be_null": NotNull,
+    "expect_column_values_to_be_unique": Unique,
+    "expect_column_pair_values_A_to_be_greater_than_B": PairGreater,
+    "expect_column_values_to_be_in_set": InSet,
+    "expect_column_values_to_be_between": Between,
+}
+
+
+# ==========================================
+# 2. SUITE
+# ==========================================
+class BatchResult:
+    """Outcome of one batch: per-rule RuleResults and the mask of rows passing every rule."""
+
+    def __init__(self, rules, valid):
+        self.rules = rules
+        self.valid = valid
+
+    @property
+    def success(self):
+        return not any(r.failures for r in self.rules)
+
+    def failure_counts(self):
+        return {r.rule: r.failures for r in self.rules if r.failures}
+
+
+class ArrowExpectationSuite:
+    """
+    Runs a list of GX-style expectation configurations over Arrow tables or
+    record batches. Rules whose columns are absent from a batch are reported
+    as skipped. `validate` returns the batch's BatchResult (row indices local
+    to the batch) and folds it into a running `summary` whose row indices
+    count from the start of the stream. `unique_scope="batch"` stops
+    uniqueness state building up across batches in long-running consumers.
+    """
+
+    def __init__(self, name, rules, unique_scope="stream", max_failing_rows=EXPECTATIONS_MAX_FAILING_ROWS):
+        self.name = name
+        self.expectations = []
+        for rule in rules:
+            kind = EXPECTATION_TYPES.get(rule["expectation_type"])
+            if kind is None:
+                raise ValueError(f"Unsupported expectation type '{rule['expectation_type']}'")
+            extra = {"scope": unique_scope} if kind is Unique else {}
+            self.expectations.append(kind(rule["expectation_type"], rule["kwargs"], rule.get("meta"), **extra))
+        self.max_failing_rows = max_failing_rows
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Starts a new stream: clears the summary and uniqueness state."""
+        self.rows = 0
+        self.batches = 0
+        self.failures = {e.name: 0 for e in self.expectations}
+        self.failing_rows = {e.name: [] for e in self.expectations}
+        for expectation in self.expectations:
+            expectation.reset()
+
+    def validate(self, batch):
+        with self._lock:
+            names = set(batch.schema.names)
+            results, valid = [], None
+            for expectation in self.expectations:
+                if not names.issuperset(expectation.columns):
+                    results.append(RuleResult(expectation.name, 0, pa.array([], pa.int64()), True))
+                    continue
+                failing = expectation.failing(batch)
+                rows = pc.indices_nonzero(failing)
+                results.append(RuleResult(expectation.name, len(rows), rows, False))
+                if len(rows):
+                    valid = pc.invert(failing) if valid is None else pc.and_(valid, pc.invert(failing))
+                    self._record(expectation.name, rows)
+            self.rows += batch.num_rows
+            self.batches += 1
+            if valid is None:
+                valid = _all(batch.num_rows, True)
+            return BatchResult(results, valid)
+
+    def _record(self, name, rows):
+        self.failures[name] += len(rows)
+        kept = self.failing_rows[name]
+        room = self.max_failing_rows - len(kept)
+        if room > 0:
+            kept.extend(pc.add(rows[:room], self.rows).to_pylist())
+
+    def summary(self):
+        """GX-like statistics plus per-rule failure counts and (capped) failing row indices."""
+        with self._lock:
+            failed = [name for name, count in self.failures.items() if count]
+            return {
+                "suite": self.name,
+                "rows": self.rows,
+                "batches": self.batches,
+                "success": not failed,
+                "evaluated_expectations": len(self.expectations),
+                "unsuccessful_expectations": len(failed),
+                "failures": {name: self.failures[name] for name in failed},
+                "failing_rows": {name: list(self.failing_rows[name]) for name in failed},
+            }
+
+
+def suite_for_table(table_name, unique_scope="stream", rules=OLIST_LOGISTICS_RULES):
+    """The `olist_logistics_rules` expectations for one Olist table, or None if it has none."""
+    selected = [rule for rule in rules if rule.get("meta", {}).get("table") == table_name]
+    if not selected:
+        return None
+    return ArrowExpectationSuite(f"olist_logistics_rules.{table_name}", selected, unique_scope)
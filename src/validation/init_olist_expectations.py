@@ -2,12 +2,16 @@
 # Keystone Nexus - Data Quality Validation Suite
 # Environment: AWS EC2 Ubuntu 24.04
 # Run `pip install great_expectations pandas` before executing.
+#
+#   python -m src.validation.init_olist_expectations
 
 import great_expectations as gx
 from great_expectations.core.expectation_configuration import ExpectationConfiguration
 from great_expectations.data_context import FileDataContext
 import os
 
+from src.validation.arrow_expectations import OLIST_LOGISTICS_RULES
+
 
 def create_logistics_expectation_suite():
     """
@@ -32,125 +36,14 @@ def create_logistics_expectation_suite():
     suite = context.add_or_update_expectation_suite(expectation_suite_name=suite_name)
     print(f"✅ Created Expectation Suite: {suite_name}")
 
-    # -------------------------------------------------------------------------
-    # Rule 1: Primary Key Integrity
-    # Business Value: We cannot track delivery gaps if order IDs are missing or duplicated.
-    # Impact: Prevents duplicate revenue counting and lost order tracking.
-    # -------------------------------------------------------------------------
-    expectation_order_id_not_null = ExpectationConfiguration(
-        expectation_type="expect_column_values_to_not_be_null",
-        kwargs={"column": "order_id"},
-        meta={
-            "business_impact": "Critical - Lost orders cannot be tracked for fulfillment",
-            "data_quality_dimension": "Completeness"
-        }
-    )
-    suite.add_expectation(expectation_configuration=expectation_order_id_not_null)
-
-    expectation_order_id_unique = ExpectationConfiguration(
-        expectation_type="expect_column_values_to_be_unique",
-        kwargs={"column": "order_id"},
-        meta={
-            "business_impact": "Critical - Duplicate IDs cause double-counting revenue",
-            "data_quality_dimension": "Uniqueness"
-        }
-    )
-    suite.add_expectation(expectation_configuration=expectation_order_id_unique)
-
-    # -------------------------------------------------------------------------
-    # Rule 2: Chronological Integrity (The "Time Travel" Check)
-    # Business Value: A package cannot be delivered to a customer before it was purchased.
-    # If this fails, there is a severe bug in the upstream e-commerce API.
-    # Impact: Prevents nonsensical delivery lag calculations (e.g., "-5 days to deliver")
-    # -------------------------------------------------------------------------
-    expectation_delivery_after_purchase = ExpectationConfiguration(
-        expectation_type="expect_column_pair_values_A_to_be_greater_than_B",
-        kwargs={
-            "column_A": "order_delivered_customer_date",
-            "column_B": "order_purchase_timestamp",
-            "ignore_row_if": "either_value_is_missing"  # Ignore active orders still in transit
-        },
-        meta={
-            "business_impact": "High - Prevents impossible logistics metrics from reaching dashboards",
-            "data_quality_dimension": "Validity (Temporal Logic)"
-        }
-    )
-    suite.add_expectation(expectation_configuration=expectation_delivery_after_purchase)
-
-    # -------------------------------------------------------------------------
-    # Rule 3: Validating the "Delivery Gap" Baseline
-    # Business Value: Ensure the estimated delivery date is logically sound (after purchase).
-    # This guarantees our Athena queries calculating "Estimated vs Actual" are accurate.
-    # Impact: Accurate SLA tracking and customer satisfaction metrics.
-    # -------------------------------------------------------------------------
-    expectation_estimate_after_purchase = ExpectationConfiguration(
-        expectation_type="expect_column_pair_values_A_to_be_greater_than_B",
-        kwargs={
-            "column_A": "order_estimated_delivery_date",
-            "column_B": "order_purchase_timestamp",
-        },
-        meta={
-            "business_impact": "Medium - Ensures SLA metrics are based on valid estimates",
-            "data_quality_dimension": "Validity (Business Rule)"
-        }
-    )
-    suite.add_expectation(expectation_configuration=expectation_estimate_after_purchase)
-
-    # -------------------------------------------------------------------------
-    # Rule 4: Status Validation
-    # Business Value: The order status must conform to known Olist states.
-    # Prevents garbage strings from breaking dashboard aggregations.
-    # Impact: Reliable order funnel analytics (created → delivered conversion rates)
-    # -------------------------------------------------------------------------
-    expectation_valid_status = ExpectationConfiguration(
-        expectation_type="expect_column_values_to_be_in_set",
-        kwargs={
-            "column": "order_status",
-            "value_set": [
-                "created", "approved", "invoiced", "processing", 
-                "shipped", "delivered", "unavailable", "canceled"
-            ]
-        },
-        meta={
-            "business_impact": "Medium - Prevents unknown statuses from breaking funnel reports",
-            "data_quality_dimension": "Validity (Domain Constraint)"
-        }
-    )
-    suite.add_expectation(expectation_configuration=expectation_valid_status)
-
-    # -------------------------------------------------------------------------
-    # Rule 5: Revenue Integrity (Price must be non-negative)
-    # Business Value: Ensures financial calculations are mathematically sound
-    # Impact: Prevents negative revenue from corrupting P&L reports
-    # -------------------------------------------------------------------------
-    expectation_price_non_negative = ExpectationConfiguration(
-        expectation_type="expect_column_values_to_be_between",
-        kwargs={
-            "column": "price",
-            "min_value": 0,
-            "max_value": None  # No upper limit (some luxury items can be very expensive)
-        },
-        meta={
-            "business_impact": "Critical - Negative prices corrupt financial reporting",
-            "data_quality_dimension": "Validity (Range Check)"
-        }
-    )
-    suite.add_expectation(expectation_configuration=expectation_price_non_negative)
-
-    # -------------------------------------------------------------------------
-    # Rule 6: Foreign Key Integrity (Customer ID must exist)
-    # Business Value: Ensures referential integrity for customer analytics
-    # Impact: Prevents orphaned orders from breaking customer segmentation
-    # -------------------------------------------------------------------------
-    expectation_customer_id_not_null = ExpectationConfiguration(
-        expectation_type="expect_column_values_to_not_be_null",
-        kwargs={"column": "customer_id"},
-        meta={
-            "business_impact": "High - Orphaned orders cannot be attributed to customers",
-            "data_quality_dimension": "Completeness (Foreign Key)"
-        }
-    )
-    suite.add_expectation(expectation_configuration=expectation_customer_id_not_null)
+    # The rules (and their business impact) are defined once in arrow_expectations.py,
+    # which also runs them inline on Arrow batches and as Athena SQL.
+    for rule in OLIST_LOGISTICS_RULES:
+        suite.add_expectation(expectation_configuration=ExpectationConfiguration(
+            expectation_type=rule["expectation_type"],
+            kwargs=dict(rule["kwargs"]),
+            meta=dict(rule["meta"]),
+        ))
 
     # Save the suite to the GX context
     context.save_expectation_suite(expectation_suite=suite)
@@ -0,0 +1,186 @@
+# quarantine_splitter.py
+# Keystone Nexus - Row-level quarantine for Silver Parquet files
+# Moving a whole object to quarantine because a few rows break a rule throws
+# away every good row with it. The splitter streams a file batch by batch
+# through the olist_logistics_rules suite (arrow_expectations.py), writes the
+# passing rows back to Silver and the failing ones, annotated with the rules
+# they broke, to the quarantine bucket. Memory is one batch plus the set of
+# order_ids the uniqueness rule has seen, never the whole file. Both sides
+# are local paths or URIs (s3://...), so a local directory stands in for
+# either bucket. Rewritten files are renamed to *-validated.parquet, so the
+# DAG's discovery of newly landed files can tell them apart.
+#
+#   python -m src.validation.quarantine_splitter /tmp/silver /tmp/quarantine orders/year=2018/month=1/day=2/part-0.parquet
+import argparse
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from src.ingestion.rolling_parquet_writer import hidden_path, resolve_filesystem
+from src.validation.arrow_expectations import suite_for_table
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_BATCH_ROWS = int(os.getenv("QUARANTINE_BATCH_ROWS", "65536"))
+
+# Name marker of Silver files the splitter has rewritten (already validated)
+REWRITTEN_SUFFIX = "-validated.parquet"
+
+
+def rewritten_path(path):
+    """Where the passing rows of `path` are written: part-1.parquet -> part-1-validated.parquet."""
+    if path.endswith(REWRITTEN_SUFFIX):
+        return path
+    return (path[:-len(".parquet")] if path.endswith(".parquet") else path) + REWRITTEN_SUFFIX
+
+
+def is_rewritten(key):
+    return key.endswith(REWRITTEN_SUFFIX)
+
+
+class _LazyWriter:
+    """ParquetWriter opened on the first batch, so empty outputs leave no file behind."""
+
+    def __init__(self, filesystem, path, compression="snappy"):
+        self.filesystem = filesystem
+        self.path = path
+        self.compression = compression
+        self.sink = None
+        self.writer = None
+        self.rows = 0
+
+    def write(self, batch):
+        if self.writer is None:
+            self.sink = self.filesystem.open_output_stream(self.path)
+            self.writer = pq.ParquetWriter(self.sink, batch.schema, compression=self.compression)
+        self.writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+
+
+def annotate_failures(batch, result, source):
+    """The failing rows of `batch` with `failed_rules` (rule names) and `source_file` columns."""
+    failing = pc.indices_nonzero(pc.invert(result.valid))
+    rules = {}
+    for rule in result.rules:
+        for row in rule.rows.to_pylist():
+            rules.setdefault(row, []).append(rule.rule)
+    rejected = batch.take(failing)
+    rejected = rejected.append_column("failed_rules",
+                                      pa.array([rules[row] for row in failing.to_pylist()], pa.list_(pa.string())))
+    return rejected.append_column("source_file", pa.array([source] * len(failing), pa.string()))
+
+
+def split_file(source, quarantine, table_name="orders", batch_rows=QUARANTINE_BATCH_ROWS, filesystem=None,
+               quarantine_filesystem=None):
+    """
+    Splits one Parquet file into passing rows (written next to `source` as
+    its rewritten_path) and failing rows (written to `quarantine`). A first
+    pass reads only the columns the rules need; files without failures are
+    left untouched. Passing rows are staged under a hidden name and revealed
+    before the source is deleted, so a failure in between leaves rows
+    duplicated, never lost. A source that is gone but whose outputs exist
+    was split by an earlier attempt and is reported, not split again, so a
+    retried task can run over the same keys. Returns a summary with row
+    counts, failures per rule and the `kept_file`.
+    """
+    filesystem, source_path = resolve_filesystem(source, filesystem)
+    quarantine_filesystem, quarantine_path = resolve_filesystem(quarantine, quarantine_filesystem)
+    if filesystem.get_file_info(source_path).type == pafs.FileType.NotFound:
+        return _already_split(source, source_path, quarantine, quarantine_path, filesystem, quarantine_filesystem)
+    suite = suite_for_table(table_name)
+
+    with filesystem.open_input_file(source_path) as f:
+        parquet = pq.ParquetFile(f)
+        columns = sorted({c for e in suite.expectations for c in e.columns} & set(parquet.schema_arrow.names))
+        for batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+            suite.validate(batch)
+    checked = suite.summary()
+    summary = {"source": source, "rows": checked["rows"], "failures": checked["failures"], "quarantined": 0}
+    if checked["success"]:
+        return summary
+
+    suite.reset()
+    kept_path = rewritten_path(source_path)
+    good = _LazyWriter(filesystem, hidden_path(kept_path))
+    bad = _LazyWriter(quarantine_filesystem, quarantine_path)
+    quarantine_filesystem.create_dir(quarantine_path.rsplit("/", 1)[0], recursive=True)
+    try:
+        with filesystem.open_input_file(source_path) as f:
+            for batch in pq.ParquetFile(f).iter_batches(batch_size=batch_rows):
+                result = suite.validate(batch)
+                if result.success:
+                    good.write(batch)
+                    continue
+                good.write(batch.filter(result.valid))
+                bad.write(annotate_failures(batch, result, source))
+    finally:
+        good.close()
+        bad.close()
+
+    # The quarantined rows are durable before Silver changes; move() overwrites on S3 and locally
+    if good.rows:
+        filesystem.move(hidden_path(kept_path), kept_path)
+    elif good.writer is not None:
+        filesystem.delete_file(hidden_path(kept_path))
+    if kept_path != source_path or not good.rows:
+        filesystem.delete_file(source_path)
+    summary.update(quarantined=bad.rows, kept=good.rows, kept_file=rewritten_path(source) if good.rows else None,
+                   quarantine=quarantine)
+    logger.info(f"Split {source}: kept {good.rows} rows, quarantined {bad.rows} ({json.dumps(checked['failures'])})")
+    return summary
+
+
+def _already_split(source, source_path, quarantine, quarantine_path, filesystem, quarantine_filesystem):
+    """Summary of a file an earlier attempt split, read back from its outputs."""
+    kept_path = rewritten_path(source_path)
+    kept_exists = filesystem.get_file_info(kept_path).type == pafs.FileType.File
+    quarantine_exists = quarantine_filesystem.get_file_info(quarantine_path).type == pafs.FileType.File
+    if not kept_exists and not quarantine_exists:
+        raise FileNotFoundError(f"{source} does not exist and has not been split")
+
+    kept = pq.read_metadata(kept_path, filesystem=filesystem).num_rows if kept_exists else 0
+    failures = {}
+    if quarantine_exists:
+        failed_rules = pq.read_table(quarantine_path, columns=["failed_rules"], filesystem=quarantine_filesystem)
+        for rule in pc.list_flatten(failed_rules.column("failed_rules")).to_pylist():
+            failures[rule] = failures.get(rule, 0) + 1
+        quarantined = failed_rules.num_rows
+    else:
+        quarantined = 0
+    logger.info(f"Skipping {source}: already split (kept {kept} rows, quarantined {quarantined})")
+    return {"source": source, "rows": kept + quarantined, "failures": failures, "quarantined": quarantined,
+            "kept": kept, "kept_file": rewritten_path(source) if kept_exists else None, "quarantine": quarantine,
+            "already_split": True}
+
+
+def split_files(silver_root, object_keys, quarantine_root, prefix="rejected", table_name="orders",
+                batch_rows=QUARANTINE_BATCH_ROWS):
+    """
+    Splits each Silver object (keys relative to `silver_root`) into
+    `<quarantine_root>/<prefix>/<key>`, keeping the partition path of the
+    quarantined rows. Returns the per-file summaries.
+    """
+    silver_root, quarantine_root = silver_root.rstrip("/"), quarantine_root.rstrip("/")
+    return [split_file(f"{silver_root}/{key}", f"{quarantine_root}/{prefix}/{key}", table_name, batch_rows)
+            for key in object_keys]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Split Silver Parquet files into passing and quarantined rows")
+    parser.add_argument("silver_root", help="Silver root (local path or s3://bucket)")
+    parser.add_argument("quarantine_root", help="Quarantine root (local path or s3://bucket)")
+    parser.add_argument("keys", nargs="+", help="Object keys relative to the Silver root")
+    parser.add_argument("--prefix", default="rejected")
+    args = parser.parse_args()
+    print(json.dumps(split_files(args.silver_root, args.keys, args.quarantine_root, args.prefix), indent=2))
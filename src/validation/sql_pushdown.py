@@ -0,0 +1,391 @@
+# sql_pushdown.py
+# Keystone Nexus - olist_logistics_rules as one partition-pruned aggregate query per table
+# GX's SQL engine issues roughly one query per expectation, and each of them
+# scans the table again. Here the whole suite is compiled into a single
+# SELECT per table with one conditional count per rule, and the WHERE clause
+# only names the target year/month/day partitions, so Athena reads each
+# needed column of each needed partition once. The same SQL runs on DuckDB
+# over a local Hive-partitioned Parquet tree, which stands in for Athena in
+# development and benchmarks.
+#
+#   python -m src.validation.sql_pushdown --date 2018-01-02
+#   python -m src.validation.sql_pushdown --duckdb-root /tmp/silver --start 2018-01-01 --end 2018-01-07
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import time
+from datetime import date, timedelta
+
+import pyarrow.parquet as pq
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from src.validation.arrow_expectations import OLIST_LOGISTICS_RULES, rule_columns, rule_name
+
+logger = logging.getLogger(__name__)
+
+ATHENA_DATABASE = os.getenv("ATHENA_SILVER_DATABASE", "olist_silver_db")
+ATHENA_OUTPUT_LOCATION = os.getenv("ATHENA_OUTPUT_LOCATION", "s3://olist-athena-query-results/validation/")
+ATHENA_WORKGROUP = os.getenv("ATHENA_WORKGROUP", "primary")
+AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1")
+# Tables laid out as year=/month=/day= partitions (the consumers' Silver layout); others are scanned whole
+PUSHDOWN_PARTITIONED_TABLES = set(os.getenv("PUSHDOWN_PARTITIONED_TABLES", "orders").split(","))
+
+# BatchCreatePartition accepts at most 100 partitions per call
+GLUE_PARTITION_BATCH = 100
+
+PARTITION_PATH = re.compile(r"year=(\d+)/month=(\d+)/day=(\d+)/")
+
+
+# ==========================================
+# 1. SQL COMPILER
+# ==========================================
+def _ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def _count_if(condition):
+    return f"SUM(CASE WHEN {condition} THEN 1 ELSE 0 END)"
+
+
+def _not_null(kwargs):
+    return _count_if(f"{_ident(kwargs['column'])} IS NULL")
+
+
+def _unique(kwargs):
+    # Repeats beyond the first occurrence, as counted by arrow_expectations.Unique
+    column = _ident(kwargs["column"])
+    return f"COUNT({column}) - COUNT(DISTINCT {column})"
+
+
+def _pair_greater(kwargs):
+    a, b = _ident(kwargs["column_A"]), _ident(kwargs["column_B"])
+    op = ">=" if kwargs.get("or_equal") else ">"
+    ignore = kwargs.get("ignore_row_if", "both_values_are_missing")
+    ignored = {"either_value_is_missing": f"({a} IS NULL OR {b} IS NULL)",
+               "both_values_are_missing": f"({a} IS NULL AND {b} IS NULL)"}.get(ignore, "FALSE")
+    return _count_if(f"NOT COALESCE({a} {op} {b}, FALSE) AND NOT {ignored}")
+
+
+def _in_set(kwargs):
+    column = _ident(kwargs["column"])
+    values = ", ".join(_literal(v) for v in kwargs["value_set"])
+    return _count_if(f"{column} IS NOT NULL AND {column} NOT IN ({values})")
+
+
+def _between(kwargs):
+    column = _ident(kwargs["column"])
+    bounds = []
+    if kwargs.get("min_value") is not None:
+        bounds.append(f"{column} {'>' if kwargs.get('strict_min') else '>='} {_literal(kwargs['min_value'])}")
+    if kwargs.get("max_value") is not None:
+        bounds.append(f"{column} {'<' if kwargs.get('strict_max') else '<='} {_literal(kwargs['max_value'])}")
+    if not bounds:
+        return "0"
+    return _count_if(f"{column} IS NOT NULL AND NOT ({' AND '.join(bounds)})")
+
+
+SQL_EXPECTATIONS = {
+    "expect_column_values_to_not_be_null": _not_null,
+    "expect_column_values_to_be_unique": _unique,
+    "expect_column_pair_values_A_to_be_greater_than_B": _pair_greater,
+    "expect_column_values_to_be_in_set": _in_set,
+    "expect_column_values_to_be_between": _between,
+}
+
+
+def _partition_literal(value, column, partition_types):
+    # Glue tables created by crawlers often type Hive partition keys as strings
+    column_type = (partition_types or {}).get(column, "int").lower()
+    return f"'{value}'" if column_type.startswith(("string", "varchar", "char")) else str(value)
+
+
+def partition_predicate(partitions, partition_types=None):
+    """
+    WHERE clause limiting a year/month/day partitioned table to `partitions`
+    (dates); days of the same month share one `day IN (...)` term.
+    `partition_types` ({column: type}, e.g. from the Glue table) decides
+    whether values are written as integer or string literals.
+    """
+    months = {}
+    for day in sorted(set(partitions)):
+        months.setdefault((day.year, day.month), []).append(day.day)
+
+    def lit(value, column):
+        return _partition_literal(value, column, partition_types)
+
+    terms = [f"(year = {lit(y, 'year')} AND month = {lit(m, 'month')} "
+             f"AND day IN ({', '.join(lit(d, 'day') for d in days)}))"
+             for (y, m), days in months.items()]
+    return " OR ".join(terms) if terms else "FALSE"
+
+
+def compile_suite_sql(relation, rules, partitions=None, files=None, path_column='"$path"', partition_types=None):
+    """
+    Compiles `rules` (GX-style expectation configurations) into one aggregate
+    query over `relation`. Returns (sql, [rule names]); result column r<i>
+    holds the failure count of the i-th rule and `row_count` the rows checked.
+    `files` further limits the scan to those objects (Athena's `$path`).
+    """
+    names, selects = [], ["COUNT(*) AS row_count"]
+    for i, rule in enumerate(rules):
+        compile_rule = SQL_EXPECTATIONS.get(rule["expectation_type"])
+        if compile_rule is None:
+            raise ValueError(f"Unsupported expectation type '{rule['expectation_type']}'")
+        names.append(rule_name(rule["expectation_type"], rule["kwargs"]))
+        selects.append(f"{compile_rule(rule['kwargs'])} AS r{i}")
+    sql = "SELECT\n    " + ",\n    ".join(selects) + f"\nFROM {relation}"
+    where = []
+    if partitions is not None:
+        where.append(f"({partition_predicate(partitions, partition_types)})")
+    if files is not None:
+        where.append(f"{path_column} IN ({', '.join(_literal(f) for f in files) or 'NULL'})")
+    if where:
+        sql += "\nWHERE " + " AND ".join(where)
+    return sql, names
+
+
+# ==========================================
+# 2. ENGINES
+# ==========================================
+class AthenaEngine:
+    """Runs the suite query on Athena; scan size and engine time come from the query statistics."""
+
+    path_column = '"$path"'
+
+    def __init__(self, database=ATHENA_DATABASE, output_location=ATHENA_OUTPUT_LOCATION, workgroup=ATHENA_WORKGROUP,
+                 client=None, poll_interval_s=1.0, glue_client=None):
+        import boto3
+        self.database = database
+        self.output_location = output_location
+        self.workgroup = workgroup
+        self.client = client or boto3.client("athena", region_name=AWS_REGION)
+        self.glue_client = glue_client or boto3.client("glue", region_name=AWS_REGION)
+        self.poll_interval_s = poll_interval_s
+        self._tables = {}
+
+    def relation(self, table):
+        return f"{_ident(self.database)}.{_ident(table)}"
+
+    def _table(self, table):
+        # Glue table definition, looked up once per table
+        if table not in self._tables:
+            self._tables[table] = self.glue_client.get_table(DatabaseName=self.database, Name=table)["Table"]
+        return self._tables[table]
+
+    def partition_types(self, table):
+        """{partition key: Hive type} of the Glue table."""
+        return {key["Name"]: key["Type"] for key in self._table(table).get("PartitionKeys", [])}
+
+    def register_partitions(self, table, partitions):
+        """
+        Adds the year/month/day `partitions` (dates) of `table` to the Glue
+        catalog, so Athena sees files that just landed in them; existing
+        partitions are left as they are. Tables using partition projection
+        need nothing registered. Returns the number of partitions added.
+        """
+        definition = self._table(table)
+        if definition.get("Parameters", {}).get("projection.enabled", "").lower() == "true":
+            return 0
+        keys = [key["Name"] for key in definition.get("PartitionKeys", [])]
+        storage = definition["StorageDescriptor"]
+        location = storage["Location"].rstrip("/")
+        entries = []
+        for day in sorted(set(partitions)):
+            # Hive partition values are strings, matching the year=2018/month=1/day=2 directory names
+            values = [str(getattr(day, key)) for key in keys]
+            path = "/".join(f"{key}={value}" for key, value in zip(keys, values))
+            entries.append({"Values": values, "StorageDescriptor": {**storage, "Location": f"{location}/{path}/"}})
+
+        added = 0
+        for i in range(0, len(entries), GLUE_PARTITION_BATCH):
+            batch = entries[i:i + GLUE_PARTITION_BATCH]
+            errors = self.glue_client.batch_create_partition(
+                DatabaseName=self.database, TableName=table, PartitionInputList=batch).get("Errors", [])
+            failed = [e for e in errors if e["ErrorDetail"]["ErrorCode"] != "AlreadyExistsException"]
+            if failed:
+                detail = failed[0]["ErrorDetail"]
+                raise RuntimeError(f"Could not register {table} partition {failed[0]['PartitionValues']}: "
+                                   f"{detail['ErrorCode']} {detail.get('ErrorMessage', '')}".rstrip())
+            added += len(batch) - len(errors)
+        logger.info(f"Registered {added} new {table} partitions of {len(entries)} requested")
+        return added
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    def _start(self, sql):
+        return self.client.start_query_execution(
+            QueryString=sql,
+            QueryExecutionContext={"Database": self.database},
+            ResultConfiguration={"OutputLocation": self.output_location},
+            WorkGroup=self.workgroup,
+        )["QueryExecutionId"]
+
+    def run(self, sql, table, columns, partitions=None, files=None):
+        """Returns ({column: value}, {"bytes_scanned", "query_seconds"}) for a one-row query."""
+        query_id = self._start(sql)
+        while True:
+            execution = self.client.get_query_execution(QueryExecutionId=query_id)["QueryExecution"]
+            state = execution["Status"]["State"]
+            if state == "SUCCEEDED":
+                break
+            if state in ("FAILED", "CANCELLED"):
+                raise RuntimeError(f"Athena query {query_id} {state}: {execution['Status'].get('StateChangeReason')}")
+            time.sleep(self.poll_interval_s)
+        rows = self.client.get_query_results(QueryExecutionId=query_id)["ResultSet"]["Rows"]
+        header = [c.get("VarCharValue") for c in rows[0]["Data"]]
+        values = [int(c["VarCharValue"]) if "VarCharValue" in c else 0 for c in rows[1]["Data"]]
+        stats = execution.get("Statistics", {})
+        return dict(zip(header, values)), {
+            "bytes_scanned": stats.get("DataScannedInBytes"),
+            "query_seconds": round(stats.get("EngineExecutionTimeInMillis", 0) / 1000, 3),
+        }
+
+
+class DuckDBEngine:
+    """
+    Local stand-in for Athena: each table is `<root>/<table>/` Parquet, Hive
+    partitioned like Silver. DuckDB prunes partitions from the same WHERE
+    clause; bytes scanned are the compressed sizes of the queried columns in
+    the files the partition filter keeps, which is what Athena bills for.
+    """
+
+    path_column = "filename"
+
+    def __init__(self, root, connection=None):
+        import duckdb
+        self.root = root
+        self.connection = connection or duckdb.connect()
+
+    def _files(self, table, partitions=None, files=None):
+        if files is not None:
+            return list(files)
+        base = os.path.join(self.root, table)
+        if partitions is None:
+            return glob.glob(os.path.join(base, "**", "*.parquet"), recursive=True)
+        return [path for day in sorted(set(partitions))
+                for path in glob.glob(os.path.join(base, f"year={day.year}", f"month={day.month}", f"day={day.day}",
+                                                   "*.parquet"))]
+
+    def relation(self, table):
+        path = os.path.join(self.root, table, "**", "*.parquet").replace("'", "''")
+        return f"read_parquet('{path}', hive_partitioning = true, filename = true)"
+
+    def partition_types(self, table):
+        # DuckDB infers integer year/month/day from the Hive directory names
+        return {}
+
+    def bytes_scanned(self, table, columns, partitions=None, files=None):
+        total = 0
+        for path in self._files(table, partitions, files):
+            metadata = pq.read_metadata(path)
+            for g in range(metadata.num_row_groups):
+                row_group = metadata.row_group(g)
+                for c in range(row_group.num_columns):
+                    chunk = row_group.column(c)
+                    if chunk.path_in_schema in columns:
+                        total += chunk.total_compressed_size
+        return total
+
+    def run(self, sql, table, columns, partitions=None, files=None):
+        start = time.perf_counter()
+        cursor = self.connection.execute(sql)
+        values = cursor.fetchone()
+        seconds = time.perf_counter() - start
+        header = [d[0] for d in cursor.description]
+        return dict(zip(header, (int(v or 0) for v in values))), {
+            "bytes_scanned": self.bytes_scanned(table, columns, partitions, files),
+            "query_seconds": round(seconds, 3),
+        }
+
+
+# ==========================================
+# 3. VALIDATION STEP
+# ==========================================
+def run_pushdown_validation(engine, partitions=None, rules=OLIST_LOGISTICS_RULES,
+                            partitioned_tables=PUSHDOWN_PARTITIONED_TABLES, tables=None, files=None):
+    """
+    Runs the suite as one query per table on `engine` (AthenaEngine or
+    DuckDBEngine), limited to `partitions` (dates) on partitioned tables.
+    `tables` restricts the run to some tables and `files` the partitioned
+    ones to specific objects (full paths, e.g. newly arrived files).
+    Returns a report with per-table row counts, failing rules, bytes
+    scanned and query time, and overall `success`.
+    """
+    by_table = {}
+    for rule in rules:
+        table = rule.get("meta", {}).get("table")
+        if tables is None or table in tables:
+            by_table.setdefault(table, []).append(rule)
+
+    tables = {}
+    for table, table_rules in by_table.items():
+        pruned = partitions is not None and table in partitioned_tables
+        table_partitions = partitions if pruned else None
+        table_files = files if table in partitioned_tables else None
+        sql, names = compile_suite_sql(engine.relation(table), table_rules, table_partitions, table_files,
+                                       engine.path_column,
+                                       engine.partition_types(table) if table_partitions is not None else None)
+        columns = {c for rule in table_rules for c in rule_columns(rule["kwargs"])}
+        values, stats = engine.run(sql, table, columns, table_partitions, table_files)
+        failures = {name: values[f"r{i}"] for i, name in enumerate(names) if values[f"r{i}"]}
+        tables[table] = {
+            "rows": values["row_count"],
+            "expectations": len(names),
+            "failures": failures,
+            "partition_pruned": pruned,
+            **stats,
+        }
+        logger.info(f"Validated {table}: {values['row_count']} rows, {len(failures)} of {len(names)} rules failed, "
+                    f"{stats['bytes_scanned']} bytes scanned in {stats['query_seconds']}s")
+
+    return {
+        "suite": "olist_logistics_rules",
+        "partitions": [d.isoformat() for d in sorted(partitions)] if partitions is not None else None,
+        "success": not any(t["failures"] for t in tables.values()),
+        "tables": tables,
+    }
+
+
+def group_files_by_partition(keys):
+    """
+    Groups object keys of a year/month/day partitioned table by partition.
+    Returns [(date, [keys])] in date order; keys outside a partition are dropped.
+    """
+    groups = {}
+    for key in keys:
+        match = PARTITION_PATH.search(key)
+        if match:
+            groups.setdefault(date(*map(int, match.groups())), []).append(key)
+    return sorted(groups.items())
+
+
+def date_range(start, end):
+    """Every date from `start` to `end`, inclusive."""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run olist_logistics_rules as partition-pruned SQL")
+    parser.add_argument("--date", action="append", type=date.fromisoformat, help="Partition to validate (repeatable)")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    parser.add_argument("--duckdb-root", help="Validate a local Parquet tree with DuckDB instead of Athena")
+    args = parser.parse_args()
+
+    partitions = list(args.date or [])
+    if args.start:
+        partitions += date_range(args.start, args.end or args.start)
+    engine = DuckDBEngine(args.duckdb_root) if args.duckdb_root else AthenaEngine()
+    report = run_pushdown_validation(engine, partitions or [date.today()])
+    print(json.dumps(report, indent=2))
+    if not report["success"]:
+        raise SystemExit(1)
@@ -0,0 +1,71 @@
+# glue.py
+# Keystone Nexus - In-process AWS Glue Schema Registry stand-in
+# Implements the schema calls of the boto3 Glue client used by the Glue serde,
+# with an optional simulated round-trip latency, so the schema cache can be
+# exercised and benchmarked without AWS.
+import threading
+import time
+import uuid
+from collections import Counter
+
+
+class FakeGlueClient:
+    """A boto3 Glue client look-alike holding schemas in memory."""
+
+    def __init__(self, latency_s=0.0, data_format="JSON"):
+        self.latency_s = latency_s
+        self.data_format = data_format
+        self.versions = {}   # version id -> response
+        self.schemas = {}    # (registry, schema) -> [version id, ...]
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def create_schema(self, RegistryId, SchemaName, DataFormat, SchemaDefinition, **kwargs):
+        self._call("create_schema")
+        schema = {"RegistryName": RegistryId.get("RegistryName"), "SchemaName": SchemaName}
+        return self._add_version(schema, SchemaDefinition)
+
+    def register_schema_version(self, SchemaId, SchemaDefinition):
+        self._call("register_schema_version")
+        existing = self._find(SchemaId, SchemaDefinition)
+        return existing if existing is not None else self._add_version(SchemaId, SchemaDefinition)
+
+    def get_schema_by_definition(self, SchemaId, SchemaDefinition):
+        self._call("get_schema_by_definition")
+        existing = self._find(SchemaId, SchemaDefinition)
+        if existing is None:
+            raise KeyError(f"No version of {SchemaId} matches the definition")
+        return existing
+
+    def get_schema_version(self, SchemaId=None, SchemaVersionId=None, SchemaVersionNumber=None):
+        self._call("get_schema_version")
+        if SchemaVersionId is None:
+            ids = self.schemas[(SchemaId.get("RegistryName"), SchemaId["SchemaName"])]
+            number = SchemaVersionNumber or {"LatestVersion": True}
+            SchemaVersionId = ids[-1] if number.get("LatestVersion") else ids[number["VersionNumber"] - 1]
+        return dict(self.versions[SchemaVersionId])
+
+    def _find(self, schema_id, definition):
+        for version_id in self.schemas.get((schema_id.get("RegistryName"), schema_id["SchemaName"]), []):
+            if self.versions[version_id]["SchemaDefinition"] == definition:
+                return dict(self.versions[version_id])
+        return None
+
+    def _add_version(self, schema_id, definition):
+        with self._lock:
+            ids = self.schemas.setdefault((schema_id.get("RegistryName"), schema_id["SchemaName"]), [])
+            version_id = str(uuid.uuid4())
+            ids.append(version_id)
+            self.versions[version_id] = {
+                "SchemaVersionId": version_id,
+                "SchemaDefinition": definition,
+                "DataFormat": self.data_format,
+                "VersionNumber": len(ids),
+                "Status": "AVAILABLE",
+            }
+            return dict(self.versions[version_id])
@@ -0,0 +1,106 @@
+import pyarrow as pa
+import pytest
+
+from src.validation.arrow_expectations import (
+    OLIST_LOGISTICS_RULES, ArrowExpectationSuite, PairGreater, Unique, suite_for_table,
+)
+
+UNIQUE = "expect_column_values_to_be_unique"
+PAIR = "expect_column_pair_values_A_to_be_greater_than_B"
+
+
+def failing_rows(expectation, batches):
+    return [[i for i, failed in enumerate(expectation.failing(batch).to_pylist()) if failed] for batch in batches]
+
+
+def ids(*values):
+    return pa.table({"order_id": pa.array(values, pa.string())})
+
+
+# ==========================================
+# Unique
+# ==========================================
+def test_stream_scope_flags_repeats_across_batches():
+    unique = Unique(UNIQUE, {"column": "order_id"})
+    assert failing_rows(unique, [ids("a", "b", "a"), ids("c", "b", None, None), ids("a")]) == [[2], [1], [0]]
+
+
+def test_batch_scope_only_flags_repeats_within_a_batch():
+    unique = Unique(UNIQUE, {"column": "order_id"}, scope="batch")
+    assert failing_rows(unique, [ids("a", "b", "a"), ids("c", "b", None, None), ids("a")]) == [[2], [], []]
+    assert unique.seen == set()
+
+
+def test_reset_forgets_the_stream():
+    unique = Unique(UNIQUE, {"column": "order_id"})
+    failing_rows(unique, [ids("a")])
+    unique.reset()
+    assert failing_rows(unique, [ids("a")]) == [[]]
+
+
+def test_suite_unique_scope_reaches_the_rule():
+    batches = [ids("a", "b"), ids("b")]
+    stream = ArrowExpectationSuite("s", [{"expectation_type": UNIQUE, "kwargs": {"column": "order_id"}}])
+    batch = ArrowExpectationSuite("s", [{"expectation_type": UNIQUE, "kwargs": {"column": "order_id"}}],
+                                  unique_scope="batch")
+    for b in batches:
+        stream.validate(b)
+        batch.validate(b)
+    assert stream.summary()["failing_rows"] == {f"{UNIQUE}(order_id)": [2]}
+    assert batch.summary()["success"]
+
+
+# ==========================================
+# PairGreater
+# ==========================================
+def pairs(*rows):
+    return pa.table({"a": pa.array([r[0] for r in rows], pa.string()), "b": pa.array([r[1] for r in rows], pa.string())})
+
+
+BATCHES = [
+    pairs(("2018-01-02", "2018-01-01"), (None, "2018-01-01"), ("2018-01-01", "2018-01-02")),
+    pairs((None, None), ("2018-01-03", None), ("2018-01-01", "2018-01-01")),
+    pairs((None, None)),  # a batch where one column is entirely null
+]
+
+
+@pytest.mark.parametrize("ignore_row_if, expected", [
+    (None, [[1, 2], [1, 2], []]),                          # GX default: both_values_are_missing
+    ("both_values_are_missing", [[1, 2], [1, 2], []]),
+    ("either_value_is_missing", [[2], [2], []]),
+    ("neither", [[1, 2], [0, 1, 2], [0]]),
+])
+def test_ignore_row_if_per_batch(ignore_row_if, expected):
+    kwargs = {"column_A": "a", "column_B": "b"}
+    if ignore_row_if:
+        kwargs["ignore_row_if"] = ignore_row_if
+    assert failing_rows(PairGreater(PAIR, kwargs), BATCHES) == expected
+
+
+def test_or_equal():
+    pair = PairGreater(PAIR, {"column_A": "a", "column_B": "b", "or_equal": True})
+    assert failing_rows(pair, BATCHES[1:2]) == [[1]]
+
+
+def test_all_null_column_of_another_type_is_treated_as_missing():
+    batch = pa.table({"a": pa.nulls(2, pa.float64()), "b": pa.array(["2018-01-01", None])})
+    pair = PairGreater(PAIR, {"column_A": "a", "column_B": "b", "ignore_row_if": "either_value_is_missing"})
+    assert failing_rows(pair, [batch]) == [[]]
+
+
+def test_suite_counts_pair_failures_with_stream_row_numbers():
+    suite = suite_for_table("orders")
+    rule = next(r for r in OLIST_LOGISTICS_RULES if r["expectation_type"] == PAIR
+                and r["kwargs"].get("ignore_row_if") == "either_value_is_missing")
+    name = f"{PAIR}({rule['kwargs']['column_A']}, {rule['kwargs']['column_B']})"
+    for batch in BATCHES:
+        suite.validate(batch.rename_columns([rule["kwargs"]["column_A"], rule["kwargs"]["column_B"]]))
+    summary = suite.summary()
+    assert summary["failures"] == {name: 2}
+    assert summary["failing_rows"][name] == [2, 5]
+
+
+def test_every_rule_names_its_table_and_impact():
+    for rule in OLIST_LOGISTICS_RULES:
+        assert rule["meta"]["table"] in ("orders", "order_items")
+        assert rule["meta"]["business_impact"] and rule["meta"]["data_quality_dimension"]
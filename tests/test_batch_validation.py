@@ -0,0 +1,179 @@
+import json
+import random
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import src.ingestion.olist_lakehouse_enterprise as lakehouse
+import src.ingestion.olist_lakehouse_enterprise_glue as lakehouse_glue
+from src.ingestion.batch_validation import (
+    CompiledSchema, DeadLetterWriter, decode_json_records, parse_timestamps, validate_messages,
+)
+from src.ingestion.consumer_pipeline import add_partition_columns
+from src.ingestion.olist_schemas import (
+    OLIST_SCHEMAS, OLIST_TIMESTAMP_FORMAT, ORDER_EVENT_CONTRACT, ORDER_EVENT_TIMESTAMPS,
+)
+from src.streaming.glue_schema_cache import encode_glue_payload
+from tests.fakes.glue import FakeGlueClient
+from src.streaming.fakes import FakeMessage, make_order
+
+VALIDATOR = CompiledSchema(ORDER_EVENT_CONTRACT, OLIST_SCHEMAS["orders"], ORDER_EVENT_TIMESTAMPS)
+
+
+def order(i, **overrides):
+    return {**make_order(i, random.Random(i)), **overrides}
+
+
+def as_messages(payloads):
+    return [FakeMessage(payload, offset=i) for i, payload in enumerate(payloads)]
+
+
+def read_dead_letters(root):
+    files = sorted(root.rglob("*.parquet"))
+    return pa.concat_tables([pq.read_table(f) for f in files]).to_pylist() if files else []
+
+
+# ==========================================
+# Timestamps
+# ==========================================
+def test_parse_timestamps_nulls_malformed_and_impossible_dates():
+    strings = pa.array(["2018-01-02 03:04:05", "2018-02-30 10:00:00", "2018-13-45 99:99:99", "2018-01-02", None])
+    parsed = parse_timestamps(strings, OLIST_TIMESTAMP_FORMAT).to_pylist()
+    assert [value is not None for value in parsed] == [True, False, False, False, False]
+
+
+def test_add_partition_columns_does_not_fail_on_a_bad_timestamp():
+    table = pa.Table.from_pylist([order(0, order_purchase_timestamp="2018-03-04 05:06:07"),
+                                  order(1, order_purchase_timestamp="2018-02-30 10:00:00")],
+                                 schema=OLIST_SCHEMAS["orders"])
+    table = add_partition_columns(table)
+    assert table.select(["year", "month", "day"]).to_pylist() == [
+        {"year": 2018, "month": 3, "day": 4}, {"year": None, "month": None, "day": None}]
+
+
+@pytest.mark.parametrize("value", ["2018-02-30 10:00:00", "2018-13-45 99:99:99"])
+def test_contract_rejects_impossible_purchase_timestamps(value):
+    messages = as_messages([json.dumps(order(0)).encode(), json.dumps(order(1, order_purchase_timestamp=value)).encode()])
+    table, dead = validate_messages(messages, VALIDATOR)
+    assert table.column("order_id").to_pylist() == [order(0)["order_id"]]
+    assert [(msg.offset(), reason) for msg, reason in dead] == [
+        (1, "order_purchase_timestamp is not a valid %Y-%m-%d %H:%M:%S timestamp")]
+
+
+def test_contract_rejects_impossible_optional_timestamps_but_not_nulls():
+    messages = as_messages([json.dumps(order(0, order_approved_at=None)).encode(),
+                            json.dumps(order(1, order_approved_at="2018-04-31 00:00:00")).encode()])
+    table, dead = validate_messages(messages, VALIDATOR)
+    assert table.num_rows == 1
+    assert [reason for _, reason in dead] == ["order_approved_at is not a valid %Y-%m-%d %H:%M:%S timestamp"]
+
+
+def test_json_consumer_dead_letters_bad_timestamps_instead_of_failing(monkeypatch, tmp_path):
+    monkeypatch.setattr(lakehouse, "dead_letters", DeadLetterWriter(str(tmp_path)))
+    payloads = [json.dumps(order(0)).encode(), json.dumps(order(1, order_purchase_timestamp="2018-02-30 10:00:00")).encode()]
+    table = lakehouse.decode_orders(as_messages(payloads))
+    assert table.column("order_id").to_pylist() == [order(0)["order_id"]]
+    assert None not in table.column("year").to_pylist()
+    dead = read_dead_letters(tmp_path)
+    assert [(row["offset"], row["payload"]) for row in dead] == [(1, payloads[1])]
+
+
+def test_glue_consumer_dead_letters_bad_timestamps_instead_of_failing(monkeypatch, tmp_path):
+    glue = FakeGlueClient()
+    version_id = glue.register_schema_version(
+        SchemaId={"RegistryName": "keystone-registry", "SchemaName": "OlistOrderSchema"},
+        SchemaDefinition=json.dumps(ORDER_EVENT_CONTRACT))["SchemaVersionId"]
+    monkeypatch.setattr(lakehouse_glue, "glue_client", glue)
+    monkeypatch.setattr(lakehouse_glue, "compiled_schemas", {})
+    monkeypatch.setattr(lakehouse_glue, "dead_letters", DeadLetterWriter(str(tmp_path)))
+
+    bodies = [json.dumps(order(0)).encode(), json.dumps(order(1, order_purchase_timestamp="2018-13-45 99:99:99")).encode()]
+    table = lakehouse_glue.decode_glue_batch(as_messages([encode_glue_payload(version_id, b) for b in bodies]))
+    assert table.column("order_id").to_pylist() == [order(0)["order_id"]]
+    assert [row["offset"] for row in read_dead_letters(tmp_path)] == [1]
+
+
+# ==========================================
+# Compiled checks
+# ==========================================
+@pytest.mark.parametrize("overrides, reason", [
+    ({"order_id": "not-a-hex-id"}, "order_id does not match ^[0-9a-f]{32}$"),
+    ({"order_status": "lost"}, "order_status is not one of the allowed values"),
+    ({"customer_id": None}, "customer_id is required"),
+    ({"order_purchase_timestamp": "02/01/2018 10:00"}, "order_purchase_timestamp does not match "),
+])
+def test_each_reject_kind_is_reported(overrides, reason):
+    table = pa.Table.from_pylist([order(0), order(1, **overrides)], schema=OLIST_SCHEMAS["orders"])
+    valid, reasons = VALIDATOR.validate(table)
+    assert valid.to_pylist() == [True, False]
+    assert list(reasons) == [1] and reasons[1].startswith(reason)
+
+
+def test_missing_required_field_is_rejected_but_nullable_field_is_not():
+    required = {k: v for k, v in order(1).items() if k != "order_status"}
+    optional = {k: v for k, v in order(2).items() if k != "order_delivered_customer_date"}
+    table, dead = validate_messages(as_messages([json.dumps(o).encode() for o in (order(0), required, optional)]),
+                                    VALIDATOR)
+    assert table.num_rows == 2
+    assert [(msg.offset(), reason) for msg, reason in dead] == [(1, "order_status is required")]
+
+
+def test_first_failing_check_is_the_reason():
+    table = pa.Table.from_pylist([order(0, order_id="x", order_status="lost")], schema=OLIST_SCHEMAS["orders"])
+    _, reasons = VALIDATOR.validate(table)
+    assert reasons == {0: "order_id does not match ^[0-9a-f]{32}$"}
+
+
+def test_wrongly_typed_value_is_undecodable():
+    messages = as_messages([json.dumps(order(0)).encode(), json.dumps(order(1, order_status=3)).encode()])
+    table, dead = validate_messages(messages, VALIDATOR)
+    assert table.num_rows == 1
+    assert dead[0][0].offset() == 1 and dead[0][1].startswith("undecodable: ")
+
+
+# ==========================================
+# Decoding (bisection)
+# ==========================================
+def test_undecodable_records_mid_batch_are_isolated():
+    payloads = [json.dumps(order(i)).encode() for i in range(10)]
+    payloads[3] = b'{"order_id": "truncated'
+    payloads[7] = b"not json"
+    decoded, rows, errors = decode_json_records(payloads, OLIST_SCHEMAS["orders"])
+    assert [i for i, _ in errors] == [3, 7]
+    assert sorted(rows) == [0, 1, 2, 4, 5, 6, 8, 9]
+    assert decoded.column("order_id").to_pylist() == [order(i)["order_id"] for i in rows]
+
+
+def test_blank_and_pretty_printed_records():
+    payloads = [json.dumps(order(0)).encode(), b"", json.dumps(order(2), indent=2).encode()]
+    decoded, rows, errors = decode_json_records(payloads, OLIST_SCHEMAS["orders"])
+    assert [i for i, _ in errors] == [1]
+    assert sorted(rows) == [0, 2]
+    assert decoded.column("order_id").to_pylist() == [order(i)["order_id"] for i in rows]
+
+
+def test_empty_batch():
+    decoded, rows, errors = decode_json_records([], OLIST_SCHEMAS["orders"])
+    assert decoded.num_rows == 0 and rows == [] and errors == []
+
+
+# ==========================================
+# Dead-letter output
+# ==========================================
+def test_dead_letter_writer_keeps_payload_coordinates_and_reason(tmp_path):
+    writer = DeadLetterWriter(str(tmp_path))
+    messages = [FakeMessage(b'{"bad": 1}', topic="orders", partition=2, offset=41),
+                FakeMessage(b"\x00\x01", topic="orders", partition=5, offset=7)]
+    writer.write([(messages[0], "order_id is required"), (messages[1], "undecodable: x")])
+    writer.write([])
+
+    assert writer.written == 2
+    (directory,) = [p for p in tmp_path.iterdir()]
+    assert directory.name.startswith("date=")
+    rows = read_dead_letters(tmp_path)
+    assert [{k: row[k] for k in ("topic", "partition", "offset", "reason", "payload")} for row in rows] == [
+        {"topic": "orders", "partition": 2, "offset": 41, "reason": "order_id is required", "payload": b'{"bad": 1}'},
+        {"topic": "orders", "partition": 5, "offset": 7, "reason": "undecodable: x", "payload": b"\x00\x01"},
+    ]
+    assert all(row["rejected_at"] is not None for row in rows)
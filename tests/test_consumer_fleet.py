@@ -0,0 +1,153 @@
+import pytest
+
+from src.ingestion import consumer_fleet
+from src.ingestion.consumer_fleet import ConsumerFleet, aggregate_metrics, default_worker_count
+from src.streaming.fakes import fake_group_consumer
+
+
+class StubProcess:
+    def __init__(self, pid):
+        self.pid = pid
+        self.exitcode = None
+
+    def is_alive(self):
+        return self.exitcode is None
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def fleet(monkeypatch):
+    """A two-worker fleet whose processes are stubs and whose clock is manual."""
+    clock = Clock()
+    monkeypatch.setattr(consumer_fleet, "time", clock)
+    fleet = ConsumerFleet(2, max_restarts=2, restart_backoff_s=1.0)
+    fleet.clock = clock
+    fleet.spawned = []
+    pids = iter(range(1000, 2000))
+
+    def spawn(worker_id):
+        process = StubProcess(next(pids))
+        fleet.processes[worker_id] = process
+        fleet.pids[worker_id] = process.pid
+        fleet.spawned.append(worker_id)
+
+    monkeypatch.setattr(fleet, "_spawn", spawn)
+    for worker_id in range(fleet.num_workers):
+        fleet._spawn(worker_id)
+    return fleet
+
+
+def crash(fleet, worker_id, code=1):
+    fleet.processes[worker_id].exitcode = code
+
+
+# ==========================================
+# Restarts
+# ==========================================
+def test_crashed_worker_is_restarted_after_a_doubling_backoff(fleet):
+    crash(fleet, 0)
+    assert fleet._supervise()
+    assert fleet.restart_at == {0: 101.0}
+
+    fleet.clock.now = 100.9
+    fleet._supervise()
+    assert fleet.spawned == [0, 1]
+
+    fleet.clock.now = 101.0
+    fleet._supervise()
+    assert fleet.spawned == [0, 1, 0] and 0 in fleet.processes
+
+    crash(fleet, 0)
+    fleet._supervise()
+    assert fleet.restart_at == {0: 103.0}
+
+
+def test_restart_limit_is_per_worker_slot(fleet):
+    for _ in range(2):
+        crash(fleet, 0)
+        fleet._supervise()
+        fleet.clock.now += 10
+        fleet._supervise()
+    assert fleet.restarts == {0: 2, 1: 0}
+
+    crash(fleet, 0)
+    fleet._supervise()
+    assert 0 not in fleet.processes and 0 not in fleet.restart_at
+    assert fleet.spawned == [0, 1, 0, 0]
+
+    crash(fleet, 1)
+    fleet._supervise()
+    assert 1 in fleet.restart_at
+
+
+def test_clean_exit_is_final(fleet):
+    crash(fleet, 0, code=0)
+    crash(fleet, 1, code=0)
+    assert not fleet._supervise()
+    assert fleet.restart_at == {} and fleet.spawned == [0, 1]
+
+
+def test_no_restarts_once_stopping(fleet):
+    crash(fleet, 0)
+    fleet._supervise()
+    fleet.stop_event.set()
+    crash(fleet, 1)
+    fleet.clock.now += 10
+    assert not fleet._supervise()
+    assert fleet.restart_at == {} and fleet.spawned == [0, 1]
+
+
+# ==========================================
+# Metrics
+# ==========================================
+def snapshot(records, rate, lag=0.0, **extra):
+    return {"records": records, "bytes": records * 100, "batches": 1, "failed_batches": 0,
+            "records_per_s": rate, "mb_per_s": rate / 1e4, "max_lag_s": lag, **extra}
+
+
+def test_counters_include_dead_incarnations_but_rates_only_current_ones():
+    snapshots = {1: snapshot(500, 50.0, lag=2.0), 2: snapshot(300, 30.0), 3: snapshot(200, 20.0, lag=0.5)}
+    totals = aggregate_metrics(snapshots, current={2, 3})
+    assert totals["workers"] == 2
+    assert totals["records"] == 1000 and totals["bytes"] == 100000 and totals["batches"] == 3
+    assert totals["records_per_s"] == 50.0 and totals["mb_per_s"] == 0.005
+    assert totals["max_lag_s"] == 2.0
+
+
+def test_rejected_counts_are_summed():
+    totals = aggregate_metrics({1: snapshot(10, 1.0, rejected=3), 2: snapshot(10, 1.0, rejected=4)}, {1, 2})
+    assert totals["rejected"] == 7
+    assert aggregate_metrics({1: snapshot(10, 1.0)}, {1})["rejected"] == 0
+
+
+def test_fleet_metrics_use_the_latest_pid_per_slot(fleet):
+    fleet.snapshots = {1000: snapshot(100, 10.0), 1001: snapshot(100, 10.0)}
+    crash(fleet, 0)
+    fleet._supervise()
+    fleet.clock.now += 10
+    fleet._supervise()
+    fleet.snapshots[fleet.pids[0]] = snapshot(5, 7.0)
+    totals = fleet.metrics()
+    assert totals["records"] == 205 and totals["records_per_s"] == 17.0
+
+
+# ==========================================
+# Sizing
+# ==========================================
+def test_worker_count_is_capped_by_partitions_and_cores(monkeypatch):
+    monkeypatch.setattr(consumer_fleet.os, "cpu_count", lambda: 4)
+    assert default_worker_count(2) == 2
+    assert default_worker_count(16) == 4
+    assert default_worker_count(None) == 4
+
+
+def test_fake_group_members_split_the_partitions():
+    members = [fake_group_consumer(w, 3, num_partitions=8, records_per_partition=2) for w in range(3)]
+    assert [sorted(m.queues) for m in members] == [[0, 3, 6], [1, 4, 7], [2, 5]]
@@ -0,0 +1,180 @@
+import time
+
+import pytest
+from confluent_kafka import TopicPartition
+
+from src.ingestion.consumer_pipeline import MicroBatcher, OffsetTracker, run_pipeline
+from src.streaming.fakes import FakeConsumer, FakeMessage
+
+
+def messages(n, size=10, partition=0):
+    return [FakeMessage(b"x" * size, partition=partition, offset=i) for i in range(n)]
+
+
+# ==========================================
+# MicroBatcher
+# ==========================================
+def test_record_trigger():
+    batcher = MicroBatcher(max_records=3, max_bytes=10**6, max_latency_s=60)
+    batcher.add(messages(2))
+    assert batcher.trigger() is None
+    batcher.add(messages(1))
+    assert batcher.trigger() == "records"
+
+
+def test_byte_trigger():
+    batcher = MicroBatcher(max_records=100, max_bytes=25, max_latency_s=60)
+    batcher.add(messages(2, size=10))
+    assert batcher.trigger() is None
+    batcher.add(messages(1, size=10))
+    assert batcher.trigger() == "bytes"
+
+
+def test_latency_trigger_counts_from_first_message():
+    batcher = MicroBatcher(max_records=100, max_bytes=10**6, max_latency_s=0.05)
+    assert batcher.trigger() is None
+    assert batcher.poll_timeout(default=1.0) == 1.0
+    batcher.add(messages(1))
+    assert batcher.poll_timeout(default=1.0) <= 0.05
+    time.sleep(0.06)
+    assert batcher.trigger() == "latency"
+
+
+def test_take_resets_and_capacity_stops_at_record_trigger():
+    batcher = MicroBatcher(max_records=5, max_bytes=10**6, max_latency_s=60)
+    batcher.add(messages(3, size=4))
+    assert batcher.capacity(poll_num_messages=1000) == 2
+    batch, size = batcher.take()
+    assert len(batch) == 3 and size == 12
+    assert batcher.messages == [] and batcher.bytes == 0 and batcher.first_at is None
+    assert batcher.capacity(poll_num_messages=1000) == 5
+
+
+def test_tombstones_are_buffered_with_zero_bytes():
+    batcher = MicroBatcher(max_records=100, max_bytes=10**6, max_latency_s=60)
+    batcher.add([FakeMessage(None, offset=0), FakeMessage(b"abc", offset=1)])
+    assert len(batcher.messages) == 2
+    assert batcher.bytes == 3
+
+
+def test_errored_messages_are_skipped():
+    class ErrorMessage(FakeMessage):
+        def error(self):
+            return "broker error"
+
+    batcher = MicroBatcher(max_records=100, max_bytes=10**6, max_latency_s=60)
+    batcher.add([ErrorMessage(b"abc")])
+    assert batcher.messages == [] and batcher.first_at is None
+
+
+# ==========================================
+# OffsetTracker
+# ==========================================
+def assigned_tracker(partitions=(0, 1), interval_s=0):
+    consumer = FakeConsumer({p: [] for p in partitions})
+    tracker = OffsetTracker(consumer, interval_s=interval_s)
+    tracker.on_assign(consumer, [TopicPartition("orders", p) for p in partitions])
+    return consumer, tracker
+
+
+def test_commits_written_offsets_only():
+    consumer, tracker = assigned_tracker()
+    tracker.mark_written({("orders", 0): 10})
+    tracker.maybe_commit()
+    assert consumer.committed == {0: 10}
+    # Nothing new written: no further commit is sent
+    tracker.maybe_commit()
+    assert consumer.commit_calls == 1
+
+
+def test_written_offsets_never_move_backwards():
+    consumer, tracker = assigned_tracker()
+    tracker.mark_written({("orders", 0): 10})
+    tracker.mark_written({("orders", 0): 4})
+    tracker.commit_final()
+    assert consumer.committed == {0: 10}
+
+
+def test_commit_interval_is_respected():
+    consumer, tracker = assigned_tracker(interval_s=60)
+    tracker.mark_written({("orders", 0): 10})
+    tracker.maybe_commit()
+    assert consumer.commit_calls == 0
+    tracker.commit_final()
+    assert consumer.committed == {0: 10}
+
+
+def test_revoke_commits_revoked_partitions_and_forgets_them():
+    consumer, tracker = assigned_tracker()
+    tracker.mark_written({("orders", 0): 10, ("orders", 1): 7})
+    tracker.on_revoke(consumer, [TopicPartition("orders", 1)])
+    assert consumer.committed == {1: 7}
+
+    # A batch finishing after the rebalance cannot commit for the new owner
+    tracker.mark_written({("orders", 1): 3})
+    tracker.commit_final()
+    assert consumer.committed == {0: 10, 1: 7}
+
+
+def test_failed_commit_is_retried():
+    consumer, tracker = assigned_tracker()
+    calls = []
+
+    def flaky_commit(offsets=None, asynchronous=True):
+        calls.append(offsets)
+        if len(calls) == 1:
+            raise RuntimeError("coordinator not available")
+        FakeConsumer.commit(consumer, offsets=offsets, asynchronous=asynchronous)
+
+    consumer.commit = flaky_commit
+    tracker.mark_written({("orders", 0): 10})
+    tracker.maybe_commit()
+    assert consumer.committed == {}
+    tracker.maybe_commit()
+    assert consumer.committed == {0: 10}
+
+
+# ==========================================
+# run_pipeline
+# ==========================================
+def run(consumer, decode, written, **kwargs):
+    return run_pipeline(consumer, decode, write=written.append, max_records=10, max_bytes=10**6, max_latency_s=60,
+                        commit_interval_s=0, stop_on_idle=True, **kwargs)
+
+
+def test_pipeline_commits_written_batches():
+    consumer = FakeConsumer({0: [b"a"] * 20, 1: [b"b"] * 20})
+    written = []
+    snapshot = run(consumer, lambda messages: len(messages), written)
+    assert sum(written) == 40
+    assert consumer.committed == {0: 20, 1: 20}
+    assert snapshot["records"] == 40 and snapshot["failed_batches"] == 0
+
+
+def test_decode_failure_commits_nothing():
+    consumer = FakeConsumer({0: [b"a"] * 10, 1: [b"b"] * 10})
+    written = []
+
+    def decode(messages):
+        raise ValueError("malformed payload")
+
+    with pytest.raises(ValueError):
+        run(consumer, decode, written)
+    assert written == []
+    assert consumer.committed == {}
+
+
+def test_decode_failure_keeps_earlier_batches_only():
+    consumer = FakeConsumer({0: [b"a"] * 30})
+    written, calls = [], []
+
+    def decode(messages):
+        calls.append(len(messages))
+        if len(calls) == 2:
+            raise ValueError("malformed payload")
+        return [m.offset() for m in messages]
+
+    with pytest.raises(ValueError):
+        run(consumer, decode, written)
+    assert written == [list(range(10))]
+    assert consumer.committed == {0: 10}
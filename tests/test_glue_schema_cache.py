@@ -0,0 +1,123 @@
+import time
+import uuid
+import zlib
+
+import pytest
+
+from src.streaming.glue_schema_cache import (
+    COMPRESSION_ZLIB, HEADER_VERSION_BYTE, CachingGlueClient, TTLCache, decode_glue_payload, encode_glue_payload,
+)
+from tests.fakes.glue import FakeGlueClient
+
+SCHEMA_ID = {"RegistryName": "keystone-registry", "SchemaName": "OlistOrderSchema"}
+
+
+def registry(versions=1):
+    client = FakeGlueClient()
+    ids = [client.register_schema_version(SchemaId=SCHEMA_ID, SchemaDefinition=f'{{"v": {v}}}')["SchemaVersionId"]
+           for v in range(versions)]
+    client.calls.clear()
+    return client, ids
+
+
+# ==========================================
+# Cache
+# ==========================================
+def test_lru_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_s=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(max_size=10, ttl_s=0.05)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_version_lookups_hit_the_registry_once():
+    client, (version_id,) = registry()
+    cached = CachingGlueClient(client, max_size=10, ttl_s=60)
+    for _ in range(5):
+        assert cached.get_schema_version(SchemaVersionId=version_id)["SchemaVersionId"] == version_id
+    assert client.calls["get_schema_version"] == 1
+    assert cached.stats()["hits"] == 4 and cached.stats()["misses"] == 1
+
+
+def test_lru_eviction_refetches_from_the_registry():
+    client, ids = registry(versions=3)
+    cached = CachingGlueClient(client, max_size=2, ttl_s=60)
+    for version_id in ids:
+        cached.get_schema_version(SchemaVersionId=version_id)
+    cached.get_schema_version(SchemaVersionId=ids[0])
+    assert client.calls["get_schema_version"] == 4
+    assert cached.stats()["evictions"] == 2
+
+
+def test_latest_version_is_refetched_after_ttl():
+    client, (first,) = registry()
+    cached = CachingGlueClient(client, max_size=10, ttl_s=0.05)
+    latest = {"SchemaId": SCHEMA_ID, "SchemaVersionNumber": {"LatestVersion": True}}
+    assert cached.get_schema_version(**latest)["SchemaVersionId"] == first
+
+    second = client.register_schema_version(SchemaId=SCHEMA_ID, SchemaDefinition='{"v": 1}')["SchemaVersionId"]
+    assert cached.get_schema_version(**latest)["SchemaVersionId"] == first
+    time.sleep(0.06)
+    assert cached.get_schema_version(**latest)["SchemaVersionId"] == second
+
+
+def test_definition_lookups_are_cached():
+    client, (version_id,) = registry()
+    cached = CachingGlueClient(client, max_size=10, ttl_s=60)
+    for _ in range(3):
+        response = cached.get_schema_by_definition(SchemaId=SCHEMA_ID, SchemaDefinition='{"v": 0}')
+        assert response["SchemaVersionId"] == version_id
+    assert client.calls["get_schema_by_definition"] == 1
+
+
+def test_prewarm_does_not_count_as_traffic():
+    client, (version_id,) = registry()
+    cached = CachingGlueClient(client, max_size=10, ttl_s=60)
+    cached.prewarm(schema_names=[SCHEMA_ID["SchemaName"]], registry_name=SCHEMA_ID["RegistryName"])
+    assert cached.stats()["hits"] == 0 and cached.stats()["misses"] == 0
+    cached.get_schema_version(SchemaVersionId=version_id)
+    cached.get_schema_by_definition(SchemaId=SCHEMA_ID, SchemaDefinition='{"v": 0}')
+    assert cached.stats()["hits"] == 2
+    assert client.calls["get_schema_by_definition"] == 0
+
+
+# ==========================================
+# Wire format
+# ==========================================
+@pytest.mark.parametrize("compress", [False, True])
+def test_payload_round_trip(compress):
+    version_id = str(uuid.uuid4())
+    payload = encode_glue_payload(version_id, b'{"order_id": "1"}', compress=compress)
+    assert payload[0] == HEADER_VERSION_BYTE
+    assert decode_glue_payload(payload) == (version_id, b'{"order_id": "1"}')
+
+
+def test_header_layout():
+    version_id = uuid.uuid4()
+    payload = bytes([HEADER_VERSION_BYTE, COMPRESSION_ZLIB]) + version_id.bytes + zlib.compress(b"body")
+    assert decode_glue_payload(memoryview(payload)) == (str(version_id), b"body")
+
+
+@pytest.mark.parametrize("payload", [b"", b'{"order_id": "1"}', bytes([HEADER_VERSION_BYTE, 0]) + b"short"])
+def test_unframed_payloads_are_rejected(payload):
+    with pytest.raises(ValueError, match="not framed"):
+        decode_glue_payload(payload)
+
+
+def test_unknown_compression_is_rejected():
+    payload = bytes([HEADER_VERSION_BYTE, 9]) + uuid.uuid4().bytes + b"body"
+    with pytest.raises(ValueError, match="compression"):
+        decode_glue_payload(payload)
@@ -0,0 +1,107 @@
+import os
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.gold import fact_sales
+from src.gold.fact_sales import build_fact_sales
+from src.ingestion.consumer_pipeline import add_partition_columns
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+
+JAN_2, JAN_3 = date(2018, 1, 2), date(2018, 1, 3)
+
+
+def order(order_id, purchased, status="delivered", delivered="2018-01-06 09:00:00", customer="c1"):
+    return {"order_id": order_id, "customer_id": customer, "order_status": status,
+            "order_purchase_timestamp": purchased, "order_approved_at": purchased,
+            "order_delivered_carrier_date": None, "order_delivered_customer_date": delivered,
+            "order_estimated_delivery_date": "2018-01-20 00:00:00"}
+
+
+def item(order_id, item_id, price, freight):
+    return {"order_id": order_id, "order_item_id": item_id, "product_id": f"p{item_id}", "seller_id": "s1",
+            "shipping_limit_date": "2018-01-04 00:00:00", "price": price, "freight_value": freight}
+
+
+def payment(order_id, sequential, value, installments):
+    return {"order_id": order_id, "payment_sequential": sequential, "payment_type": "credit_card",
+            "payment_installments": installments, "payment_value": value}
+
+
+ORDERS = [
+    order("o1", "2018-01-02 23:30:00"),
+    order("o1", "2018-01-02 23:30:00"),                              # redelivered event
+    order("o2", "2018-01-02 08:00:00", delivered=None),              # delivered, no delivery date, no payments
+    order("o3", "2018-01-02 10:00:00", status="shipped"),            # not delivered
+    order("o4", "2018-01-03 10:00:00", delivered="2018-01-03 18:00:00"),
+    order("o5", "2018-01-04 10:00:00"),                              # outside the target days
+]
+ITEMS = [item("o1", 1, 10.0, 2.5), item("o1", 2, 20.0, 2.5), item("o2", 1, 5.0, 1.0), item("o3", 1, 7.0, 1.0),
+         item("o4", 1, 100.0, 0.0), item("o5", 1, 1.0, 1.0), item(None, 1, 1.0, 1.0)]
+PAYMENTS = [payment("o1", 1, 30.0, 3), payment("o1", 2, 5.0, 1), payment("o4", 1, 100.0, 10),
+            payment(None, 1, 1.0, 1)]
+
+# fact_sales.sql on the rows above for 2018-01-02 and 2018-01-03
+EXPECTED = [
+    {"order_id": "o1", "order_item_id": 1, "customer_id": "c1", "product_id": "p1", "seller_id": "s1",
+     "date_key": 20180102, "price": 10.0, "freight_value": 2.5, "total_order_item_value": 12.5,
+     "total_payment_value": 35.0, "max_payment_installments": 3, "delivery_lag_days": 4},
+    {"order_id": "o1", "order_item_id": 2, "customer_id": "c1", "product_id": "p2", "seller_id": "s1",
+     "date_key": 20180102, "price": 20.0, "freight_value": 2.5, "total_order_item_value": 22.5,
+     "total_payment_value": 35.0, "max_payment_installments": 3, "delivery_lag_days": 4},
+    {"order_id": "o2", "order_item_id": 1, "customer_id": "c1", "product_id": "p1", "seller_id": "s1",
+     "date_key": 20180102, "price": 5.0, "freight_value": 1.0, "total_order_item_value": 6.0,
+     "total_payment_value": None, "max_payment_installments": None, "delivery_lag_days": None},
+    {"order_id": "o4", "order_item_id": 1, "customer_id": "c1", "product_id": "p1", "seller_id": "s1",
+     "date_key": 20180103, "price": 100.0, "freight_value": 0.0, "total_order_item_value": 100.0,
+     "total_payment_value": 100.0, "max_payment_installments": 10, "delivery_lag_days": 0},
+]
+
+
+@pytest.fixture
+def lake(tmp_path):
+    silver, bronze, gold = (str(tmp_path / name) for name in ("silver", "bronze", "gold"))
+    orders = add_partition_columns(pa.Table.from_pylist(ORDERS, schema=OLIST_SCHEMAS["orders"]))
+    pq.write_to_dataset(orders, os.path.join(silver, "orders"), partition_cols=["year", "month", "day"])
+    for name, rows in (("order_items", ITEMS), ("order_payments", PAYMENTS)):
+        os.makedirs(os.path.join(bronze, name))
+        pq.write_table(pa.Table.from_pylist(rows, schema=OLIST_SCHEMAS[name]),
+                       os.path.join(bronze, name, f"{name}_20180105.parquet"))
+    return silver, bronze, gold
+
+
+def read_gold(gold):
+    rows = pq.read_table(gold, partitioning="hive").to_pylist()
+    return sorted(({**r, "date_key": int(r["date_key"])} for r in rows), key=lambda r: (r["order_id"], r["order_item_id"]))
+
+
+def test_matches_the_dbt_model(lake):
+    silver, bronze, gold = lake
+    summary = build_fact_sales([JAN_2, JAN_3], silver, bronze, gold)
+    assert summary["rows"] == len(EXPECTED)
+    assert sorted(os.listdir(gold)) == ["date_key=20180102", "date_key=20180103"]
+    assert read_gold(gold) == EXPECTED
+
+
+def test_rebuilding_a_day_replaces_it(lake):
+    silver, bronze, gold = lake
+    build_fact_sales([JAN_2, JAN_3], silver, bronze, gold)
+    build_fact_sales([JAN_2], silver, bronze, gold)
+    assert read_gold(gold) == EXPECTED
+    assert len(os.listdir(os.path.join(gold, "date_key=20180102"))) == 1
+    assert not [name for name in os.listdir(gold) if name.startswith("_staging")]
+
+
+def test_failed_build_leaves_gold_unchanged(lake, monkeypatch):
+    silver, bronze, gold = lake
+    build_fact_sales([JAN_2, JAN_3], silver, bronze, gold)
+
+    def fail(*args, **kwargs):
+        raise OSError("S3 write failed")
+
+    monkeypatch.setattr(fact_sales.pq, "write_to_dataset", fail)
+    with pytest.raises(OSError):
+        build_fact_sales([JAN_2, JAN_3], silver, bronze, gold)
+    assert read_gold(gold) == EXPECTED
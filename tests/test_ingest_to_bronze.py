@@ -0,0 +1,127 @@
+import csv
+import io
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.ingestion.ingest_to_bronze import (
+    convert_csv_to_parquet, convert_csv_to_parquet_streaming, iter_csv_chunks,
+)
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+
+CUSTOMERS = [
+    {"customer_id": f"c{i}", "customer_unique_id": f"u{i}", "customer_zip_code_prefix": f"{i * 37 % 100000:05d}",
+     "customer_city": "sao paulo, centro" if i % 3 == 0 else "campinas", "customer_state": "SP"}
+    for i in range(50)
+]
+
+
+def write_csv(path, rows, columns=None, bom=False):
+    columns = columns or list(rows[0])
+    with open(path, "w", newline="", encoding="utf-8-sig" if bom else "utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def convert(mode, csv_path, out, table_name):
+    if mode == "pandas":
+        return convert_csv_to_parquet(csv_path, out, table_name)
+    return convert_csv_to_parquet_streaming(csv_path, out, table_name, max_memory_mb=1)
+
+
+# ==========================================
+# iter_csv_chunks
+# ==========================================
+@pytest.mark.parametrize("block_size", [1, 7, 64, 10**6])
+def test_chunks_end_on_line_boundaries_and_cover_the_input(block_size):
+    data = b'a,b\n1,"x, y"\n2,"quoted ""z"""\n3,last-without-newline'
+    chunks = [bytes(c) for c in iter_csv_chunks(io.BytesIO(data), block_size)]
+    assert b"".join(chunks) == data
+    assert all(c.endswith(b"\n") for c in chunks[:-1])
+
+
+def test_a_quoted_field_split_across_reads_stays_in_one_chunk():
+    data = b'1,"a long, quoted, field"\n2,"another, one"\n'
+    for chunk in iter_csv_chunks(io.BytesIO(data), 5):
+        # Every chunk is whole records, so it parses on its own
+        rows = list(csv.reader(io.StringIO(bytes(chunk).decode())))
+        assert all(len(row) == 2 for row in rows)
+
+
+def test_empty_input_yields_nothing():
+    assert list(iter_csv_chunks(io.BytesIO(b""), 16)) == []
+
+
+# ==========================================
+# Converters
+# ==========================================
+@pytest.mark.parametrize("mode", ["pandas", "streaming"])
+def test_both_paths_write_the_pinned_schema(tmp_path, mode):
+    csv_path = write_csv(tmp_path / "customers.csv", CUSTOMERS)
+    out = str(tmp_path / "customers.parquet")
+    assert convert(mode, csv_path, out, "customers") == len(CUSTOMERS)
+    table = pq.read_table(out)
+    assert table.schema.equals(OLIST_SCHEMAS["customers"])
+    assert table.to_pylist() == CUSTOMERS
+
+
+def test_both_paths_agree_on_nullable_ints_and_empty_strings(tmp_path):
+    reviews = [{"review_id": f"r{i}", "order_id": f"o{i}", "review_score": "" if i == 1 else str(i % 5 + 1),
+                "review_comment_title": "", "review_comment_message": "ok",
+                "review_creation_date": "2018-01-02 00:00:00", "review_answer_timestamp": "2018-01-03 10:00:00"}
+               for i in range(5)]
+    csv_path = write_csv(tmp_path / "reviews.csv", reviews)
+    tables = []
+    for mode in ("pandas", "streaming"):
+        out = str(tmp_path / f"{mode}.parquet")
+        convert(mode, csv_path, out, "order_reviews")
+        tables.append(pq.read_table(out))
+    assert tables[0].equals(tables[1])
+    assert tables[0].column("review_score").to_pylist()[:2] == [1, None]
+
+
+@pytest.mark.parametrize("mode", ["pandas", "streaming"])
+@pytest.mark.parametrize("table_name", ["customers", "order_reviews"])
+def test_bom_header_is_accepted(tmp_path, mode, table_name):
+    rows = CUSTOMERS if table_name == "customers" else [
+        {"review_id": "r1", "order_id": "o1", "review_score": "5", "review_comment_title": "",
+         "review_comment_message": "ok", "review_creation_date": "2018-01-02 00:00:00",
+         "review_answer_timestamp": "2018-01-03 10:00:00"}]
+    csv_path = write_csv(tmp_path / "bom.csv", rows, bom=True)
+    out = str(tmp_path / "bom.parquet")
+    assert convert(mode, csv_path, out, table_name) == len(rows)
+    assert pq.read_table(out).schema.names == OLIST_SCHEMAS[table_name].names
+
+
+@pytest.mark.parametrize("mode", ["pandas", "streaming"])
+@pytest.mark.parametrize("columns", [
+    ["customer_unique_id", "customer_id", "customer_zip_code_prefix", "customer_city", "customer_state"],
+    ["customer_id", "customer_unique_id", "customer_zip_code_prefix", "customer_city"],
+])
+def test_header_drift_is_rejected(tmp_path, mode, columns):
+    csv_path = write_csv(tmp_path / "customers.csv", CUSTOMERS, columns=columns)
+    with pytest.raises(ValueError, match="Schema drift"):
+        convert(mode, csv_path, str(tmp_path / "customers.parquet"), "customers")
+
+
+def test_streaming_splits_quoted_newlines_correctly_across_blocks(tmp_path):
+    # ~2.5 MB with a 1 MB block, so block boundaries fall inside quoted multi-line comments
+    reviews = [{"review_id": f"r{i}", "order_id": f"o{i}", "review_score": str(i % 5 + 1),
+                "review_comment_title": "", "review_comment_message": f"line one, {i}\nline two\n" + "x" * 60,
+                "review_creation_date": "2018-01-02 00:00:00", "review_answer_timestamp": "2018-01-03 10:00:00"}
+               for i in range(25000)]
+    csv_path = write_csv(tmp_path / "reviews.csv", reviews)
+    out = str(tmp_path / "reviews.parquet")
+    assert convert_csv_to_parquet_streaming(csv_path, out, "order_reviews", max_memory_mb=1) == len(reviews)
+    table = pq.read_table(out)
+    assert table.column("review_comment_message").to_pylist() == [r["review_comment_message"] for r in reviews]
+
+
+def test_streaming_chunks_of_a_large_file_parse_whole_records(tmp_path):
+    rows = [dict(c, customer_id=f"c{i}") for i in range(40000) for c in CUSTOMERS[i % 3:i % 3 + 1]]
+    csv_path = write_csv(tmp_path / "customers.csv", rows)
+    out = str(tmp_path / "customers.parquet")
+    assert convert_csv_to_parquet_streaming(csv_path, out, "customers", max_memory_mb=1) == len(rows)
+    assert pq.read_table(out).to_pylist() == rows
@@ -0,0 +1,111 @@
+import json
+import os
+
+import pytest
+
+from src.ingestion import ingestion_state
+from src.ingestion.ingestion_state import IngestionState, file_sha256
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "olist_orders_dataset.csv"
+    path.write_text("order_id,order_status\n1,created\n")
+    os.utime(path, (1_600_000_000, 1_600_000_000))
+    return str(path)
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    """Counts content hashes computed by the state store."""
+    calls = []
+
+    def counting(path, *args):
+        calls.append(path)
+        return file_sha256(path, *args)
+
+    monkeypatch.setattr(ingestion_state, "file_sha256", counting)
+    return calls
+
+
+def ingest(state, source):
+    changed, fingerprint = state.fingerprint(source)
+    if changed:
+        state.record(source, fingerprint, "orders", f"bronze/orders/{fingerprint['mtime']:.0f}.parquet")
+    return changed
+
+
+def test_new_source_is_changed(tmp_path, source):
+    changed, fingerprint = IngestionState(str(tmp_path / "state.json")).fingerprint(source)
+    assert changed
+    assert fingerprint == {"size": os.path.getsize(source), "mtime": 1_600_000_000, "sha256": file_sha256(source)}
+
+
+def test_same_size_and_mtime_skips_the_hash(tmp_path, source, hashes):
+    state = IngestionState(str(tmp_path / "state.json"))
+    assert ingest(state, source)
+    assert hashes == [source]
+    assert not ingest(state, source)
+    assert hashes == [source]
+
+
+def test_touched_but_identical_file_is_unchanged_and_refreshed(tmp_path, source, hashes):
+    state = IngestionState(str(tmp_path / "state.json"))
+    ingest(state, source)
+    os.utime(source, (1_700_000_000, 1_700_000_000))
+
+    changed, entry = state.fingerprint(source)
+    assert not changed and len(hashes) == 2
+    assert entry["mtime"] == 1_700_000_000 and entry["s3_key"] == "bronze/orders/1600000000.parquet"
+    # The refreshed mtime makes the next check cheap again
+    assert not state.fingerprint(source)[0] and len(hashes) == 2
+
+
+def test_edited_content_is_changed(tmp_path, source):
+    state = IngestionState(str(tmp_path / "state.json"))
+    ingest(state, source)
+    with open(source, "w") as f:
+        f.write("order_id,order_status\n2,shipped\n")   # same size, different bytes
+    os.utime(source, (1_600_000_000, 1_600_000_100))
+    changed, fingerprint = state.fingerprint(source)
+    assert changed and fingerprint["sha256"] != state.entries[os.path.abspath(source)]["sha256"]
+
+
+def test_state_persists_across_runs(tmp_path, source, hashes):
+    path = str(tmp_path / "state" / "bronze.json")
+    first = IngestionState(path)
+    ingest(first, source)
+    first.save()
+
+    with open(path) as f:
+        saved = json.load(f)
+    (entry,) = saved.values()
+    assert list(saved) == [os.path.abspath(source)]
+    assert entry["table"] == "orders" and entry["ingested_at"]
+    assert not os.path.exists(f"{path}.tmp")
+
+    second = IngestionState(path)
+    assert not ingest(second, source)
+    assert len(hashes) == 1
+
+
+def test_refreshed_mtime_is_saved(tmp_path, source, hashes):
+    path = str(tmp_path / "state.json")
+    first = IngestionState(path)
+    ingest(first, source)
+    os.utime(source, (1_700_000_000, 1_700_000_000))
+    first.fingerprint(source)
+    first.save()
+
+    assert not IngestionState(path).fingerprint(source)[0]
+    assert len(hashes) == 2
+
+
+def test_missing_state_file_starts_empty(tmp_path):
+    assert IngestionState(str(tmp_path / "absent.json")).entries == {}
+
+
+def test_hash_streams_in_blocks(tmp_path):
+    path = tmp_path / "blob.bin"
+    path.write_bytes(os.urandom(10_000))
+    assert file_sha256(str(path), block_size=7) == file_sha256(str(path))
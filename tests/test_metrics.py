@@ -0,0 +1,124 @@
+import io
+import json
+import socket
+import urllib.error
+import urllib.request
+import uuid
+
+import pytest
+
+from src.observability import metrics
+from src.observability.metrics import Registry, Timings, start_metrics_server
+from src.observability.structured_logging import setup_logger
+
+
+def test_counter_exposition():
+    registry = Registry()
+    records = registry.counter("records_total", "Records per stage", ("stage",))
+    records.inc(stage="decode")
+    records.inc(41, stage="decode")
+    records.inc(stage="write")
+    assert registry.render() == (
+        "# HELP records_total Records per stage\n"
+        "# TYPE records_total counter\n"
+        'records_total{stage="decode"} 42\n'
+        'records_total{stage="write"} 1\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    seconds = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.1, 0.5, 2.0, 60.0):
+        seconds.observe(value, stage="upload")
+    assert registry.render().splitlines() == [
+        "# HELP stage_seconds Stage time",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="upload",le="0.1"} 2',
+        'stage_seconds_bucket{stage="upload",le="1.0"} 3',
+        'stage_seconds_bucket{stage="upload",le="10.0"} 4',
+        'stage_seconds_bucket{stage="upload",le="+Inf"} 5',
+        'stage_seconds_sum{stage="upload"} 62.65',
+        'stage_seconds_count{stage="upload"} 5',
+    ]
+
+
+def test_unlabelled_series_and_means():
+    registry = Registry()
+    sizes = registry.histogram("batch_records", "Records per batch", buckets=(10, 100))
+    sizes.observe(5)
+    sizes.observe(50)
+    assert "batch_records_bucket{le=\"10\"} 1" in registry.render()
+    assert "batch_records_count 2" in registry.render()
+
+    seconds = registry.histogram("stage_seconds", "Stage time", ("stage",))
+    seconds.observe(1.0, stage="a")
+    seconds.observe(3.0, stage="a")
+    seconds.observe(0.5, stage="b")
+    assert seconds.means("stage") == {"a": 2.0, "b": 0.5}
+
+
+def test_metrics_are_registered_once_per_name():
+    registry = Registry()
+    first = registry.counter("records_total", "Records", ("stage",))
+    assert registry.counter("records_total", "Records", ("stage",)) is first
+    assert registry.render().count("# TYPE records_total") == 1
+
+
+def test_missing_label_is_an_error():
+    counter = Registry().counter("records_total", "Records", ("stage",))
+    with pytest.raises(KeyError):
+        counter.inc()
+
+
+# ==========================================
+# Timings
+# ==========================================
+def test_timings_accumulate_per_stage_and_feed_the_registry(monkeypatch):
+    seconds = Registry().histogram("stage_seconds", "Stage time", ("stage",))
+    monkeypatch.setattr(metrics, "STAGE_SECONDS", seconds)
+    timings = Timings({"csv_parse": 0.25})
+    timings.add("csv_parse", 0.5)
+    timings.add("s3_upload", 0.0014)
+    with timings.time("parquet_encode"):
+        pass
+
+    assert timings.fields()["csv_parse_ms"] == 750.0 and timings.fields()["s3_upload_ms"] == 1.4
+    assert set(timings.fields()) == {"csv_parse_ms", "s3_upload_ms", "parquet_encode_ms"}
+    assert timings.observe() is timings
+    assert seconds.means("stage")["csv_parse"] == 0.75
+
+
+# ==========================================
+# HTTP endpoint
+# ==========================================
+def test_server_is_off_without_a_port():
+    assert start_metrics_server(0) is None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_server_serves_the_registry_and_logs_its_address(monkeypatch):
+    assert metrics.logger.handlers, "the module logger must have a handler, or its lines are dropped"
+    stream = io.StringIO()
+    monkeypatch.setattr(metrics, "logger", setup_logger(f"test-{uuid.uuid4().hex}", stream=stream, asynchronous=False))
+    metrics.RECORDS.inc(stage="test_endpoint")
+    port = free_port()
+
+    server = start_metrics_server(port=port)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode()
+        assert 'keystone_records_total{stage="test_endpoint"} 1' in body
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
+    messages = [json.loads(line)["message"] for line in stream.getvalue().splitlines()]
+    assert messages == [f"Serving metrics on http://127.0.0.1:{port}/metrics"]
@@ -0,0 +1,109 @@
+import random
+
+from kafka.errors import KafkaTimeoutError
+
+from src.streaming import msk_producer
+from src.streaming.fakes import FakeFuture, FakeKafkaProducer, make_order
+from src.streaming.msk_producer import DeliveryReport, MSKProducer, pick_compression
+from src.streaming.serializers import CONTENT_TYPE_HEADER
+
+
+def test_first_available_codec_wins(monkeypatch):
+    monkeypatch.setitem(msk_producer.CODECS, "zstd", lambda: False)
+    monkeypatch.setitem(msk_producer.CODECS, "gzip", lambda: True)
+    assert pick_compression("zstd,gzip") == "gzip"
+
+
+def test_unknown_codecs_are_skipped(monkeypatch):
+    monkeypatch.setitem(msk_producer.CODECS, "gzip", lambda: True)
+    assert pick_compression("zsdt, gzip") == "gzip"
+    assert pick_compression("bogus") is None
+    assert pick_compression("") is None
+
+
+def test_none_disables_compression(monkeypatch):
+    monkeypatch.setitem(msk_producer.CODECS, "gzip", lambda: True)
+    assert pick_compression("none,gzip") is None
+
+
+# ==========================================
+# send_many / DeliveryReport
+# ==========================================
+class FailingProducer(FakeKafkaProducer):
+    """Fails delivery of records whose order_status is `fail_status`, like a broker-side error."""
+
+    def __init__(self, fail_status="canceled", **config):
+        super().__init__(**config)
+        self.fail_status = fail_status
+
+    def send(self, topic, value=None, key=None, headers=None, partition=None, timestamp_ms=None):
+        if value.get("order_status") != self.fail_status:
+            return super().send(topic, value, key, headers, partition, timestamp_ms)
+        future = FakeFuture()
+        future._resolve(exception=KafkaTimeoutError("Batch expired"))
+        return future
+
+
+def make_producer(factory=FakeKafkaProducer, **config):
+    built = []
+
+    def build(**kwargs):
+        built.append(factory(request_latency_s=0.001, **config, **kwargs))
+        return built[-1]
+
+    return MSKProducer("fake:9092", serializer="json", producer_factory=build), built
+
+
+ORDERS = [make_order(i, random.Random(i)) for i in range(200)]
+
+
+def test_send_many_reports_every_delivery_after_a_flush():
+    producer, (fake,) = make_producer()
+    report = producer.send_many("orders", ORDERS, key=lambda r: r["order_id"])
+    assert report.wait() is report and report.done
+    summary = report.summary()
+    assert summary["enqueued"] == summary["delivered"] == len(ORDERS) and summary["failed"] == 0
+    assert sum(summary["partitions"].values()) == len(ORDERS)
+    assert fake.records_sent == len(ORDERS)
+
+
+def test_keyed_records_keep_their_partition():
+    producer, _ = make_producer()
+    partitions = {}
+    for _ in range(2):
+        for order in ORDERS[:20]:
+            producer.send_async("orders", order, key=order["order_id"],
+                                on_success=lambda md, k=order["order_id"]: partitions.setdefault(k, set()).add(md.partition))
+    producer.flush()
+    assert len(partitions) == 20 and all(len(p) == 1 for p in partitions.values())
+
+
+def test_serialization_errors_fail_only_their_record():
+    producer, _ = make_producer()
+    records = [ORDERS[0], {"order_id": "x", "value": object()}, ORDERS[1]]
+    report = producer.send_many("orders", records).wait()
+    assert (report.enqueued, report.delivered, report.failed) == (3, 2, 1)
+    assert report.errors[0].startswith("TypeError")
+
+
+def test_delivery_failures_are_counted_and_errors_capped():
+    producer, _ = make_producer(FailingProducer)
+    report = DeliveryReport(producer.producer, max_errors=3)
+    producer.send_many("orders", ORDERS, report=report)
+    producer.send_many("orders", ORDERS[:10], report=report)
+    report.wait()
+    failed = sum(1 for o in ORDERS if o["order_status"] == "canceled") + sum(
+        1 for o in ORDERS[:10] if o["order_status"] == "canceled")
+    assert failed and report.enqueued == len(ORDERS) + 10
+    assert report.failed == failed and report.delivered == report.enqueued - failed
+    assert len(report.errors) == 3 and "Batch expired" in report.errors[0]
+
+
+def test_records_carry_the_content_type_header():
+    producer, (fake,) = make_producer()
+    seen = []
+    original = fake.send
+    fake.send = lambda topic, value=None, key=None, headers=None, **kw: seen.append(headers) or original(
+        topic, value, key, headers, **kw)
+    producer.send_many("orders", ORDERS[:2]).wait()
+    assert seen == [[(CONTENT_TYPE_HEADER, b"application/json")]] * 2
@@ -0,0 +1,119 @@
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+from src.validation import quarantine_splitter
+from src.validation.quarantine_splitter import is_rewritten, rewritten_path, split_files
+
+PARTITION = "orders/year=2018/month=1/day=2"
+
+
+def order(i, **overrides):
+    row = {"order_id": f"{i:032x}", "customer_id": f"c{i}", "order_status": "delivered",
+           "order_purchase_timestamp": "2018-01-02 10:00:00", "order_approved_at": "2018-01-02 10:00:00",
+           "order_delivered_carrier_date": None, "order_delivered_customer_date": "2018-01-05 10:00:00",
+           "order_estimated_delivery_date": "2018-01-10 00:00:00"}
+    row.update(overrides)
+    return row
+
+
+def write_silver(root, name, rows):
+    directory = os.path.join(root, PARTITION)
+    os.makedirs(directory, exist_ok=True)
+    pq.write_table(pa.Table.from_pylist(rows, schema=OLIST_SCHEMAS["orders"]), os.path.join(directory, name))
+    return f"{PARTITION}/{name}"
+
+
+def test_failing_rows_are_quarantined_and_passing_rows_kept(tmp_path):
+    silver, quarantine = str(tmp_path / "silver"), str(tmp_path / "quarantine")
+    rows = [order(i) for i in range(10)]
+    rows[2] = order(2, order_status="lost")
+    rows[5] = order(5, customer_id=None, order_delivered_customer_date="2017-12-31 00:00:00")
+    key = write_silver(silver, "part-0.parquet", rows)
+
+    (summary,) = split_files(silver, [key], quarantine, prefix="rejected/2018-01-03", batch_rows=4)
+
+    assert summary["rows"] == 10 and summary["quarantined"] == 2 and summary["kept"] == 8
+    assert not os.path.exists(os.path.join(silver, key))
+    kept = pq.read_table(os.path.join(silver, rewritten_path(key)))
+    assert kept.column("order_id").to_pylist() == [f"{i:032x}" for i in range(10) if i not in (2, 5)]
+    assert summary["kept_file"] == os.path.join(silver, rewritten_path(key))
+
+    rejected = pq.read_table(os.path.join(quarantine, "rejected/2018-01-03", key)).to_pylist()
+    assert [r["order_id"] for r in rejected] == [f"{2:032x}", f"{5:032x}"]
+    assert rejected[0]["failed_rules"] == ["expect_column_values_to_be_in_set(order_status)"]
+    assert sorted(rejected[1]["failed_rules"]) == [
+        "expect_column_pair_values_A_to_be_greater_than_B(order_delivered_customer_date, order_purchase_timestamp)",
+        "expect_column_values_to_not_be_null(customer_id)",
+    ]
+    assert {r["source_file"] for r in rejected} == {os.path.join(silver, key)}
+    assert not [f for f in os.listdir(os.path.join(silver, PARTITION)) if f.startswith(".")]
+
+
+def test_clean_files_are_left_untouched(tmp_path):
+    silver, quarantine = str(tmp_path / "silver"), str(tmp_path / "quarantine")
+    key = write_silver(silver, "part-0.parquet", [order(i) for i in range(5)])
+    before = os.stat(os.path.join(silver, key)).st_mtime_ns
+
+    (summary,) = split_files(silver, [key], quarantine)
+
+    assert summary["quarantined"] == 0 and summary["failures"] == {}
+    assert os.stat(os.path.join(silver, key)).st_mtime_ns == before
+    assert not os.path.exists(quarantine)
+
+
+def test_fully_failing_file_is_removed_from_silver(tmp_path):
+    silver, quarantine = str(tmp_path / "silver"), str(tmp_path / "quarantine")
+    key = write_silver(silver, "part-0.parquet", [order(i, order_status="lost") for i in range(3)])
+
+    (summary,) = split_files(silver, [key], quarantine)
+
+    assert summary["quarantined"] == 3 and summary["kept"] == 0 and summary["kept_file"] is None
+    assert os.listdir(os.path.join(silver, PARTITION)) == []
+    assert pq.read_table(os.path.join(quarantine, "rejected", key)).num_rows == 3
+
+
+def test_rewritten_files_are_marked():
+    assert rewritten_path("orders/part-0.parquet") == "orders/part-0-validated.parquet"
+    assert rewritten_path("orders/part-0-validated.parquet") == "orders/part-0-validated.parquet"
+    assert is_rewritten("orders/part-0-validated.parquet") and not is_rewritten("orders/part-0.parquet")
+
+
+def test_retry_over_partially_split_keys(tmp_path, monkeypatch):
+    silver, quarantine = str(tmp_path / "silver"), str(tmp_path / "quarantine")
+    keys = [write_silver(silver, "part-0.parquet", [order(0), order(1, order_status="lost")]),
+            write_silver(silver, "part-1.parquet", [order(2, order_status="lost")]),
+            write_silver(silver, "part-2.parquet", [order(3), order(4, order_status="lost")])]
+
+    # First attempt: dies on the third file, after the first two were split
+    split_file = quarantine_splitter.split_file
+
+    def failing_split(source, *args, **kwargs):
+        if source.endswith("part-2.parquet"):
+            raise OSError("connection reset")
+        return split_file(source, *args, **kwargs)
+
+    monkeypatch.setattr(quarantine_splitter, "split_file", failing_split)
+    with pytest.raises(OSError):
+        split_files(silver, keys, quarantine)
+    monkeypatch.undo()
+
+    first, second, third = split_files(silver, keys, quarantine)
+
+    assert first["already_split"] and (first["kept"], first["quarantined"]) == (1, 1)
+    assert first["failures"] == {"expect_column_values_to_be_in_set(order_status)": 1}
+    assert second["already_split"] and (second["kept"], second["quarantined"]) == (0, 1)
+    assert second["kept_file"] is None
+    assert "already_split" not in third and (third["kept"], third["quarantined"]) == (1, 1)
+    assert sorted(os.listdir(os.path.join(silver, PARTITION))) == ["part-0-validated.parquet",
+                                                                 "part-2-validated.parquet"]
+
+
+def test_missing_file_that_was_never_split_is_an_error(tmp_path):
+    silver, quarantine = str(tmp_path / "silver"), str(tmp_path / "quarantine")
+    os.makedirs(os.path.join(silver, PARTITION))
+    with pytest.raises(FileNotFoundError):
+        split_files(silver, [f"{PARTITION}/part-9.parquet"], quarantine)
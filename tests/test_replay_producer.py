@@ -0,0 +1,137 @@
+import random
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+from src.streaming import replay_producer
+from src.streaming.fakes import FakeKafkaProducer, FakeRecordMetadata, make_order
+from src.streaming.msk_producer import MSKProducer
+from src.streaming.replay_producer import RatePacer, ReplayReport, iter_records, iter_source_batches, replay
+
+
+class Clock:
+    """Stands in for the `time` module of replay_producer: sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 50.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(replay_producer, "time", clock)
+    return clock
+
+
+class NullProducer:
+    def flush(self, timeout=None):
+        pass
+
+
+# ==========================================
+# Pacing
+# ==========================================
+def test_pacer_holds_the_target_rate(clock):
+    pacer = RatePacer(rate=100)
+    for _ in range(50):
+        pacer.pace()
+    assert clock.now == pytest.approx(50.5)
+    assert all(s == pytest.approx(0.01) for s in clock.sleeps)
+
+
+def test_pacer_catches_up_after_a_stall_instead_of_lowering_the_rate(clock):
+    pacer = RatePacer(rate=100)
+    pacer.pace()
+    clock.now += 0.2    # the sender stalled for 20 records' worth of time
+    for _ in range(20):
+        pacer.pace()
+    assert clock.sleeps == [pytest.approx(0.01)]
+    for _ in range(10):
+        pacer.pace()
+    assert clock.now == pytest.approx(50.31)
+
+
+def test_zero_rate_is_unpaced(clock):
+    pacer = RatePacer(rate=0)
+    for _ in range(1000):
+        pacer.pace()
+    assert clock.sleeps == []
+
+
+# ==========================================
+# Report
+# ==========================================
+def deliver(report, clock, latencies_ms):
+    for i, latency in enumerate(latencies_ms):
+        report.on_delivered(clock.now - latency / 1000, FakeRecordMetadata("orders", i % 3, i))
+
+
+def test_latency_percentiles(clock):
+    report = ReplayReport(NullProducer())
+    deliver(report, clock, list(range(1, 101)))
+    assert report.latency_ms() == {"p50": 51.0, "p95": 96.0, "p99": 100.0, "max": 100.0}
+    assert report.delivered == 100 and report.partitions == {0: 34, 1: 33, 2: 33}
+
+
+def test_no_deliveries_means_no_percentiles(clock):
+    assert ReplayReport(NullProducer()).latency_ms() == {}
+
+
+def test_latency_sample_is_bounded(clock):
+    report = ReplayReport(NullProducer(), max_samples=50)
+    deliver(report, clock, [5] * 1000 + [500] * 1000)
+    assert len(report.latencies) == 50 and report.delivered == 2000
+    # A uniform sample of both halves, not just the first 50 deliveries
+    assert 0 < sum(1 for x in report.latencies if x > 0.1) < 50
+
+
+# ==========================================
+# Source and replay
+# ==========================================
+def test_source_batches_are_sliced_to_the_row_count(tmp_path):
+    orders = [make_order(i, random.Random(i)) for i in range(25)]
+    path = str(tmp_path / "orders.parquet")
+    pq.write_table(pa.Table.from_pylist(orders, schema=OLIST_SCHEMAS["orders"]), path)
+    assert list(iter_records(iter_source_batches(path, batch_rows=10), limit=12)) == orders[:12]
+
+    csv_path = tmp_path / "orders.csv"
+    csv_path.write_text("order_id,customer_id,order_status,order_purchase_timestamp,order_approved_at,"
+                        "order_delivered_carrier_date,order_delivered_customer_date,order_estimated_delivery_date\n"
+                        + "".join(f"{i:032x},c,created,2018-01-02 03:04:05,,,,2018-02-01 00:00:00\n" for i in range(25)))
+    batches = list(iter_source_batches(str(csv_path), batch_rows=10))
+    assert [b.num_rows for b in batches] == [10, 10, 5]
+    assert batches[0].schema == OLIST_SCHEMAS["orders"]
+
+
+def test_replay_delivers_every_record():
+    fake = {}
+
+    def factory(**config):
+        fake["producer"] = FakeKafkaProducer(request_latency_s=0.001, **config)
+        return fake["producer"]
+
+    orders = [make_order(i, random.Random(i)) for i in range(500)]
+    summary = replay(MSKProducer("fake:9092", producer_factory=factory, serializer="json"), iter(orders),
+                     rate=0, progress_interval_s=60)
+    assert summary["enqueued"] == summary["delivered"] == 500 and summary["failed"] == 0
+    assert fake["producer"].records_sent == 500
+    assert set(summary["latency_ms"]) == {"p50", "p95", "p99", "max"}
+
+
+def test_replay_counts_serialization_errors_as_failed():
+    orders = [make_order(0, random.Random(0)), {"order_id": "bad", "not_serializable": object()}]
+    producer = MSKProducer("fake:9092", producer_factory=lambda **c: FakeKafkaProducer(request_latency_s=0, **c),
+                           serializer="json")
+    summary = replay(producer, iter(orders), rate=0, progress_interval_s=60)
+    assert summary["enqueued"] == 2 and summary["delivered"] == 1 and summary["failed"] == 1
+    assert "TypeError" in summary["errors"][0]
@@ -0,0 +1,42 @@
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.ingestion.rolling_parquet_writer import NULL_PARTITION, RollingParquetWriter, compact_partition
+
+
+def read_rows(root):
+    dataset = ds.dataset(str(root), format="parquet", partitioning="hive")
+    return sorted(dataset.to_table().to_pylist(), key=lambda r: r["id"])
+
+
+def test_null_partition_keys_are_kept(tmp_path):
+    table = pa.table({"id": [1, 2, 3], "year": pa.array([2018, None, 2018], pa.int32())})
+    writer = RollingParquetWriter(str(tmp_path), partition_cols=["year"])
+    writer.write(table)
+    writer.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["year=2018", f"year={NULL_PARTITION}"]
+    assert read_rows(tmp_path) == [{"id": 1, "year": 2018}, {"id": 2, "year": None}, {"id": 3, "year": 2018}]
+
+
+def test_writes_append_to_one_file_per_partition(tmp_path):
+    writer = RollingParquetWriter(str(tmp_path), partition_cols=["year"])
+    for i in range(3):
+        writer.write(pa.table({"id": [i], "year": pa.array([2018], pa.int32())}))
+    closed = writer.close()
+
+    assert len(closed) == 1
+    assert [r["id"] for r in read_rows(tmp_path)] == [0, 1, 2]
+
+
+def test_compaction_keeps_every_row(tmp_path):
+    for i in range(4):
+        pq.write_table(pa.table({"id": [i * 10 + j for j in range(10)]}), tmp_path / f"part-{i}.parquet")
+
+    assert compact_partition(str(tmp_path)) == (4, 1)
+    files = [f for f in os.listdir(tmp_path) if not f.startswith(".")]
+    assert len(files) == 1 and not any(f.startswith(".") for f in os.listdir(tmp_path))
+    assert sorted(pq.read_table(tmp_path / files[0]).column("id").to_pylist()) == list(range(40))
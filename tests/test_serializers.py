@@ -0,0 +1,128 @@
+import json
+import random
+
+import pytest
+
+import src.ingestion.olist_lakehouse_enterprise as lakehouse
+from src.ingestion.batch_validation import DeadLetterWriter
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+from src.streaming import serializers
+from src.streaming.serializers import (
+    CONTENT_TYPE_HEADER, AvroSerde, JsonSerde, MsgpackSerde, OrjsonSerde, content_type_of, get_serde,
+    group_by_format, serde_for_content_type,
+)
+from src.streaming.fakes import FakeMessage, make_order
+
+ORDERS = [make_order(i, random.Random(i)) for i in range(5)]
+FORMATS = ("json", "orjson", "msgpack", "avro")
+
+
+def tagged(payload, content_type, offset=0):
+    headers = [(CONTENT_TYPE_HEADER, content_type.encode())] if content_type else None
+    return FakeMessage(payload, offset=offset, headers=headers)
+
+
+def test_json_is_the_default_format():
+    assert serializers.PRODUCER_VALUE_FORMAT == "json"
+    serde = get_serde()
+    assert isinstance(serde, JsonSerde) and not isinstance(serde, OrjsonSerde)
+    assert serde.dumps(ORDERS[0]) == json.dumps(ORDERS[0]).encode("utf-8")
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_records_round_trip(name):
+    serde = get_serde(name)
+    for record in ORDERS:
+        assert serde.loads(serde.dumps(record)) == record
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_batches_decode_to_the_registered_schema(name):
+    serde = get_serde(name)
+    table, rows, errors = serde.decode_batch([serde.dumps(r) for r in ORDERS], OLIST_SCHEMAS["orders"])
+    assert errors == [] and rows == list(range(len(ORDERS)))
+    assert table.schema == OLIST_SCHEMAS["orders"]
+    assert table.to_pylist() == ORDERS
+
+
+def test_orjson_is_read_as_json():
+    payload = OrjsonSerde().dumps(ORDERS[0])
+    assert JsonSerde().loads(payload) == ORDERS[0]
+    assert serde_for_content_type(OrjsonSerde().content_type).loads(payload) == ORDERS[0]
+
+
+def test_msgpack_drops_fields_outside_the_schema():
+    serde = MsgpackSerde()
+    assert serde.loads(serde.dumps({**ORDERS[0], "extra": 1})) == ORDERS[0]
+
+
+@pytest.mark.parametrize("name, malformed", [
+    ("json", b'{"order_id": '),
+    ("msgpack", b"\xc1"),
+    ("msgpack", MsgpackSerde().dumps(ORDERS[0])[:-8]),
+    ("avro", b"\xc3\x01" + b"\x00" * 8 + b"\x02"),
+    ("avro", b"plain bytes"),
+])
+def test_malformed_payloads_are_isolated(name, malformed):
+    serde = get_serde(name)
+    payloads = [serde.dumps(ORDERS[0]), malformed, serde.dumps(ORDERS[1])]
+    table, rows, errors = serde.decode_batch(payloads, OLIST_SCHEMAS["orders"])
+    assert rows == [0, 2] and [i for i, _ in errors] == [1]
+    assert table.column("order_id").to_pylist() == [ORDERS[0]["order_id"], ORDERS[1]["order_id"]]
+
+
+def test_msgpack_rows_of_the_wrong_width_are_rejected():
+    serde = MsgpackSerde()
+    table, rows, errors = serde.decode_batch([serde.dumps(ORDERS[0]), serde._msgpack.packb([1, 2])])
+    assert rows == [0] and errors == [(1, f"Expected a {len(serde.fields)}-value array")]
+
+
+def test_avro_rejects_values_from_another_writer_schema():
+    other = AvroSerde({"type": "record", "name": "Other", "fields": [{"name": "order_id", "type": "string"}]})
+    with pytest.raises(ValueError):
+        AvroSerde.registered().loads(other.dumps({"order_id": "x"}))
+
+
+# ==========================================
+# Content-type dispatch
+# ==========================================
+@pytest.mark.parametrize("name", FORMATS)
+def test_content_type_picks_the_decoder(name):
+    serde = get_serde(name)
+    decoder = serde_for_content_type(serde.content_type)
+    assert decoder.loads(serde.dumps(ORDERS[0])) == ORDERS[0]
+    assert serde_for_content_type(serde.content_type) is decoder
+
+
+@pytest.mark.parametrize("content_type", ["text/csv", "application/x-msgpack; schema=customers"])
+def test_unknown_content_types_are_errors(content_type):
+    with pytest.raises((ValueError, KeyError)):
+        serde_for_content_type(content_type)
+
+
+def test_missing_header_means_json():
+    assert content_type_of(tagged(b"{}", None)) == "application/json"
+    assert content_type_of(tagged(b"{}", "avro/binary; schema=orders")) == "avro/binary; schema=orders"
+
+
+def test_batches_are_grouped_by_content_type_in_first_seen_order():
+    messages = [tagged(b"", "avro/binary; schema=orders", 0), tagged(b"", None, 1),
+                tagged(b"", "avro/binary; schema=orders", 2)]
+    groups = group_by_format(messages)
+    assert [(t, [m.offset() for m in group]) for t, group in groups] == [
+        ("avro/binary; schema=orders", [0, 2]), ("application/json", [1])]
+
+
+def test_consumer_decodes_mixed_formats_and_dead_letters_unknown_ones(monkeypatch, tmp_path):
+    monkeypatch.setattr(lakehouse, "dead_letters", DeadLetterWriter(str(tmp_path)))
+    avro, msgpack = get_serde("avro"), get_serde("msgpack")
+    messages = [tagged(json.dumps(ORDERS[0]).encode(), None, 0),
+                tagged(avro.dumps(ORDERS[1]), avro.content_type, 1),
+                tagged(b"a,b,c", "text/csv", 2),
+                tagged(msgpack.dumps(ORDERS[3]), msgpack.content_type, 3),
+                tagged(b"\xc1", msgpack.content_type, 4)]
+
+    table = lakehouse.decode_orders(messages)
+
+    assert sorted(table.column("order_id").to_pylist()) == sorted(ORDERS[i]["order_id"] for i in (0, 1, 3))
+    assert lakehouse.dead_letters.written == 2
@@ -0,0 +1,180 @@
+import random
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+from src.ingestion.consumer_pipeline import add_partition_columns
+from src.ingestion.olist_schemas import OLIST_SCHEMAS
+from src.validation.arrow_expectations import suite_for_table
+from src.validation.sql_pushdown import (
+    AthenaEngine, DuckDBEngine, compile_suite_sql, date_range, partition_predicate, run_pushdown_validation,
+)
+from src.streaming.fakes import make_order
+
+DAYS = date_range(date(2018, 1, 1), date(2018, 1, 7))
+
+
+def make_orders(n=2000, seed=3):
+    """Orders over January 2018 with every olist_logistics_rules failure mixed in."""
+    rng = random.Random(seed)
+    orders = []
+    for i in range(n):
+        order = make_order(i, rng)
+        order["order_purchase_timestamp"] = f"2018-01-{rng.randint(1, 28):02d} 10:00:00"
+        broken = rng.random()
+        if broken < 0.02:
+            order["order_status"] = "lost"
+        elif broken < 0.04:
+            order["customer_id"] = None
+        elif broken < 0.06:
+            order["order_delivered_customer_date"] = "2017-12-31 00:00:00"
+        elif broken < 0.08:
+            order["order_estimated_delivery_date"] = None
+        elif broken < 0.10:
+            order["order_id"] = f"{rng.randint(0, i):032x}"
+        orders.append(order)
+    return add_partition_columns(pa.Table.from_pylist(orders, schema=OLIST_SCHEMAS["orders"]))
+
+
+@pytest.fixture(scope="module")
+def silver(tmp_path_factory):
+    root = tmp_path_factory.mktemp("silver")
+    orders = make_orders()
+    pq.write_to_dataset(orders, str(root / "orders"), partition_cols=["year", "month", "day"])
+    items = pa.table({"order_id": orders.column("order_id"),
+                      "price": pa.array([-1.0 if i % 50 == 0 else 10.0 for i in range(orders.num_rows)])})
+    (root / "order_items").mkdir()
+    pq.write_table(items, str(root / "order_items" / "part-0.parquet"))
+    return root, orders, items
+
+
+def arrow_failures(table_name, table):
+    suite = suite_for_table(table_name)
+    suite.validate(table)
+    summary = suite.summary()
+    return summary["rows"], summary["failures"]
+
+
+def test_duckdb_counts_match_the_arrow_suite(silver):
+    root, orders, items = silver
+    report = run_pushdown_validation(DuckDBEngine(str(root)))
+    for name, table in (("orders", orders), ("order_items", items)):
+        rows, failures = arrow_failures(name, table)
+        assert report["tables"][name]["rows"] == rows
+        assert report["tables"][name]["failures"] == failures
+        assert failures
+    assert not report["success"]
+
+
+def test_pruned_counts_match_the_arrow_suite(silver):
+    root, orders, _ = silver
+    report = run_pushdown_validation(DuckDBEngine(str(root)), DAYS, tables={"orders"})
+    in_days = pc.and_(pc.equal(orders.column("month"), 1), pc.less_equal(orders.column("day"), 7))
+    rows, failures = arrow_failures("orders", orders.filter(in_days))
+    assert report["tables"]["orders"]["rows"] == rows
+    assert report["tables"]["orders"]["failures"] == failures
+    assert report["tables"]["orders"]["partition_pruned"]
+
+
+def test_partition_literals_follow_partition_types():
+    days = [date(2018, 1, 1), date(2018, 1, 2)]
+    assert partition_predicate(days) == "(year = 2018 AND month = 1 AND day IN (1, 2))"
+    strings = {"year": "string", "month": "string", "day": "string"}
+    assert partition_predicate(days, strings) == "(year = '2018' AND month = '1' AND day IN ('1', '2'))"
+    assert partition_predicate([]) == "FALSE"
+
+
+class StubAthena:
+    def __init__(self):
+        self.queries = []
+
+    def start_query_execution(self, QueryString, **kwargs):
+        self.queries.append(QueryString)
+        return {"QueryExecutionId": "q1"}
+
+    def get_query_execution(self, QueryExecutionId):
+        return {"QueryExecution": {"Status": {"State": "SUCCEEDED"},
+                                   "Statistics": {"DataScannedInBytes": 10, "EngineExecutionTimeInMillis": 5}}}
+
+    def get_query_results(self, QueryExecutionId):
+        header = [{"VarCharValue": "row_count"}] + [{"VarCharValue": f"r{i}"} for i in range(6)]
+        return {"ResultSet": {"Rows": [{"Data": header}, {"Data": [{"VarCharValue": "3"}] + [{}] * 6}]}}
+
+
+class StubGlue:
+    def __init__(self, partition_type="int", parameters=None, error_code="AlreadyExistsException"):
+        self.partition_type = partition_type
+        self.parameters = parameters or {}
+        self.error_code = error_code
+        self.calls = 0
+        self.partitions = {}
+        self.batches = []
+
+    def get_table(self, DatabaseName, Name):
+        self.calls += 1
+        return {"Table": {
+            "PartitionKeys": [{"Name": c, "Type": self.partition_type} for c in ("year", "month", "day")],
+            "StorageDescriptor": {"Location": "s3://olist-data-lake-silver/orders/", "Columns": []},
+            "Parameters": self.parameters,
+        }}
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        self.batches.append(len(PartitionInputList))
+        errors = []
+        for entry in PartitionInputList:
+            values = tuple(entry["Values"])
+            if values in self.partitions:
+                errors.append({"PartitionValues": list(values), "ErrorDetail": {"ErrorCode": self.error_code}})
+            else:
+                self.partitions[values] = entry["StorageDescriptor"]["Location"]
+        return {"Errors": errors}
+
+
+@pytest.mark.parametrize("partition_type, literal", [("string", "year = '2018'"), ("int", "year = 2018")])
+def test_athena_sql_uses_glue_partition_types(partition_type, literal):
+    athena, glue = StubAthena(), StubGlue(partition_type)
+    engine = AthenaEngine(client=athena, glue_client=glue, poll_interval_s=0)
+    for _ in range(2):
+        report = run_pushdown_validation(engine, [date(2018, 1, 2)], tables={"orders"})
+    assert report["tables"]["orders"]["rows"] == 3 and report["success"]
+    assert literal in athena.queries[0]
+    assert glue.calls == 1
+
+
+def test_register_partitions_adds_only_missing_days():
+    glue = StubGlue()
+    engine = AthenaEngine(client=StubAthena(), glue_client=glue)
+    assert engine.register_partitions("orders", [date(2018, 1, 2), date(2018, 1, 2)]) == 1
+    assert glue.partitions == {("2018", "1", "2"): "s3://olist-data-lake-silver/orders/year=2018/month=1/day=2/"}
+    assert engine.register_partitions("orders", [date(2018, 1, 2), date(2018, 12, 31)]) == 1
+    assert ("2018", "12", "31") in glue.partitions
+    assert glue.calls == 1
+
+
+def test_register_partitions_batches_large_ranges():
+    glue = StubGlue()
+    engine = AthenaEngine(client=StubAthena(), glue_client=glue)
+    assert engine.register_partitions("orders", date_range(date(2018, 1, 1), date(2018, 12, 31))) == 365
+    assert glue.batches == [100, 100, 100, 65]
+
+
+def test_register_partitions_skips_projected_tables():
+    glue = StubGlue(parameters={"projection.enabled": "true"})
+    assert AthenaEngine(client=StubAthena(), glue_client=glue).register_partitions("orders", [date(2018, 1, 2)]) == 0
+    assert glue.batches == []
+
+
+def test_register_partitions_surfaces_other_errors():
+    glue = StubGlue(error_code="AccessDeniedException")
+    engine = AthenaEngine(client=StubAthena(), glue_client=glue)
+    engine.register_partitions("orders", [date(2018, 1, 2)])
+    with pytest.raises(RuntimeError, match="AccessDeniedException"):
+        engine.register_partitions("orders", [date(2018, 1, 2)])
+
+
+def test_unsupported_expectation_is_rejected():
+    with pytest.raises(ValueError):
+        compile_suite_sql("t", [{"expectation_type": "expect_table_row_count_to_equal", "kwargs": {}}])
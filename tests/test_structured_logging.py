@@ -0,0 +1,61 @@
+import json
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src.observability.structured_logging import setup_logger
+
+fork = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+
+
+def logger_to(path):
+    stream = open(path, "a")
+    return setup_logger(f"test-{uuid.uuid4().hex}", stream=stream, asynchronous=True), stream
+
+
+def read_messages(path):
+    with open(path) as f:
+        return sorted(json.loads(line)["message"] for line in f)
+
+
+def log_line(name, message):
+    logging.getLogger(name).info(message)
+
+
+def test_records_are_written_as_json_lines(tmp_path):
+    path = tmp_path / "log.jsonl"
+    logger, stream = logger_to(path)
+    logger.info("one")
+    logger.warning("two %s", "args")
+    logger.listener.stop()
+    stream.close()
+    assert read_messages(path) == ["one", "two args"]
+
+
+@fork
+def test_forked_process_records_are_written(tmp_path):
+    path = tmp_path / "log.jsonl"
+    logger, stream = logger_to(path)
+    logger.info("parent")
+    child = multiprocessing.get_context("fork").Process(target=log_line, args=(logger.name, "child"))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+    logger.listener.stop()
+    stream.close()
+    assert read_messages(path) == ["child", "parent"]
+
+
+@fork
+def test_process_pool_worker_records_are_written(tmp_path):
+    path = tmp_path / "log.jsonl"
+    logger, stream = logger_to(path)
+    logger.info("parent")
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("fork")) as pool:
+        list(pool.map(log_line, [logger.name] * 3, ["worker-0", "worker-1", "worker-2"]))
+    logger.listener.stop()
+    stream.close()
+    assert read_messages(path) == ["parent", "worker-0", "worker-1", "worker-2"]